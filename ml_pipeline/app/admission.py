@@ -0,0 +1,181 @@
+# ============================================================
+# 🚦 admission.py — 동시 처리 상한 + 요청 마감시간 기반 조기 거절
+# ============================================================
+import os
+import json
+import time
+import asyncio
+
+try:
+    from .metrics_utils import ShardedMinuteCounters
+except ImportError:
+    from metrics_utils import ShardedMinuteCounters
+
+# 워커당 동시에 모델을 돌리는 요청 수 / 그 뒤에서 기다릴 수 있는 요청 수
+MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+# 클라이언트가 헤더로 마감시간을 주지 않을 때 기본값 (대시보드 타임아웃 10s 보다 짧게)
+DEADLINE_HEADER = "x-deadline-ms"
+DEFAULT_DEADLINE_MS = float(os.getenv("ADMISSION_DEFAULT_DEADLINE_MS", "3000"))
+MAX_DEADLINE_MS = float(os.getenv("ADMISSION_MAX_DEADLINE_MS", "60000"))
+ADMISSION_PATHS = ("/predict", "/predict/batch")
+
+# 처리 시간 EWMA 가중치
+EWMA_ALPHA = 0.2
+
+# 분 단위 카운터 칸
+ADMITTED, COMPLETED, SHED_QUEUE_FULL, SHED_DEADLINE, SHED_WAIT_TIMEOUT = range(5)
+COUNTER_NAMES = ["admitted", "completed", "shed_queue_full", "shed_deadline", "shed_wait_timeout"]
+
+
+class AdmissionController:
+    """
+    워커(이벤트 루프) 1개 기준 수락 제어
+    - 처리 시간 EWMA 는 경로별 (/predict 단건과 /predict/batch 대량 배치를 섞지 않음)
+    - 예상 대기 = 앞선 요청들(처리 중 + 대기 중)의 경로별 예상 처리 시간 합 / 동시 처리 수 (빈 슬롯이 있으면 0)
+    - 예상 완료 시각(예상 대기 + 자기 경로 처리 시간)이 마감시간을 넘으면 모델을 돌리기 전에 429
+      (빈 슬롯이 있고 대기 중인 요청도 없으면 수락 → 느린 요청 1건으로 커진 EWMA 가 다음 요청으로 갱신됨)
+    - 대기열이 가득 차면 503, 대기 중 마감시간이 지나도 503
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_queue: int = MAX_QUEUE,
+                 default_deadline_ms: float = DEFAULT_DEADLINE_MS, paths=ADMISSION_PATHS):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.default_deadline_ms = default_deadline_ms
+        self.paths = set(paths)
+        self.in_flight = 0
+        self.waiting = 0
+        self.service_ewma_sec = {}
+        # 처리 중 + 대기 중 요청의 예상 처리 시간 합
+        self.backlog_sec = 0.0
+        self._semaphore = None
+        self.counters = ShardedMinuteCounters("admission", len(COUNTER_NAMES), 60)
+        self.counters.start_publisher()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # 이벤트 루프 안에서 처음 쓸 때 생성
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def deadline_ms(self, headers) -> float:
+        for k, v in headers:
+            if k == DEADLINE_HEADER.encode():
+                try:
+                    return min(max(float(v), 1.0), MAX_DEADLINE_MS)
+                except ValueError:
+                    break
+        return self.default_deadline_ms
+
+    def service_sec(self, path: str) -> float:
+        return self.service_ewma_sec.get(path) or 0.0
+
+    def idle(self) -> bool:
+        return self.in_flight < self.max_in_flight and not self.waiting
+
+    def expected_latency_sec(self, path: str) -> float:
+        wait = 0.0 if self.idle() else max(self.backlog_sec, 0.0) / self.max_in_flight
+        return wait + self.service_sec(path)
+
+    def observe(self, path: str, service_sec: float):
+        prev = self.service_ewma_sec.get(path)
+        self.service_ewma_sec[path] = service_sec if prev is None else prev + EWMA_ALPHA * (service_sec - prev)
+
+    def count(self, index: int):
+        self.counters.current()[index] += 1
+
+    def snapshot(self, minutes: int = 15) -> dict:
+        totals = self.counters.merged(minutes)
+        counts = {name: int(totals[i]) for i, name in enumerate(COUNTER_NAMES)}
+        shed = counts["shed_queue_full"] + counts["shed_deadline"] + counts["shed_wait_timeout"]
+        offered = counts["admitted"] + shed
+        return {
+            "window_minutes": minutes,
+            "counts": counts,
+            "shed_rate": shed / offered if offered else None,
+            "workers": self.counters.n_workers(),
+            # 아래는 이 워커의 현재 값
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "service_ewma_ms": {p: round(v * 1000, 3) for p, v in self.service_ewma_sec.items()},
+            "backlog_ms": round(self.backlog_sec * 1000, 3),
+            "default_deadline_ms": self.default_deadline_ms,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI 미들웨어 — 스레드풀에 작업이 쌓이기 전에 거절
+    - 수락된 요청은 scope["state"]["deadline"] (time.monotonic 기준 절대 시각) 으로 마감시간 전달
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        ctl = self.controller
+        if scope["type"] != "http" or scope["path"] not in ctl.paths:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        arrived = time.monotonic()
+        deadline_ms = ctl.deadline_ms(scope.get("headers", []))
+        deadline = arrived + deadline_ms / 1000
+
+        if ctl.waiting >= ctl.max_queue:
+            ctl.count(SHED_QUEUE_FULL)
+            await self._reject(send, 503, "queue_full", "대기열이 가득 찼습니다", ctl.expected_latency_sec(path))
+            return
+        expected = ctl.expected_latency_sec(path)
+        if not ctl.idle() and expected * 1000 > deadline_ms:
+            ctl.count(SHED_DEADLINE)
+            await self._reject(send, 429, "deadline_unreachable",
+                               f"예상 처리 시간 {expected * 1000:.0f}ms > 마감 {deadline_ms:.0f}ms", expected)
+            return
+
+        # 들어올 때의 경로별 추정치를 backlog 에 더하고 끝날 때 같은 값을 뺌
+        estimate = ctl.service_sec(path)
+        ctl.backlog_sec += estimate
+        ctl.waiting += 1
+        try:
+            await asyncio.wait_for(ctl.semaphore.acquire(), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            ctl.backlog_sec -= estimate
+            ctl.count(SHED_WAIT_TIMEOUT)
+            await self._reject(send, 503, "wait_timeout", "대기 중 마감시간 초과", ctl.expected_latency_sec(path))
+            return
+        finally:
+            ctl.waiting -= 1
+
+        ctl.count(ADMITTED)
+        ctl.in_flight += 1
+        scope.setdefault("state", {})["deadline"] = deadline
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ctl.in_flight -= 1
+            ctl.backlog_sec -= estimate
+            ctl.semaphore.release()
+            ctl.observe(path, time.monotonic() - started)
+            ctl.count(COMPLETED)
+
+    @staticmethod
+    async def _reject(send, status: int, reason: str, detail: str, retry_after_sec: float):
+        body = json.dumps({"detail": detail, "reason": reason}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, int(retry_after_sec + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
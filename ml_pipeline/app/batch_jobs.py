@@ -0,0 +1,287 @@
+# ============================================================
+# 🧾 batch_jobs.py — 오브젝트 스토리지 대상 비동기 배치 채점 작업
+# ============================================================
+import os
+import json
+import time
+import uuid
+import socket
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pyarrow as pa
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+try:
+    from .model_utils import predict_proba_batch
+    from .bulk_scoring import feature_columns, BulkInputError, ROW_ID_COLUMN, BULK_NUM_THREADS
+except ImportError:
+    from model_utils import predict_proba_batch
+    from bulk_scoring import feature_columns, BulkInputError, ROW_ID_COLUMN, BULK_NUM_THREADS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 작업 상태 JSON (같은 컨테이너의 uvicorn 워커끼리 공유 → 어느 워커로 조회해도 같은 상태)
+BATCH_JOB_DIR = os.getenv("BATCH_JOB_DIR", os.path.join(BASE_DIR, "batch_jobs"))
+BATCH_JOB_WORKERS = int(os.getenv("BATCH_JOB_WORKERS", "1"))
+# s3:// 경로용 MinIO 설정 (model_utils.minio_client 와 같은 환경 변수)
+S3_ENDPOINT = os.getenv("BATCH_JOB_S3_ENDPOINT", os.getenv("MINIO_ENDPOINT", ""))
+
+# running 인데 이 시간 동안 진행 상황(updated_at)이 갱신되지 않으면 중단된 작업으로 간주 (행 그룹 1개 처리 시간보다 길게)
+BATCH_JOB_STALE_SEC = float(os.getenv("BATCH_JOB_STALE_SEC", "1800"))
+
+CHECKPOINT_FILE = "_checkpoint.json"
+SUCCESS_FILE = "_SUCCESS"
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+def get_filesystem(path: str):
+    """s3://bucket/key → (S3FileSystem, 'bucket/key'), 그 외 → (LocalFileSystem, 절대 경로)"""
+    if path.startswith("s3://"):
+        endpoint = S3_ENDPOINT
+        scheme = "https" if endpoint.startswith("https://") else "http"
+        fs = pafs.S3FileSystem(
+            access_key=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
+            secret_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
+            endpoint_override=endpoint.split("://", 1)[-1] or None,
+            scheme=scheme,
+            region="us-east-1",
+        )
+        return fs, path[len("s3://"):]
+    return pafs.LocalFileSystem(), os.path.abspath(path)
+
+
+def _read_json(fs, path: str):
+    """없거나 깨진 파일(쓰기 도중 중단 등)은 None → 체크포인트 없음으로 처음부터"""
+    try:
+        with fs.open_input_stream(path) as f:
+            return json.loads(f.read())
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _write_json(fs, path: str, obj: dict):
+    """임시 파일에 쓴 뒤 move → 쓰는 도중 죽어도 이전 내용이 그대로 남음 (로컬은 truncate 후 쓰기라 원자적이지 않음)"""
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with fs.open_output_stream(tmp) as f:
+        f.write(json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8"))
+    fs.move(tmp, path)
+
+
+class BatchJobManager:
+    """
+    작업 제출 → 워커 스레드풀에서 입력 Parquet 를 행 그룹 단위로 채점
+    - 행 그룹 1개 = 출력 파트 파일 1개 (part-00000.parquet ...) → 저장 후 출력 경로의 _checkpoint.json 갱신
+    - 실패/재시작 후 같은 출력 경로로 다시 실행하면 체크포인트에 있는 행 그룹은 건너뜀
+    - 완료 시 _SUCCESS 생성
+    - 프로세스가 죽어(OOM / 재시작 / 배포) queued / running 으로 남은 작업은 시작 시와 조회 시 failed 로 표시 → resume 가능
+    """
+
+    def __init__(self, models: dict, meta: dict, feature_keys: list,
+                 state_dir: str = BATCH_JOB_DIR, workers: int = BATCH_JOB_WORKERS,
+                 predict_fn=predict_proba_batch):
+        self.models = models
+        self.meta = meta
+        self.predict_fn = predict_fn
+        self.feature_keys = feature_keys
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-job")
+        self.host = socket.gethostname()
+        # 이 프로세스가 대기열에 넣은 작업 (재시작 후 같은 pid 를 다시 받아도 이전 작업과 구분)
+        self._owned = set()
+        self._marked = []
+        self.recent(limit=None)
+        if self._marked:
+            print(f"⚠️ 중단된 배치 작업 {len(self._marked)}개를 failed 로 표시 (resume 으로 재개 가능): {self._marked}")
+
+    # --------------------------------------------------------
+    # 🗂️ 작업 상태 (로컬 JSON)
+    # --------------------------------------------------------
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def get(self, job_id: str) -> dict:
+        path = self._state_path(job_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            job = json.load(f)
+        return self._mark_if_orphaned(job)
+
+    def _orphan_reason(self, job: dict):
+        """queued / running 작업의 담당 프로세스가 없으면 사유 문자열, 살아 있으면 None"""
+        if job["status"] not in (QUEUED, RUNNING) or not job.get("pid"):
+            return None
+        # 같은 컨테이너(공유 상태 디렉터리)의 워커 → pid 로 확인
+        if job.get("host") == self.host:
+            if job["pid"] == os.getpid() and job["job_id"] not in self._owned:
+                return f"작업 프로세스(pid {job['pid']})가 재시작됨"
+            if not _pid_alive(job["pid"]):
+                return f"작업 프로세스(pid {job['pid']})가 종료됨"
+        # 다른 호스트 / pid 재사용 → 진행 상황 갱신이 멈춘 running 작업만
+        if job["status"] == RUNNING:
+            idle = time.time() - datetime.fromisoformat(job["updated_at"]).timestamp()
+            if idle > BATCH_JOB_STALE_SEC:
+                return f"{idle:.0f}s 동안 진행 없음 (> {BATCH_JOB_STALE_SEC:.0f}s)"
+        return None
+
+    def _mark_if_orphaned(self, job: dict) -> dict:
+        reason = self._orphan_reason(job)
+        if reason is None:
+            return job
+        job.update(status=FAILED, orphaned=True, error=f"중단된 작업: {reason}",
+                   finished_at=datetime.now().isoformat(timespec="seconds"))
+        self._save(job)
+        self._marked.append(job["job_id"])
+        return job
+
+    def _save(self, job: dict):
+        job["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        tmp = self._state_path(job["job_id"]) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._state_path(job["job_id"]))
+
+    def recent(self, limit: int = 20) -> list:
+        """최근 제출 순 (limit=None 이면 전체)"""
+        jobs = []
+        for name in os.listdir(self.state_dir):
+            if name.endswith(".json"):
+                job = self.get(name[:-len(".json")])
+                if job:
+                    jobs.append(job)
+        return sorted(jobs, key=lambda j: j["submitted_at"], reverse=True)[:limit]
+
+    # --------------------------------------------------------
+    # 📥 제출 / 재개
+    # --------------------------------------------------------
+    def submit(self, input_path: str, output_path: str, passthrough: list = None) -> dict:
+        job = {
+            "job_id": uuid.uuid4().hex[:12],
+            "status": QUEUED,
+            "input_path": input_path,
+            "output_path": output_path.rstrip("/"),
+            "passthrough": list(passthrough or []),
+            "row_groups_total": None,
+            "row_groups_done": 0,
+            "row_groups_skipped": 0,
+            "rows_done": 0,
+            "error": None,
+            "submitted_at": datetime.now().isoformat(timespec="seconds"),
+            "started_at": None,
+            "finished_at": None,
+            # 담당 프로세스 (대기열에 넣은 워커 = 실행할 워커)
+            "pid": os.getpid(),
+            "host": self.host,
+        }
+        self._owned.add(job["job_id"])
+        self._save(job)
+        self.pool.submit(self._run, job["job_id"])
+        return job
+
+    def resume(self, job_id: str) -> dict:
+        """
+        실패한 작업(중단된 작업 포함)을 이 워커의 대기열에 (완료된 행 그룹은 출력 체크포인트 기준으로 건너뜀)
+        - 담당 프로세스가 살아 있는 queued / running 작업은 그대로 반환
+        """
+        job = self.get(job_id)
+        if job is None or job["status"] in (QUEUED, RUNNING):
+            return job
+        job.update(status=QUEUED, error=None, finished_at=None, orphaned=False, pid=os.getpid(), host=self.host)
+        self._owned.add(job_id)
+        self._save(job)
+        self.pool.submit(self._run, job_id)
+        return job
+
+    # --------------------------------------------------------
+    # ⚙️ 실행
+    # --------------------------------------------------------
+    def _run(self, job_id: str):
+        job = self.get(job_id)
+        job.update(status=RUNNING, started_at=datetime.now().isoformat(timespec="seconds"), pid=os.getpid(),
+                   host=self.host)
+        self._save(job)
+        started = time.perf_counter()
+        try:
+            in_fs, in_path = get_filesystem(job["input_path"])
+            out_fs, out_dir = get_filesystem(job["output_path"])
+            out_fs.create_dir(out_dir, recursive=True)
+
+            with in_fs.open_input_file(in_path) as f:
+                pf = pq.ParquetFile(f)
+                columns = feature_columns(pf.schema_arrow, self.meta, self.feature_keys)
+                missing = [c for c in job["passthrough"] if c not in pf.schema_arrow.names]
+                if missing:
+                    raise BulkInputError(422, f"입력에 없는 passthrough 컬럼: {missing}")
+                has_row_id = ROW_ID_COLUMN in pf.schema_arrow.names
+                read_cols = list(dict.fromkeys(
+                    columns + job["passthrough"] + ([ROW_ID_COLUMN] if has_row_id else [])))
+
+                n_groups = pf.metadata.num_row_groups
+                offsets = np.concatenate([[0], np.cumsum(
+                    [pf.metadata.row_group(i).num_rows for i in range(n_groups)])])
+
+                checkpoint_path = f"{out_dir}/{CHECKPOINT_FILE}"
+                checkpoint = _read_json(out_fs, checkpoint_path)
+                if not checkpoint or checkpoint.get("input_path") != job["input_path"] \
+                        or checkpoint.get("row_groups_total") != n_groups:
+                    checkpoint = {"input_path": job["input_path"], "row_groups_total": n_groups,
+                                  "done": [], "rows_done": 0}
+                done = set(checkpoint["done"])
+                job.update(row_groups_total=n_groups, row_groups_skipped=len(done),
+                           row_groups_done=len(done), rows_done=checkpoint["rows_done"])
+                self._save(job)
+
+                for rg in range(n_groups):
+                    if rg in done:
+                        continue
+                    table = pf.read_row_group(rg, columns=read_cols)
+                    X = np.column_stack([
+                        table.column(c).to_numpy().astype(float, copy=False) for c in columns
+                    ])
+                    probs, preds = self.predict_fn(self.models, self.meta, X, num_threads=BULK_NUM_THREADS)
+
+                    out = {}
+                    if has_row_id:
+                        out[ROW_ID_COLUMN] = table.column(ROW_ID_COLUMN)
+                    else:
+                        out["row_index"] = pa.array(np.arange(offsets[rg], offsets[rg + 1], dtype=np.int64))
+                    for c in job["passthrough"]:
+                        if c != ROW_ID_COLUMN:
+                            out[c] = table.column(c)
+                    out["probability"] = pa.array(probs, pa.float64())
+                    out["prediction"] = pa.array(preds.astype(np.int8))
+                    out["model_version"] = pa.array([self.meta.get("version", "v1")] * len(X))
+
+                    # 파트 먼저 저장 → 체크포인트 갱신 (중간 실패 시 같은 파트를 다시 덮어씀)
+                    pq.write_table(pa.table(out), f"{out_dir}/part-{rg:05d}.parquet", filesystem=out_fs)
+                    checkpoint["done"].append(rg)
+                    checkpoint["rows_done"] += len(X)
+                    _write_json(out_fs, checkpoint_path, checkpoint)
+
+                    job.update(row_groups_done=len(checkpoint["done"]), rows_done=checkpoint["rows_done"])
+                    self._save(job)
+
+            with out_fs.open_output_stream(f"{out_dir}/{SUCCESS_FILE}") as f:
+                f.write(b"")
+            job.update(status=SUCCEEDED, elapsed_sec=round(time.perf_counter() - started, 2),
+                       finished_at=datetime.now().isoformat(timespec="seconds"))
+            self._save(job)
+            print(f"✅ 배치 작업 완료: {job_id} ({job['rows_done']:,}행, {job['elapsed_sec']}s)")
+        except Exception as e:
+            detail = e.detail if isinstance(e, BulkInputError) else str(e)
+            job.update(status=FAILED, error=detail, finished_at=datetime.now().isoformat(timespec="seconds"))
+            self._save(job)
+            print(f"❌ 배치 작업 실패: {job_id} ({detail})")
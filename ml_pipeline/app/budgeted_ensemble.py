@@ -0,0 +1,146 @@
+# ============================================================
+# ⏱️ budgeted_ensemble.py — 시간 예산 내 앙상블 (느린 모델은 제외하고 가중 평균)
+# ============================================================
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+
+try:
+    from .metrics_utils import ShardedMinuteCounters
+    from .model_utils import align_feature_names, positive_proba
+except ImportError:
+    from metrics_utils import ShardedMinuteCounters
+    from model_utils import align_feature_names, positive_proba
+
+# 0 이면 비활성화 (모든 모델을 기다리는 기존 predict_proba 경로)
+ENSEMBLE_BUDGET_MS = float(os.getenv("ENSEMBLE_BUDGET_MS", "0"))
+# 모델별 전용 스레드 수 (느린 모델이 다른 모델의 스레드를 잡지 않도록 분리)
+ENSEMBLE_THREADS_PER_MODEL = int(os.getenv("ENSEMBLE_THREADS_PER_MODEL", "4"))
+
+# 분 단위 카운터: 요청 / degraded / 실패 + 모델별 (완료, 시간초과, 지연 합 ms)
+REQUESTS, DEGRADED, FAILED = range(3)
+PER_MODEL = 3
+
+
+class EnsembleTimeout(Exception):
+    """마감시간 안에 끝난 모델이 하나도 없음"""
+
+
+class BudgetedEnsemble:
+    """
+    모델별 전용 스레드풀에서 동시에 예측 → 예산 시각까지 끝난 모델만 균등 가중치 재정규화 평균
+    - 전체 경로(predict_proba_batch / compiled / onnx 기본값)와 같은 균등 평균 → 세 모델이 모두 끝나면 확률이 같음
+      (meta['weights'] 로 바꾸려면 전체 경로와 함께 바꿔야 함)
+    - 예산 안에 하나도 못 끝나면 요청 마감시간까지 가장 먼저 끝나는 모델 1개를 기다림
+    - 예산을 넘긴 모델은 결과를 버림 (대기 중이던 작업은 취소)
+    """
+
+    def __init__(self, models: dict, meta: dict, budget_ms: float = ENSEMBLE_BUDGET_MS,
+                 threads_per_model: int = ENSEMBLE_THREADS_PER_MODEL):
+        self.meta = meta
+        self.budget_sec = budget_ms / 1000
+        self.models = {name: m for name, m in models.items() if m}
+        self.names = list(self.models)
+
+        self.weights = {name: 1.0 for name in self.names}
+
+        self.executors = {
+            name: ThreadPoolExecutor(max_workers=threads_per_model, thread_name_prefix=name)
+            for name in self.names
+        }
+        self.counters = ShardedMinuteCounters("ensemble", 3 + PER_MODEL * len(self.names), 60)
+        self.counters.start_publisher()
+
+    def _timed(self, name, X):
+        t0 = time.perf_counter()
+        proba = positive_proba(name, self.models[name], X)
+        return proba, time.perf_counter() - t0
+
+    def predict(self, df, deadline: float = None):
+        """
+        df: DataFrame (피처명 매핑) 또는 meta['features'] 순서 ndarray → (확률 배열, 레이블 배열, info)
+        - deadline: time.monotonic 기준 요청 마감 시각 (수락 제어 미들웨어가 전달), 예산은 이보다 늦을 수 없음
+        - info: degraded 여부, 사용 모델, 재정규화 가중치, 모델별 소요 ms
+        """
+        X = align_feature_names(df, self.meta) if isinstance(df, pd.DataFrame) else np.asarray(df, dtype=float)
+        now = time.monotonic()
+        budget_end = now + self.budget_sec
+        if deadline is not None:
+            budget_end = min(budget_end, deadline)
+
+        futures = {self.executors[name].submit(self._timed, name, X): name for name in self.names}
+        done, pending = wait(futures, timeout=max(budget_end - time.monotonic(), 0))
+        if not done and deadline is not None and deadline > time.monotonic():
+            done, pending = wait(futures, timeout=deadline - time.monotonic(), return_when=FIRST_COMPLETED)
+        elif not done:
+            done, pending = wait(futures, return_when=FIRST_COMPLETED)
+
+        slot = self.counters.current()
+        slot[REQUESTS] += 1
+
+        results, latency_ms = {}, {}
+        for fut in done:
+            name = futures[fut]
+            try:
+                proba, sec = fut.result()
+            except Exception as e:
+                print(f"⚠️ {name} 예측 실패: {e}")
+                continue
+            results[name] = proba
+            latency_ms[name] = round(sec * 1000, 3)
+            base = 3 + PER_MODEL * self.names.index(name)
+            slot[base] += 1
+            slot[base + 2] += sec * 1000
+        for fut in pending:
+            fut.cancel()
+            slot[3 + PER_MODEL * self.names.index(futures[fut]) + 1] += 1
+
+        if not results:
+            slot[FAILED] += 1
+            raise EnsembleTimeout("마감시간 안에 완료된 모델이 없습니다")
+
+        used = [n for n in self.names if n in results]
+        total_w = sum(self.weights[n] for n in used)
+        weights = {n: self.weights[n] / total_w for n in used}
+        # 가중치가 균등하므로 predict_proba_batch 와 같은 합 / 개수 (float32 출력 모델도 같은 반올림)
+        avg_prob = sum(results[n] for n in used) / len(used)
+
+        degraded = len(used) < len(self.names)
+        if degraded:
+            slot[DEGRADED] += 1
+
+        threshold = self.meta.get("threshold", 0.5)
+        info = {
+            "degraded": degraded,
+            "models_used": used,
+            "weights": weights,
+            "model_latency_ms": latency_ms,
+        }
+        return avg_prob, (avg_prob >= threshold).astype(int), info
+
+    def snapshot(self, minutes: int = 15) -> dict:
+        totals = self.counters.merged(minutes)
+        n = int(totals[REQUESTS])
+        models = {}
+        for i, name in enumerate(self.names):
+            completed, timeouts, latency_sum = totals[3 + PER_MODEL * i: 3 + PER_MODEL * (i + 1)]
+            models[name] = {
+                "weight": self.weights[name],
+                "completed": int(completed),
+                "timeouts": int(timeouts),
+                "timeout_rate": float(timeouts / (completed + timeouts)) if completed + timeouts else None,
+                "mean_latency_ms": float(latency_sum / completed) if completed else None,
+            }
+        return {
+            "enabled": True,
+            "budget_ms": self.budget_sec * 1000,
+            "window_minutes": minutes,
+            "requests": n,
+            "degraded": int(totals[DEGRADED]),
+            "degraded_rate": float(totals[DEGRADED] / n) if n else None,
+            "failed": int(totals[FAILED]),
+            "workers": self.counters.n_workers(),
+            "models": models,
+        }
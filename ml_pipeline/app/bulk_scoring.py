@@ -0,0 +1,198 @@
+# ============================================================
+# 🗂️ bulk_scoring.py — Arrow IPC / Parquet 대량 채점 (레코드 배치 단위 스트리밍)
+# ============================================================
+import io
+import os
+import json
+import tempfile
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from .model_utils import predict_proba_batch
+except ImportError:
+    from model_utils import predict_proba_batch
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+NDJSON = "application/x-ndjson"
+MEDIA_ALIASES = {"application/x-parquet": PARQUET, "application/parquet": PARQUET,
+                 "application/jsonl": NDJSON, "application/json-lines": NDJSON}
+
+# 한 번에 모델에 넣는 최대 행 수 (서버 메모리 상한 = 이 크기의 배치 1개)
+BULK_BATCH_ROWS = int(os.getenv("BULK_BATCH_ROWS", "65536"))
+# 대량 채점은 전체 코어 사용 → 워커당 동시 작업 수 제한
+BULK_MAX_CONCURRENT = int(os.getenv("BULK_MAX_CONCURRENT", "1"))
+BULK_NUM_THREADS = int(os.getenv("BULK_NUM_THREADS", "-1"))
+# 요청 본문은 디스크에 임시 저장한 뒤 배치 단위로 읽음 (메모리 상한은 배치 1개)
+# - Parquet: footer 가 파일 끝에 있음
+# - Arrow IPC: 응답 스트리밍 중에 본문을 읽으면 Starlette 의 연결 끊김 감지(listen_for_disconnect)가
+#   http.request 메시지를 가로채 본문이 잘림 → 응답 시작 전에 본문을 모두 받아 둠
+BULK_SPOOL_DIR = os.getenv("BULK_SPOOL_DIR", tempfile.gettempdir())
+ROW_ID_COLUMN = "row_id"
+
+
+class BulkInputError(Exception):
+    """입력 형식/스키마 오류 (status_code: 415 / 422)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def media_type(header: str, supported: tuple) -> str:
+    for part in (header or "").split(","):
+        mt = part.split(";")[0].strip().lower()
+        mt = MEDIA_ALIASES.get(mt, mt)
+        if mt in supported:
+            return mt
+    return None
+
+
+# ============================================================
+# 📥 입력: 요청 본문 → 레코드 배치
+# ============================================================
+async def spool_to_file(request, suffix: str = ".parquet") -> str:
+    """본문을 청크 단위로 임시 파일에 기록 → 경로"""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=BULK_SPOOL_DIR)
+    with os.fdopen(fd, "wb") as f:
+        async for chunk in request.stream():
+            f.write(chunk)
+    return path
+
+
+def feature_columns(schema: pa.Schema, meta: dict, feature_keys: list) -> list:
+    """입력 스키마에서 사용할 피처 컬럼 (meta['features'] 이름 우선, 없으면 feature_1 ~ feature_7)"""
+    names = set(schema.names)
+    for candidate in (meta.get("features") or [], feature_keys):
+        if candidate and all(c in names for c in candidate):
+            return list(candidate)
+    raise BulkInputError(422, f"피처 컬럼이 없습니다: {meta.get('features')} 또는 {feature_keys} 가 필요합니다")
+
+
+class BulkSource:
+    """
+    레코드 배치 소스 (임시 저장한 Arrow IPC 스트림 또는 Parquet 파일)
+    - batches(): 최대 BULK_BATCH_ROWS 행씩 (row_id 배열, 피처 ndarray)
+    - close(): 임시 파일 삭제
+    """
+
+    def __init__(self, content_type: str, meta: dict, feature_keys: list, path: str):
+        self.path = path
+        self._file = None
+        if content_type == PARQUET:
+            try:
+                self._parquet = pq.ParquetFile(path)
+            except Exception as e:
+                raise BulkInputError(422, f"Parquet 파일을 읽을 수 없습니다: {e}")
+            schema = self._parquet.schema_arrow
+            self._reader = None
+        else:
+            try:
+                # 메모리 맵 → 레코드 배치를 디스크에서 바로 참조 (본문 전체를 힙에 올리지 않음)
+                self._file = pa.memory_map(path, "r")
+                self._reader = ipc.open_stream(self._file)
+            except Exception as e:
+                self.close()
+                raise BulkInputError(422, f"Arrow IPC 스트림을 읽을 수 없습니다: {e}")
+            schema = self._reader.schema
+            self._parquet = None
+
+        self.columns = feature_columns(schema, meta, feature_keys)
+        self.has_row_id = ROW_ID_COLUMN in schema.names
+        self.row_id_type = schema.field(ROW_ID_COLUMN).type if self.has_row_id else pa.int64()
+
+    def _record_batches(self):
+        if self._parquet is not None:
+            cols = self.columns + ([ROW_ID_COLUMN] if self.has_row_id else [])
+            yield from self._parquet.iter_batches(batch_size=BULK_BATCH_ROWS, columns=cols)
+        else:
+            for batch in self._reader:
+                # 클라이언트가 큰 배치를 보내도 모델 입력은 BULK_BATCH_ROWS 씩
+                for offset in range(0, batch.num_rows, BULK_BATCH_ROWS):
+                    yield batch.slice(offset, BULK_BATCH_ROWS)
+
+    def batches(self):
+        offset = 0
+        for batch in self._record_batches():
+            if batch.num_rows == 0:
+                continue
+            X = np.column_stack([
+                batch.column(c).to_numpy(zero_copy_only=False).astype(float, copy=False) for c in self.columns
+            ])
+            if self.has_row_id:
+                row_ids = batch.column(ROW_ID_COLUMN)
+            else:
+                row_ids = pa.array(np.arange(offset, offset + batch.num_rows, dtype=np.int64))
+            offset += batch.num_rows
+            yield row_ids, X
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ============================================================
+# 📤 출력: (row_id, probability, prediction) 스트림
+# ============================================================
+def _ndjson_lines(row_ids: pa.Array, probs: np.ndarray, preds: np.ndarray) -> bytes:
+    ids = row_ids.to_pylist()
+    if orjson is not None:
+        return b"".join(
+            orjson.dumps({"row_id": i, "probability": p, "prediction": l}) + b"\n"
+            for i, p, l in zip(ids, probs.tolist(), preds.tolist())
+        )
+    return "".join(
+        json.dumps({"row_id": i, "probability": p, "prediction": l}) + "\n"
+        for i, p, l in zip(ids, probs.tolist(), preds.tolist())
+    ).encode()
+
+
+def score_stream(source: BulkSource, models: dict, meta: dict, out_type: str, on_batch=None,
+                 predict_fn=predict_proba_batch):
+    """
+    배치마다 앙상블 채점 → 응답 바이트 청크 (StreamingResponse 가 워커 스레드에서 순회)
+    - 메모리: 입력 배치 1개 + 결과 배치 1개
+    - 실시간 KPI / 드리프트 지표에는 기록하지 않음 (야간 대량 채점이 라이브 분포를 덮지 않도록)
+    - predict_fn: 채점 백엔드 (기본 네이티브 부스터, model_utils.load_scoring_backend 참고)
+    """
+    schema = pa.schema([(ROW_ID_COLUMN, source.row_id_type),
+                        ("probability", pa.float64()), ("prediction", pa.int8())])
+    sink = io.BytesIO()
+    writer = ipc.new_stream(sink, schema) if out_type == ARROW_STREAM else None
+    try:
+        for row_ids, X in source.batches():
+            probs, preds = predict_fn(models, meta, X, num_threads=BULK_NUM_THREADS)
+            if on_batch is not None:
+                on_batch(len(X))
+            if writer is None:
+                yield _ndjson_lines(row_ids, probs, preds)
+                continue
+            writer.write_batch(pa.record_batch(
+                [row_ids, pa.array(probs, pa.float64()), pa.array(preds.astype(np.int8))], schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+        if writer is not None:
+            writer.close()
+            yield sink.getvalue()
+    except Exception as e:
+        # 헤더는 이미 전송됨 → NDJSON 은 마지막 줄에 오류, Arrow 는 스트림을 끝내지 않고 중단
+        print(f"❌ 대량 채점 중 오류: {e}")
+        if writer is None:
+            yield (json.dumps({"error": str(e)}, ensure_ascii=False) + "\n").encode()
+        else:
+            raise
+    finally:
+        source.close()
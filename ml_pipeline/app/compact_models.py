@@ -0,0 +1,246 @@
+# ============================================================
+# ✂️ compact_models.py — 트리 수 절단(앞쪽 N개만 사용) 정확도 / 지연 / 크기 비교 + 압축 앙상블 내보내기
+# ------------------------------------------------------------
+# python compact_models.py --input valid.parquet --label-column label                    # 비교표만
+# python compact_models.py --input valid.parquet --label-column label --export ../models_compact
+# python compact_models.py --input valid.parquet --trees lgb=1,xgb=200,cat=300 --export ...  # 직접 지정
+#
+# - 모델별로 나머지 두 모델은 전체 트리 그대로 두고 앞쪽 N개 트리만 사용했을 때의 앙상블 AUC / F1
+# - --tolerance: 기준(전체 트리) 대비 앙상블 AUC 하락 허용치 → 모델별 가장 작은 N 자동 선택
+#   (세 모델을 함께 절단한 앙상블로 다시 확인, 초과하면 트리 수를 늘려 허용치 안으로)
+# - 레이블 컬럼이 없으면 전체 트리 앙상블의 예측을 기준으로 (AUC = 원래 앙상블 레이블 재현도)
+# ============================================================
+import io
+import os
+import copy
+import json
+import time
+import argparse
+from datetime import datetime
+import joblib
+import numpy as np
+
+try:
+    from .model_utils import MODEL_CACHE_DIR, positive_proba, predict_proba_batch
+except ImportError:
+    from model_utils import MODEL_CACHE_DIR, positive_proba, predict_proba_batch
+
+TREE_GRID = [1, 2, 5, 10, 20, 50, 100, 200, 300, 500, 1000, 2000]
+MODEL_FILES = {"lgb_model": "lgb_model.joblib", "xgb_model": "xgb_model.joblib", "cat_model": "cat_model.joblib"}
+
+
+# ============================================================
+# 🌲 모델별 트리 수 / 절단
+# ============================================================
+def n_trees(name: str, model) -> int:
+    if name == "lgb_model":
+        return model.booster_.current_iteration()
+    if name == "xgb_model":
+        return model.get_booster().num_boosted_rounds()
+    return model.tree_count_
+
+
+def truncate(name: str, model, n: int):
+    """앞쪽 n개 트리(반복)만 남긴 복사본 — 저장하면 파일 크기도 줄어듦"""
+    if name == "lgb_model":
+        import lightgbm as lgb
+        out = copy.deepcopy(model)
+        out._Booster = lgb.Booster(model_str=model.booster_.model_to_string(num_iteration=n))
+        out._best_iteration = None
+        return out
+    if name == "xgb_model":
+        out = copy.deepcopy(model)
+        out._Booster = model.get_booster()[:n]
+        out._Booster.set_attr(best_iteration=None)
+        return out
+    out = model.copy()
+    out.shrink(ntree_end=n)
+    return out
+
+
+def model_size(model) -> int:
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+    return buf.tell()
+
+
+# ============================================================
+# 📏 평가
+# ============================================================
+def _metrics(prob: np.ndarray, y: np.ndarray, threshold: float) -> dict:
+    from sklearn.metrics import roc_auc_score, f1_score
+    auc = float(roc_auc_score(y, prob)) if len(np.unique(y)) > 1 else None
+    return {"auc": auc, "f1": float(f1_score(y, prob >= threshold, zero_division=0))}
+
+
+def _median_ms(fn, n: int = 200) -> float:
+    fn()
+    times = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)) * 1000
+
+
+def evaluate(models: dict, meta: dict, X: np.ndarray, y: np.ndarray, batch_rows: int = 10000) -> dict:
+    """앙상블 AUC / F1 + 단건 지연 + batch_rows 행 배치 지연 (네이티브 경로, 1스레드) + joblib 크기"""
+    threshold = meta.get("threshold", 0.5)
+    prob, _ = predict_proba_batch(models, meta, X, num_threads=-1)
+    row, batch = X[:1], X[:batch_rows]
+    return {
+        **_metrics(prob, y, threshold),
+        "latency_1row_ms": round(_median_ms(lambda: predict_proba_batch(models, meta, row)), 4),
+        f"latency_{len(batch)}rows_ms": round(_median_ms(lambda: predict_proba_batch(models, meta, batch), 5), 2),
+        "size_kb": round(sum(model_size(m) for m in models.values() if m) / 1024, 1),
+    }
+
+
+def sweep(models: dict, meta: dict, X: np.ndarray, y: np.ndarray) -> list:
+    """모델별 × 트리 수별 (나머지 모델은 전체) 비교 행 목록 — 첫 행은 전체 트리 기준"""
+    threshold = meta.get("threshold", 0.5)
+    rows = [{"model": "baseline", "trees": None, "original_trees": None, "model_auc": None,
+             **evaluate(models, meta, X, y)}]
+    for name, model in models.items():
+        if not model:
+            continue
+        total = n_trees(name, model)
+        for n in sorted({g for g in TREE_GRID if g < total} | {total}):
+            variant = {**models, name: truncate(name, model, n) if n < total else model}
+            model_auc = _metrics(positive_proba(name, variant[name], X, num_threads=-1), y, threshold)["auc"]
+            rows.append({"model": name, "trees": n, "original_trees": total, "model_auc": model_auc,
+                         **evaluate(variant, meta, X, y)})
+            print(f"   {name} {n:>5}/{total}: AUC {rows[-1]['auc']}, F1 {rows[-1]['f1']:.4f}, "
+                  f"단건 {rows[-1]['latency_1row_ms']}ms, {rows[-1]['size_kb']}KB")
+    return rows
+
+
+def choose_trees(rows: list, tolerance: float) -> dict:
+    """모델별로 앙상블 AUC(없으면 F1) 가 기준 - tolerance 이상인 가장 작은 트리 수"""
+    base = rows[0]
+    key = "auc" if base["auc"] is not None else "f1"
+    chosen = {}
+    for r in rows[1:]:
+        if r["model"] in chosen:
+            continue
+        if r[key] is not None and r[key] >= base[key] - tolerance:
+            chosen[r["model"]] = r["trees"]
+    return chosen
+
+
+def apply_trees(models: dict, trees: dict) -> dict:
+    """trees 에 지정된 수로 절단한 모델 dict (지정 없거나 전체 이상이면 원본)"""
+    return {name: truncate(name, m, trees[name]) if m and trees.get(name, n_trees(name, m)) < n_trees(name, m)
+            else m for name, m in models.items()}
+
+
+def fit_tolerance(models: dict, meta: dict, X: np.ndarray, y: np.ndarray, rows: list,
+                  trees: dict, tolerance: float) -> dict:
+    """
+    choose_trees 는 모델별로 (나머지 전체) 따로 고르므로 함께 절단하면 하락이 누적될 수 있음
+    → 결합 앙상블이 기준 - tolerance 미만이면 단독 하락이 가장 큰 모델을 다음 트리 수로 올려 재평가
+    """
+    base = rows[0]
+    key = "auc" if base["auc"] is not None else "f1"
+    threshold = meta.get("threshold", 0.5)
+    trees = dict(trees)
+    while True:
+        prob, _ = predict_proba_batch(apply_trees(models, trees), meta, X, num_threads=-1)
+        score = _metrics(prob, y, threshold)[key]
+        if score is not None and score >= base[key] - tolerance:
+            return trees
+        candidates = {}
+        for r in rows[1:]:
+            if r["model"] in trees and r["trees"] == trees[r["model"]] and r["trees"] < r["original_trees"]:
+                candidates[r["model"]] = base[key] - (r[key] if r[key] is not None else -np.inf)
+        if not candidates:
+            return trees
+        name = max(candidates, key=candidates.get)
+        trees[name] = min(r["trees"] for r in rows[1:] if r["model"] == name and r["trees"] > trees[name])
+        print(f"   ↩️ 결합 {key.upper()} {score:.5f} < 기준 {base[key]:.5f} - {tolerance} → {name} 트리 {trees[name]}개로 완화")
+
+
+# ============================================================
+# 💾 내보내기
+# ============================================================
+def export(models: dict, meta: dict, trees: dict, out_dir: str, result: dict, tolerance: float = None) -> dict:
+    """절단한 모델 joblib + model_meta.json (compaction 항목 추가, 버전 접미사 -compact)"""
+    os.makedirs(out_dir, exist_ok=True)
+    kept = {}
+    for name, model in models.items():
+        if not model:
+            continue
+        total = n_trees(name, model)
+        n = min(trees.get(name, total), total)
+        joblib.dump(truncate(name, model, n) if n < total else model, os.path.join(out_dir, MODEL_FILES[name]))
+        kept[name.replace("_model", "")] = {"kept": n, "original": total}
+
+    new_meta = dict(meta)
+    new_meta["version"] = f"{meta.get('version', 'v1')}-compact"
+    new_meta["created_at"] = datetime.now().isoformat()
+    new_meta["compaction"] = {
+        "source_version": meta.get("version"),
+        "trees": kept,
+        "tolerance": tolerance,
+        "baseline": result["baseline"],
+        "compacted": result["compacted"],
+    }
+    with open(os.path.join(out_dir, "model_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(new_meta, f, ensure_ascii=False, indent=2)
+    return new_meta
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    try:
+        from .model_utils import load_local_models
+        from .batch_jobs import get_filesystem
+    except ImportError:
+        from model_utils import load_local_models
+        from batch_jobs import get_filesystem
+
+    parser = argparse.ArgumentParser(description="트리 수 절단 비교표 + 압축 앙상블 내보내기")
+    parser.add_argument("--input", required=True, help="검증 Parquet (meta['features'] 컬럼 + 레이블)")
+    parser.add_argument("--label-column", default="label")
+    parser.add_argument("--model-dir", default=MODEL_CACHE_DIR)
+    parser.add_argument("--max-rows", type=int, default=200_000)
+    parser.add_argument("--tolerance", type=float, default=0.001, help="앙상블 AUC 하락 허용치 (자동 선택)")
+    parser.add_argument("--trees", default=None, help="직접 지정: lgb=N,xgb=N,cat=N (자동 선택 대신)")
+    parser.add_argument("--export", default=None, help="압축 앙상블 저장 디렉터리")
+    parser.add_argument("--report", default=None, help="비교표 CSV 저장 경로")
+    args = parser.parse_args()
+
+    models, meta = load_local_models(args.model_dir)
+    fs, path = get_filesystem(args.input)
+    with fs.open_input_file(path) as f:
+        df = pd.read_parquet(f).head(args.max_rows)
+    X = df[meta["features"]].to_numpy(dtype=float)
+    if args.label_column in df.columns:
+        y = df[args.label_column].to_numpy().astype(int)
+    else:
+        print(f"⚠️ 레이블 컬럼 {args.label_column} 없음 → 전체 트리 앙상블 레이블을 기준으로 평가")
+        y = predict_proba_batch(models, meta, X, num_threads=-1)[1]
+
+    print(f"✂️ {len(X):,}행으로 절단 비교 시작")
+    rows = sweep(models, meta, X, y)
+    pd.set_option("display.width", 200)
+    table = pd.DataFrame(rows)
+    print()
+    print(table.to_string(index=False))
+    if args.report:
+        table.to_csv(args.report, index=False)
+
+    if args.trees:
+        trees = {f"{k.strip()}_model": int(v) for k, v in (kv.split("=") for kv in args.trees.split(","))}
+    else:
+        trees = fit_tolerance(models, meta, X, y, rows, choose_trees(rows, args.tolerance), args.tolerance)
+    compact = apply_trees(models, trees)
+    result = {"baseline": {k: v for k, v in rows[0].items() if k not in ("model", "trees", "original_trees", "model_auc")},
+              "compacted": evaluate(compact, meta, X, y)}
+    print(f"\n🌲 선택된 트리 수: {trees}")
+    print(f"   기준: {result['baseline']}")
+    print(f"   압축: {result['compacted']}")
+
+    if args.export:
+        new_meta = export(models, meta, trees, args.export, result, None if args.trees else args.tolerance)
+        print(f"✅ 압축 앙상블 저장 → {args.export} (버전 {new_meta['version']})")
@@ -0,0 +1,188 @@
+# ============================================================
+# 📡 drift_monitor.py — 서빙 프로세스 내 실시간 드리프트 모니터
+# ============================================================
+import os
+import json
+import bisect
+import numpy as np
+
+try:
+    from .metrics_utils import ShardedMinuteCounters
+except ImportError:
+    from metrics_utils import ShardedMinuteCounters
+
+# save_reference.py 가 만든 기준 분포 요약 (psi_edges / psi_percents)
+PROFILE_BUCKET = os.getenv("DRIFT_PROFILE_BUCKET", "model-logs")
+PROFILE_KEY = os.getenv("DRIFT_PROFILE_KEY", "session-purchase/reference_profile/latest.json")
+PROFILE_FILENAME = "reference_profile.json"
+
+DRIFT_WINDOW_MINUTES = int(os.getenv("DRIFT_WINDOW_MINUTES", "60"))
+
+# 예측 확률 분포는 고정 10구간
+SCORE_EDGES = np.linspace(0.0, 1.0, 11)
+
+
+# ============================================================
+# 📦 기준 분포 요약 로드
+# ============================================================
+def load_reference_profile(local_dir: str, s3_client=None) -> dict:
+    """MinIO(있으면) → 로컬 캐시 순서로 reference_profile.json 로드, 없으면 None"""
+    local_path = os.path.join(local_dir, PROFILE_FILENAME)
+    if s3_client is not None:
+        try:
+            s3_client.download_file(PROFILE_BUCKET, PROFILE_KEY, local_path)
+            print(f"✅ {PROFILE_FILENAME} 다운로드 성공")
+        except Exception as e:
+            print(f"⚠️ {PROFILE_FILENAME} 다운로드 실패 ({e}) → 로컬 캐시 사용 예정")
+
+    if not os.path.exists(local_path):
+        print(f"⚠️ {PROFILE_FILENAME} 없음 → 실시간 드리프트 모니터 비활성화")
+        return None
+    with open(local_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _psi(expected_percents, actual_percents) -> float:
+    """monitoring/monitor_utils.psi_from_percents 와 동일한 계산"""
+    expected_percents = np.where(expected_percents == 0, 1e-6, expected_percents)
+    actual_percents = np.where(actual_percents == 0, 1e-6, actual_percents)
+    return float(np.sum((actual_percents - expected_percents) *
+                        np.log(actual_percents / expected_percents)))
+
+
+def _stability(psi: float) -> str:
+    if psi is None or np.isnan(psi):
+        return None
+    if psi < 0.1:
+        return "✅ Stable"
+    if psi < 0.25:
+        return "⚠️ Moderate Drift"
+    return "🚨 Significant Drift"
+
+
+# ============================================================
+# 📡 실시간 드리프트 모니터
+# ============================================================
+class LiveDriftMonitor:
+    """
+    요청마다 피처/예측확률을 기준 요약의 psi_edges 구간에 누적
+    - 카운터 배열: [피처 F개 + 예측확률 1] × [구간 B개 + 범위밖 + 결측] + 확률합 1칸
+    - 단건은 bisect + 스칼라 증가 (numpy 소배열 연산보다 빠름, 요청당 수 µs)
+    - 배치는 벡터 연산 + bincount
+    """
+
+    def __init__(self, profile: dict, feature_names: list, window_minutes: int = DRIFT_WINDOW_MINUTES):
+        ref = profile.get("features", {})
+        self.profile_version = profile.get("version")
+
+        # 입력 행의 어떤 위치가 어떤 기준 피처인지 (기준 요약에 없는 피처는 제외)
+        self.positions = np.array([i for i, f in enumerate(feature_names)
+                                   if len(ref.get(f, {}).get("psi_edges", [])) >= 2], dtype=np.intp)
+        self.features = [feature_names[i] for i in self.positions]
+        self.unmonitored = [f for f in feature_names if f not in self.features]
+
+        edges = [np.asarray(ref[f]["psi_edges"], dtype=float) for f in self.features] + [SCORE_EDGES]
+        score_ref = ref.get("probability", {})
+        self.expected = [np.asarray(ref[f]["psi_percents"], dtype=float) for f in self.features]
+        self.expected.append(np.asarray(score_ref["psi_percents"], dtype=float)
+                             if "psi_percents" in score_ref and len(score_ref["psi_percents"]) == 10 else None)
+
+        self.n_bins = [len(e) - 1 for e in edges]
+        n_rows = len(edges)
+        self.row_width = max(self.n_bins) + 2           # 구간 + 범위밖 + 결측
+        self.out_col = self.row_width - 2
+        self.nan_col = self.row_width - 1
+
+        # 내부 경계 (e1 .. e_{k-1}), 남는 칸은 +inf → x >= inner 개수가 곧 구간 번호
+        self.inner = np.full((n_rows, self.row_width - 3), np.inf)
+        for r, e in enumerate(edges):
+            self.inner[r, :len(e) - 2] = e[1:-1]
+        self.lo = np.array([e[0] for e in edges])
+        self.hi = np.array([e[-1] for e in edges])
+        self.row_offsets = np.arange(n_rows) * self.row_width
+        self.sum_index = n_rows * self.row_width        # 예측확률 합계 위치
+
+        # 단건 기록용 파이썬 리스트 사본
+        self._rows = [(int(off), e[1:-1].tolist(), float(e[0]), float(e[-1]))
+                      for off, e in zip(self.row_offsets, edges)]
+        self._positions = self.positions.tolist()
+
+        self.counters = ShardedMinuteCounters("drift", self.sum_index + 1, window_minutes)
+        self.counters.start_publisher()
+
+    # --------------------------------------------------------
+    # ✍️ 기록
+    # --------------------------------------------------------
+    def _bin_index(self, values: np.ndarray) -> np.ndarray:
+        """values[..., rows] → 카운터 평면 인덱스"""
+        idx = (values[..., None] >= self.inner).sum(axis=-1)
+        idx = np.where((values < self.lo) | (values > self.hi), self.out_col, idx)
+        idx = np.where(np.isnan(values), self.nan_col, idx)
+        return idx + self.row_offsets
+
+    def record(self, row, probability: float):
+        """단일 요청 기록 (row 는 meta['features'] 순서)"""
+        row = list(row)
+        values = [row[p] for p in self._positions]
+        values.append(probability)
+
+        slot = self.counters.current()
+        out_col, nan_col = self.out_col, self.nan_col
+        for (offset, inner, lo, hi), x in zip(self._rows, values):
+            if x != x:
+                i = nan_col
+            elif x < lo or x > hi:
+                i = out_col
+            else:
+                i = bisect.bisect_right(inner, x)
+            slot[offset + i] += 1
+        slot[self.sum_index] += probability
+
+    def record_batch(self, X: np.ndarray, probabilities: np.ndarray):
+        """배치 요청 기록 (X: [n, F])"""
+        probabilities = np.asarray(probabilities, dtype=float)
+        values = np.column_stack([np.asarray(X, dtype=float)[:, self.positions], probabilities])
+        slot = self.counters.current()
+        slot[:self.sum_index] += np.bincount(self._bin_index(values).ravel(), minlength=self.sum_index)
+        slot[self.sum_index] += probabilities.sum()
+
+    # --------------------------------------------------------
+    # 📊 조회
+    # --------------------------------------------------------
+    def report(self, last_minutes: int) -> dict:
+        """최근 last_minutes 분 동안의 피처별/예측확률 PSI"""
+        totals = self.counters.merged(last_minutes)
+        table = totals[:self.sum_index].reshape(-1, self.row_width)
+        n_requests = int(table[-1].sum())
+
+        features = {}
+        for r, name in enumerate(self.features):
+            features[name] = self._row_report(table[r], self.n_bins[r], self.expected[r])
+
+        score = self._row_report(table[-1], 10, self.expected[-1])
+        score["histogram"] = table[-1][:10].astype(int).tolist()
+        score["mean"] = float(totals[self.sum_index] / n_requests) if n_requests else None
+
+        return {
+            "enabled": True,
+            "profile_version": self.profile_version,
+            "window_minutes": max(1, min(last_minutes, self.counters.window_minutes)),
+            "n_requests": n_requests,
+            "workers": self.counters.n_workers(),
+            "features": features,
+            "unmonitored_features": self.unmonitored,
+            "score": score,
+        }
+
+    def _row_report(self, row: np.ndarray, n_bins: int, expected) -> dict:
+        n_valid = row.sum() - row[self.nan_col]
+        psi = None
+        if expected is not None and n_valid > 0:
+            psi = _psi(expected, row[:n_bins] / n_valid)
+        return {
+            "psi": psi,
+            "stability": _stability(psi),
+            "n": int(row.sum()),
+            "out_of_range": int(row[self.out_col]),
+            "missing": int(row[self.nan_col]),
+        }
@@ -0,0 +1,99 @@
+# ============================================================
+# 📊 kpi_stats.py — 대시보드 KPI 용 분 단위 예측 집계
+# ============================================================
+import os
+import time
+import threading
+from datetime import datetime
+import numpy as np
+
+try:
+    from .metrics_utils import ShardedMinuteCounters, current_minute
+except ImportError:
+    from metrics_utils import ShardedMinuteCounters, current_minute
+
+# 서버 링버퍼 크기: 하루치(1440분) → "오늘 예측 건수"까지 같은 카운터로 계산
+# (대시보드의 조회 구간 KPI_WINDOW_MINUTES 와는 별개)
+KPI_RING_MINUTES = int(os.getenv("KPI_RING_MINUTES", "1440"))
+HIGH_PROB_THRESHOLD = float(os.getenv("KPI_HIGH_PROB_THRESHOLD", "0.7"))
+# 같은 구간 /stats 응답 재사용 시간 (대시보드 수가 늘어도 병합 계산은 이 주기에 1번)
+STATS_CACHE_SEC = float(os.getenv("STATS_CACHE_SEC", "2"))
+
+# 카운터 칸: 예측 건수 / 확률 합 / 고확률 건수 / 구매 예측 건수
+COUNT, PROB_SUM, HIGH, POSITIVE = range(4)
+
+
+class KpiStats:
+    """
+    요청마다 4칸짜리 분 슬롯에 누적 (요청당 스칼라 덧셈 4번)
+    - 조회는 분 버킷 합산이라 트래픽 양과 무관하게 일정 비용
+    """
+
+    def __init__(self, window_minutes: int = KPI_RING_MINUTES):
+        self.counters = ShardedMinuteCounters("kpi", 4, window_minutes)
+        self.counters.start_publisher()
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    # --------------------------------------------------------
+    # ✍️ 기록
+    # --------------------------------------------------------
+    def record(self, probability: float, prediction: int):
+        slot = self.counters.current()
+        slot[COUNT] += 1
+        slot[PROB_SUM] += probability
+        if probability >= HIGH_PROB_THRESHOLD:
+            slot[HIGH] += 1
+        if prediction == 1:
+            slot[POSITIVE] += 1
+
+    def record_batch(self, probabilities: np.ndarray, predictions: np.ndarray):
+        probabilities = np.asarray(probabilities, dtype=float)
+        slot = self.counters.current()
+        slot[COUNT] += len(probabilities)
+        slot[PROB_SUM] += probabilities.sum()
+        slot[HIGH] += int((probabilities >= HIGH_PROB_THRESHOLD).sum())
+        slot[POSITIVE] += int((np.asarray(predictions) == 1).sum())
+
+    # --------------------------------------------------------
+    # 📊 조회
+    # --------------------------------------------------------
+    @staticmethod
+    def _summarize(totals: np.ndarray) -> dict:
+        n = int(totals[COUNT])
+        return {
+            "predictions": n,
+            "mean_probability": float(totals[PROB_SUM] / n) if n else None,
+            "high_prob_count": int(totals[HIGH]),
+            "positive_rate": float(totals[POSITIVE] / n) if n else None,
+        }
+
+    def summary(self, minutes: int) -> dict:
+        """최근 minutes 분 / 직전 같은 길이 구간 / 오늘 누적 (STATS_CACHE_SEC 동안 캐시)"""
+        minutes = max(1, min(minutes, self.counters.window_minutes // 2))
+        now = time.time()
+        with self._cache_lock:
+            cached = self._cache.get(minutes)
+            if cached and now - cached[0] < STATS_CACHE_SEC:
+                return cached[1]
+
+        bucket_minutes, counts = self.counters.per_minute()
+        current = counts[-minutes:].sum(axis=0)
+        previous = counts[-2 * minutes:-minutes].sum(axis=0)
+
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        minutes_today = min(current_minute() - int(midnight.timestamp() // 60) + 1, len(counts))
+        today = counts[-minutes_today:].sum(axis=0)
+
+        result = {
+            "window_minutes": minutes,
+            "current": self._summarize(current),
+            "previous": self._summarize(previous),
+            "today": self._summarize(today),
+            "high_prob_threshold": HIGH_PROB_THRESHOLD,
+            "workers": self.counters.n_workers(),
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._cache_lock:
+            self._cache[minutes] = (now, result)
+        return result
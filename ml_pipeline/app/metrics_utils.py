@@ -0,0 +1,156 @@
+# ============================================================
+# 📈 metrics_utils.py — 분 단위 링버퍼 카운터 (스레드/워커 병합)
+# ============================================================
+import os
+import glob
+import time
+import threading
+import numpy as np
+
+# 워커(프로세스)별 스냅샷을 공유하는 디렉터리 (uvicorn --workers N 대응)
+METRICS_SHARED_DIR = os.getenv("METRICS_SHARED_DIR", "/tmp/purchase-api-metrics")
+PUBLISH_INTERVAL_SEC = float(os.getenv("METRICS_PUBLISH_INTERVAL_SEC", "5"))
+
+
+def current_minute() -> int:
+    return int(time.time() // 60)
+
+
+class _Shard:
+    """스레드 1개가 단독으로 쓰는 카운터 (쓰기 경합 없음)"""
+
+    def __init__(self, window_minutes: int, size: int):
+        self.minutes = np.full(window_minutes, -1, dtype=np.int64)
+        self.counts = np.zeros((window_minutes, size), dtype=np.float64)
+
+
+class ShardedMinuteCounters:
+    """
+    분 단위 링버퍼 카운터
+    - 스레드마다 별도 shard 에 기록 → 요청 경로에 락 없음
+    - 조회 시 shard 합산, 워커 간에는 스냅샷 파일(.npz)로 병합
+    """
+
+    def __init__(self, name: str, size: int, window_minutes: int = 60,
+                 shared_dir: str = METRICS_SHARED_DIR):
+        self.name = name
+        self.size = size
+        self.window_minutes = window_minutes
+        self.shared_dir = shared_dir
+        self._local = threading.local()
+        self._shards = []
+        self._register_lock = threading.Lock()
+        self._publisher = None
+
+    # --------------------------------------------------------
+    # ✍️ 기록 (요청 경로)
+    # --------------------------------------------------------
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(self.window_minutes, self.size)
+            with self._register_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def current(self, minute: int = None) -> np.ndarray:
+        """현재 분 슬롯 (호출 스레드 전용 배열, 바로 += 가능)"""
+        minute = current_minute() if minute is None else minute
+        shard = self._shard()
+        slot = minute % self.window_minutes
+        if shard.minutes[slot] != minute:
+            shard.counts[slot] = 0
+            shard.minutes[slot] = minute
+        return shard.counts[slot]
+
+    # --------------------------------------------------------
+    # 📊 조회
+    # --------------------------------------------------------
+    def local_snapshot(self, now_minute: int = None):
+        """이 워커의 분별 합계 → (minutes, counts[window, size])"""
+        now_minute = current_minute() if now_minute is None else now_minute
+        minutes = np.arange(now_minute - self.window_minutes + 1, now_minute + 1)
+        counts = np.zeros((self.window_minutes, self.size), dtype=np.float64)
+        with self._register_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            valid = (shard.minutes > now_minute - self.window_minutes) & (shard.minutes <= now_minute)
+            if valid.any():
+                counts[shard.minutes[valid] - minutes[0]] += shard.counts[valid]
+        return minutes, counts
+
+    def merged(self, last_minutes: int, include_workers: bool = True) -> np.ndarray:
+        """최근 last_minutes 분 합계 (다른 워커 스냅샷 포함)"""
+        now_minute = current_minute()
+        last_minutes = max(1, min(last_minutes, self.window_minutes))
+        minutes, counts = self.local_snapshot(now_minute)
+        total = counts[-last_minutes:].sum(axis=0)
+
+        if include_workers:
+            lo = now_minute - last_minutes
+            for w_minutes, w_counts in self._other_workers():
+                mask = (w_minutes > lo) & (w_minutes <= now_minute)
+                total += w_counts[mask].sum(axis=0)
+        return total
+
+    def per_minute(self, include_workers: bool = True):
+        """분별 합계 전체 (워커 병합) → (minutes, counts)"""
+        minutes, counts = self.local_snapshot()
+        if include_workers:
+            for w_minutes, w_counts in self._other_workers():
+                mask = (w_minutes >= minutes[0]) & (w_minutes <= minutes[-1])
+                counts[w_minutes[mask] - minutes[0]] += w_counts[mask]
+        return minutes, counts
+
+    def n_workers(self) -> int:
+        return 1 + len(self._other_workers())
+
+    # --------------------------------------------------------
+    # 🔄 워커 간 스냅샷 공유
+    # --------------------------------------------------------
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.shared_dir, f"{self.name}-{pid}.npz")
+
+    def publish(self):
+        """이 워커의 스냅샷 저장 (tmp → rename 으로 원자적 교체)"""
+        os.makedirs(self.shared_dir, exist_ok=True)
+        minutes, counts = self.local_snapshot()
+        path = self._snapshot_path(os.getpid())
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, minutes=minutes, counts=counts)
+        os.replace(tmp, path)
+
+    def _other_workers(self) -> list:
+        snapshots = []
+        stale_before = time.time() - self.window_minutes * 60
+        own = self._snapshot_path(os.getpid())
+        for path in glob.glob(os.path.join(self.shared_dir, f"{self.name}-*.npz")):
+            if path == own or path.endswith(".tmp.npz"):
+                continue
+            try:
+                if os.path.getmtime(path) < stale_before:
+                    continue
+                with np.load(path) as data:
+                    if data["counts"].shape[1] != self.size:
+                        continue
+                    snapshots.append((data["minutes"], data["counts"]))
+            except (OSError, ValueError, KeyError):
+                continue
+        return snapshots
+
+    def start_publisher(self, interval_sec: float = PUBLISH_INTERVAL_SEC):
+        """주기적으로 스냅샷을 저장하는 데몬 스레드 시작"""
+        if self._publisher is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval_sec)
+                try:
+                    self.publish()
+                except Exception as e:
+                    print(f"⚠️ [{self.name}] 메트릭 스냅샷 저장 실패: {e}")
+
+        self._publisher = threading.Thread(target=_loop, name=f"{self.name}-publisher", daemon=True)
+        self._publisher.start()
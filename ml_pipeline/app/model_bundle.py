@@ -0,0 +1,322 @@
+# ============================================================
+# 📦 model_bundle.py — 버전 단위 모델 번들 (manifest + SHA-256 + 멤버 지연 로드)
+# ------------------------------------------------------------
+# python model_bundle.py build --model-dir models_cache --out bundles [--tar]   # → bundles/<version>/ (+ .tar)
+# python model_bundle.py verify bundles/v20251022T081526Z                     # 전체 멤버 해시 검증
+# python model_bundle.py upload bundles/v20251022T081526Z.tar --bucket model-store --prefix session-purchase
+#
+# 번들 = 디렉터리 1개 (전송용으로는 .tar 1개)
+#   manifest.json      format / version / features / threshold / weights / meta 전체 / members{role: path, sha256, size}
+#   lgb_model.joblib, xgb_model.joblib, cat_model.joblib, compiled_ensemble.npz, ensemble.onnx, student_model.npz
+# - 멤버는 처음 사용할 때 해시 검증 후 로드 (백엔드가 쓰지 않는 멤버는 읽지도 않음)
+# - 번들 디렉터리가 있으면 load_local_models / load_scoring_backend / load_cascade 가 파일명 대신 manifest 를 따름
+# ============================================================
+import os
+import json
+import shutil
+import hashlib
+import tarfile
+import argparse
+import threading
+from datetime import datetime
+
+MANIFEST_FILENAME = "manifest.json"
+BUNDLE_FORMAT = 1
+BUNDLE_ARCHIVE_SUFFIX = ".tar"
+
+# 역할 → 파일명 (tree_compiler / onnx_backend / student 의 *_FILENAME 과 같은 이름)
+MEMBER_FILES = {
+    "lgb_model": "lgb_model.joblib",
+    "xgb_model": "xgb_model.joblib",
+    "cat_model": "cat_model.joblib",
+    "compiled": "compiled_ensemble.npz",
+    "onnx": "ensemble.onnx",
+    "student": "student_model.npz",
+}
+# 채점 백엔드별 필요한 멤버 (model_utils.SCORING_BACKENDS)
+BACKEND_MEMBERS = {
+    "native": ["lgb_model", "xgb_model", "cat_model"],
+    "compiled": ["compiled"],
+    "onnx": ["onnx"],
+}
+HASH_CHUNK = 1 << 20
+
+
+class BundleError(RuntimeError):
+    """manifest 없음 / 멤버 없음 / 해시 불일치 / 버전 혼합"""
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_bundle(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILENAME))
+
+
+# ============================================================
+# 📖 읽기
+# ============================================================
+class ModelBundle:
+    """
+    번들 디렉터리 1개
+    - meta: manifest 의 model_meta (기존 model_meta.json 과 같은 형식)
+    - file(role): 해시 검증된 멤버 경로 (검증은 역할당 1회)
+    - load(role): joblib 멤버 로드 (캐시)
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        path = os.path.join(self.root, MANIFEST_FILENAME)
+        if not os.path.exists(path):
+            raise BundleError(f"❌ manifest 없음: {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != BUNDLE_FORMAT:
+            raise BundleError(f"❌ 지원하지 않는 번들 형식: {self.manifest.get('format')}")
+        self.version = self.manifest["version"]
+        self.meta = self.manifest["meta"]
+        self.members = self.manifest["members"]
+        self._verified = set()
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def has(self, role: str) -> bool:
+        return role in self.members
+
+    def file(self, role: str) -> str:
+        if role not in self.members:
+            raise BundleError(f"❌ 번들 {self.version} 에 {role} 멤버가 없습니다")
+        entry = self.members[role]
+        path = os.path.join(self.root, entry["path"])
+        with self._lock:
+            if role not in self._verified:
+                if not os.path.exists(path):
+                    raise BundleError(f"❌ 번들 멤버 파일 없음: {path}")
+                digest = sha256_file(path)
+                if digest != entry["sha256"]:
+                    raise BundleError(f"❌ 해시 불일치: {entry['path']} (manifest {entry['sha256'][:12]}…, 실제 {digest[:12]}…)")
+                self._verified.add(role)
+        return path
+
+    def load(self, role: str):
+        if role not in self._loaded:
+            import joblib
+            self._loaded[role] = joblib.load(self.file(role))
+        return self._loaded[role]
+
+    def verify(self, roles: list = None) -> dict:
+        """전체(또는 지정) 멤버 해시 검증 → {role: "ok" | 오류}"""
+        result = {}
+        for role in roles or list(self.members):
+            try:
+                self.file(role)
+                result[role] = "ok"
+            except BundleError as e:
+                result[role] = str(e)
+        return result
+
+    def models(self) -> dict:
+        """네이티브 모델 dict (load_local_models 와 같은 키, 없는 멤버는 None)"""
+        return {role: self.load(role) if self.has(role) else None for role in BACKEND_MEMBERS["native"]}
+
+
+_OPEN = {}
+
+
+def open_bundle(path: str) -> ModelBundle:
+    """
+    번들 디렉터리 또는 .tar → ModelBundle (같은 경로는 프로세스당 1번만 읽음)
+    - .tar 는 옆 디렉터리(확장자 제외 이름)로 풀어서 사용 (이미 같은 manifest 로 풀려 있으면 재사용)
+    """
+    path = os.path.abspath(path)
+    if path not in _OPEN:
+        root = os.path.abspath(extract_archive(path)) if path.endswith(BUNDLE_ARCHIVE_SUFFIX) else path
+        if root not in _OPEN:
+            _OPEN[root] = ModelBundle(root)
+        _OPEN[path] = _OPEN[root]
+    return _OPEN[path]
+
+
+def member_path(model_dir: str, role: str) -> str:
+    """model_dir 이 번들이면 검증된 멤버 경로 (없으면 None), 아니면 기존 파일명 경로"""
+    if is_bundle(model_dir):
+        bundle = open_bundle(model_dir)
+        return bundle.file(role) if bundle.has(role) else None
+    return os.path.join(model_dir, MEMBER_FILES[role])
+
+
+# ============================================================
+# 🗜️ 아카이브 (전송 단위 1개)
+# ============================================================
+def pack_archive(bundle_dir: str, out_path: str = None) -> str:
+    """번들 디렉터리 → .tar (manifest 를 맨 앞에, 압축 없음 — 모델 파일은 이미 압축된 형식)"""
+    bundle = ModelBundle(bundle_dir)
+    out_path = out_path or bundle.root.rstrip("/") + BUNDLE_ARCHIVE_SUFFIX
+    tmp = out_path + ".tmp"
+    with tarfile.open(tmp, "w") as tar:
+        tar.add(os.path.join(bundle.root, MANIFEST_FILENAME), arcname=MANIFEST_FILENAME)
+        for entry in bundle.members.values():
+            tar.add(os.path.join(bundle.root, entry["path"]), arcname=entry["path"])
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def extract_archive(archive_path: str, out_dir: str = None) -> str:
+    """.tar → 디렉터리 (manifest 에 없는 경로 / 디렉터리 밖 경로는 거부), 풀린 디렉터리 경로"""
+    out_dir = out_dir or archive_path[:-len(BUNDLE_ARCHIVE_SUFFIX)]
+    with tarfile.open(archive_path, "r") as tar:
+        manifest = json.load(tar.extractfile(MANIFEST_FILENAME))
+        allowed = {MANIFEST_FILENAME} | {e["path"] for e in manifest["members"].values()}
+        existing = os.path.join(out_dir, MANIFEST_FILENAME)
+        if os.path.exists(existing):
+            with open(existing, "r", encoding="utf-8") as f:
+                if json.load(f) == manifest:
+                    return out_dir
+        # 워커 프로세스가 동시에 풀어도 서로의 임시 디렉터리를 건드리지 않도록 pid 별
+        tmp = f"{out_dir}.extracting-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for m in tar.getmembers():
+            if m.name not in allowed or not m.isfile() or os.path.isabs(m.name) or ".." in m.name.split("/"):
+                raise BundleError(f"❌ 번들 아카이브에 허용되지 않은 항목: {m.name}")
+            with tar.extractfile(m) as src, open(os.path.join(tmp, m.name), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+    if os.path.exists(existing):
+        with open(existing, "r", encoding="utf-8") as f:
+            if json.load(f) == manifest:
+                shutil.rmtree(tmp, ignore_errors=True)
+                return out_dir
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp, out_dir)
+    return out_dir
+
+
+def download_bundle(s3_client, bucket: str, key: str, local_dir: str) -> ModelBundle:
+    """MinIO 의 번들 .tar 1개 → local_dir 에 저장/해제 → ModelBundle (부분 동기화로 버전이 섞이지 않음)"""
+    os.makedirs(local_dir, exist_ok=True)
+    local_path = os.path.join(local_dir, os.path.basename(key))
+    tmp = f"{local_path}.download-{os.getpid()}"
+    s3_client.download_file(bucket, key, tmp)
+    os.replace(tmp, local_path)
+    print(f"✅ 번들 다운로드 성공: s3://{bucket}/{key}")
+    return open_bundle(local_path)
+
+
+# ============================================================
+# 🛠️ 생성
+# ============================================================
+def _source_version(role: str, path: str):
+    """변환 산출물에 기록된 원본 모델 버전 (확인할 수 없으면 None)"""
+    if role in ("compiled", "student"):
+        import numpy as np
+        with np.load(path, allow_pickle=False) as z:
+            info = json.loads(str(z["info"]))
+        return info.get("student", {}).get("teacher_version") if role == "student" else info.get("version")
+    if role == "onnx":
+        try:
+            import onnx
+        except ImportError:
+            return None
+        props = {p.key: p.value for p in onnx.load(path, load_external_data=False).metadata_props}
+        return json.loads(props.get("ensemble_info", "{}")).get("version")
+    return None
+
+
+def build_bundle(model_dir: str, out_root: str, roles: list = None, allow_mismatch: bool = False) -> str:
+    """
+    model_dir 의 개별 파일들 → out_root/<version>/ 번들 디렉터리
+    - 변환 산출물(compiled / onnx / student)의 원본 버전이 model_meta.json 과 다르면 거부 (allow_mismatch 시 제외)
+    - 같은 버전 디렉터리가 이미 있으면 거부 (번들은 불변)
+    """
+    with open(os.path.join(model_dir, "model_meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    version = meta.get("version", "v1")
+    out_dir = os.path.join(out_root, version)
+    if os.path.exists(out_dir):
+        raise BundleError(f"❌ 이미 있는 번들 버전: {out_dir}")
+
+    members = {}
+    for role in roles or list(MEMBER_FILES):
+        src = os.path.join(model_dir, MEMBER_FILES[role])
+        if not os.path.exists(src):
+            continue
+        source_version = _source_version(role, src)
+        if source_version is not None and source_version != version:
+            msg = f"{MEMBER_FILES[role]} 원본 버전 {source_version} ≠ model_meta.json {version}"
+            if not allow_mismatch:
+                raise BundleError(f"❌ {msg}")
+            print(f"⚠️ {msg} → 제외")
+            continue
+        members[role] = {"path": MEMBER_FILES[role], "sha256": sha256_file(src), "size": os.path.getsize(src)}
+    if not any(r in members for r in BACKEND_MEMBERS["native"] + ["compiled", "onnx"]):
+        raise BundleError(f"❌ 번들에 넣을 모델이 없습니다: {model_dir}")
+
+    tmp = out_dir + ".building"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for entry in members.values():
+        shutil.copy2(os.path.join(model_dir, entry["path"]), os.path.join(tmp, entry["path"]))
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "features": meta.get("features"),
+        "threshold": meta.get("threshold", 0.5),
+        "weights": meta.get("weights"),
+        "backends": [b for b, rs in BACKEND_MEMBERS.items() if any(r in members for r in rs)],
+        "members": members,
+        "meta": meta,
+    }
+    with open(os.path.join(tmp, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out_dir)
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="모델 번들 생성 / 검증 / 업로드")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="models_cache → 번들 디렉터리")
+    p_build.add_argument("--model-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models_cache"))
+    p_build.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "bundles"))
+    p_build.add_argument("--tar", action="store_true", help="전송용 .tar 도 생성")
+    p_build.add_argument("--allow-mismatch", action="store_true", help="버전이 다른 변환 산출물은 제외하고 진행")
+    p_verify = sub.add_parser("verify", help="번들 디렉터리 / .tar 전체 해시 검증")
+    p_verify.add_argument("path")
+    p_upload = sub.add_parser("upload", help="번들 .tar → MinIO <prefix>/bundles/")
+    p_upload.add_argument("path")
+    p_upload.add_argument("--bucket", default=os.getenv("BUCKET", "model-store"))
+    p_upload.add_argument("--prefix", default=os.getenv("PREFIX", "session-purchase"))
+    args = parser.parse_args()
+
+    if args.command == "build":
+        try:
+            out_dir = build_bundle(args.model_dir, args.out, allow_mismatch=args.allow_mismatch)
+        except BundleError as e:
+            print(e)
+            raise SystemExit(1)
+        bundle = ModelBundle(out_dir)
+        print(f"✅ 번들 생성 → {out_dir} (멤버 {list(bundle.members)}, 백엔드 {bundle.manifest['backends']})")
+        if args.tar:
+            print(f"🗜️ 아카이브 → {pack_archive(out_dir)}")
+    elif args.command == "verify":
+        bundle = open_bundle(args.path)
+        result = bundle.verify()
+        for role, status in result.items():
+            print(f"   {role:>10}: {status}")
+        bad = [r for r, s in result.items() if s != "ok"]
+        print(f"{'❌' if bad else '✅'} {bundle.version}: {len(result) - len(bad)}/{len(result)} 멤버 검증 통과")
+        raise SystemExit(1 if bad else 0)
+    else:
+        try:
+            from .model_utils import minio_client
+        except ImportError:
+            from model_utils import minio_client
+        key = f"{args.prefix}/bundles/{os.path.basename(args.path)}"
+        minio_client(os.getenv("MINIO_ENDPOINT", "")).upload_file(args.path, args.bucket, key)
+        print(f"✅ 업로드 완료 → s3://{args.bucket}/{key}")
@@ -2,7 +2,8 @@ import os
 import json
 import joblib
 from typing import Dict, Any
-import boto3
+import numpy as np
+import pandas as pd
 
 # ===========================
 # 📍 경로 설정 (Render & Local 겸용)
@@ -12,18 +13,40 @@ MODEL_CACHE_DIR = os.path.join(BASE_DIR, "models_cache")
 os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
 
 
+def _is_bundle(model_dir: str) -> bool:
+    try:
+        from .model_bundle import is_bundle
+    except ImportError:
+        from model_bundle import is_bundle
+    return is_bundle(model_dir)
+
+
+def _open_bundle(path: str):
+    try:
+        from .model_bundle import open_bundle
+    except ImportError:
+        from model_bundle import open_bundle
+    return open_bundle(path)
+
+
 # ===========================
 # 📦 로컬 모델 로드 함수
 # ===========================
-def load_local_models() -> tuple:
-    """로컬 캐시에서 모델 로드 후 (models, meta) 튜플 반환"""
+def load_local_models(model_dir: str = MODEL_CACHE_DIR) -> tuple:
+    """로컬 캐시에서 모델 로드 후 (models, meta) 튜플 반환 (model_dir 이 번들이면 manifest 기준, 해시 검증)"""
     print("💡 Loading models from local cache...")
 
     try:
-        lgb_path = os.path.join(MODEL_CACHE_DIR, "lgb_model.joblib")
-        xgb_path = os.path.join(MODEL_CACHE_DIR, "xgb_model.joblib")
-        cat_path = os.path.join(MODEL_CACHE_DIR, "cat_model.joblib")
-        meta_path = os.path.join(MODEL_CACHE_DIR, "model_meta.json")
+        if _is_bundle(model_dir):
+            bundle = _open_bundle(model_dir)
+            models = bundle.models()
+            print(f"✅ 번들 모델 로드 완료 ({bundle.version})")
+            return models, bundle.meta
+
+        lgb_path = os.path.join(model_dir, "lgb_model.joblib")
+        xgb_path = os.path.join(model_dir, "xgb_model.joblib")
+        cat_path = os.path.join(model_dir, "cat_model.joblib")
+        meta_path = os.path.join(model_dir, "model_meta.json")
 
         models = {
             "lgb_model": joblib.load(lgb_path),
@@ -35,7 +58,7 @@ def load_local_models() -> tuple:
             meta = json.load(f)
 
         print("✅ 로컬 모델 로드 완료")
-        return models, meta   # ✅ 튜플 반환으로 변경
+        return models, meta
     except Exception as e:
         raise RuntimeError(f"❌ 로컬 모델 로드 실패: {e}")
 
@@ -43,6 +66,31 @@ def load_local_models() -> tuple:
 # ===========================
 # ☁️ MinIO에서 모델 로드
 # ===========================
+def minio_client(endpoint: str):
+    """MinIO S3 클라이언트 생성 (boto3 는 서빙 환경에만 있으므로 지연 import)"""
+    import boto3
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
+        aws_secret_access_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
+        region_name="us-east-1",
+    )
+
+
+def download_from_minio(endpoint: str, bucket: str, prefix: str, files: list, local_dir: str = MODEL_CACHE_DIR):
+    """prefix 아래 파일들을 local_dir 로 다운로드 (실패한 파일은 로컬 캐시 사용)"""
+    s3_client = minio_client(endpoint)
+    for fname in files:
+        s3_key = f"{prefix}/{fname}"
+        local_path = os.path.join(local_dir, fname)
+        try:
+            s3_client.download_file(bucket, s3_key, local_path)
+            print(f"✅ {fname} 다운로드 성공")
+        except Exception as e:
+            print(f"⚠️ {fname} 다운로드 실패 ({e}) → 로컬 캐시 사용 예정")
+
+
 def load_models_from_minio(endpoint: str, bucket: str, prefix: str, local_dir: str = MODEL_CACHE_DIR):
     """MinIO에서 모델 다운로드 후 (models, meta) 반환"""
     print("📥 MinIO에서 모델 다운로드 시도 중...")
@@ -50,98 +98,197 @@ def load_models_from_minio(endpoint: str, bucket: str, prefix: str, local_dir: s
     try:
         if not endpoint:
             print("⚠️ MinIO endpoint가 설정되지 않음 → 로컬 캐시 사용 예정")
-            return load_local_models()
-
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=endpoint,
-            aws_access_key_id=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
-            aws_secret_access_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
-            region_name="us-east-1",
-        )
+            return load_local_models(local_dir)
 
         model_files = ["lgb_model.joblib", "xgb_model.joblib", "cat_model.joblib", "model_meta.json"]
-        for fname in model_files:
-            s3_key = f"{prefix}/{fname}"
-            local_path = os.path.join(local_dir, fname)
-            try:
-                s3_client.download_file(bucket, s3_key, local_path)
-                print(f"✅ {fname} 다운로드 성공")
-            except Exception as e:
-                print(f"⚠️ {fname} 다운로드 실패 ({e}) → 로컬 캐시 사용 예정")
+        download_from_minio(endpoint, bucket, prefix, model_files, local_dir)
 
         # ✅ 로컬 캐시로부터 다시 로드
-        return load_local_models()  # (models, meta) 튜플 반환
+        return load_local_models(local_dir)
     except Exception as e:
         print(f"❌ MinIO 로드 중 오류 발생: {e}")
         print("⚠️ 로컬 캐시 모델로 대체합니다.")
-        return load_local_models()
+        return load_local_models(local_dir)
+
 
 # ===========================
-# 🧠 개별 모델 예측 유틸
+# 🧩 feature 이름 자동 매핑
 # ===========================
-def predict_proba(models: Dict[str, Any], meta: Dict[str, Any], df):
+_LOGGED = set()
+
+
+def _log_once(key, message: str):
+    """같은 입력 컬럼 구성에 대한 안내는 프로세스당 1번만 출력 (요청 경로에서 매번 출력하지 않음)"""
+    if key not in _LOGGED:
+        _LOGGED.add(key)
+        print(message)
+
+
+def align_feature_names(df, meta):
     """
-    여러 모델의 예측 확률 평균을 계산하고, threshold 기준으로 최종 레이블 반환
-    FastAPI의 /predict 엔드포인트에서 사용
+    입력 DataFrame 컬럼명을 meta['features']에 정의된 실제 학습 피처명으로 매핑
     """
-    preds = []
-    try:
-        # ✅ 메타 정보에 있는 feature만 남기기 (중복/파생 변수 제거)
-        if "features" in meta and isinstance(meta["features"], list):
-            feature_cols = [f for f in meta["features"] if f in df.columns]
-            df = df[feature_cols]
-            print(f"[DEBUG] 사용된 feature 컬럼 ({len(df.columns)}개): {list(df.columns)}")
-        else:
-            print("⚠️ meta['features']가 정의되어 있지 않아 전체 feature 사용")
+    expected_features = meta.get("features")
 
-        # ✅ 모델별 예측 수행
-        if "lgb_model" in models and models["lgb_model"]:
-            preds.append(models["lgb_model"].predict_proba(df)[:, 1])
-        if "xgb_model" in models and models["xgb_model"]:
-            preds.append(models["xgb_model"].predict_proba(df)[:, 1])
-        if "cat_model" in models and models["cat_model"]:
-            preds.append(models["cat_model"].predict_proba(df)[:, 1])
+    if expected_features and list(df.columns) == list(expected_features):
+        return df
 
-        if not preds:
-            raise ValueError("❌ 사용할 수 있는 모델이 없습니다.")
+    if expected_features and len(expected_features) == df.shape[1]:
+        old_cols = list(df.columns)
+        df.columns = expected_features
+        _log_once(("rename", tuple(old_cols)), f"✅ 입력 피처명 매핑 완료:\n   {old_cols} → {expected_features}")
+    else:
+        _log_once(("skip", tuple(df.columns)), "⚠️ meta['features'] 정보가 없거나 수 불일치로 rename 생략")
 
-        # ✅ 평균 확률 계산 + threshold 비교
-        avg_prob = sum(preds) / len(preds)
-        threshold = meta.get("threshold", 0.5)
-        pred_label = int(avg_prob[0] >= threshold)
+    return df
 
-        return avg_prob[0], pred_label
 
-    except Exception as e:
-        raise RuntimeError(f"❌ predict_proba 실행 중 오류 발생: {e}")
 # ===========================
-# 🧩 평균 확률 + 최종 예측 반환 (FastAPI용)
+# 🧠 앙상블 예측 유틸
 # ===========================
-def predict_proba(models: Dict[str, Any], meta: Dict[str, Any], df):
+def positive_proba(name: str, model, X, num_threads: int = 1):
     """
-    여러 모델의 예측 확률 평균을 계산하고, threshold 기준으로 최종 레이블 반환
-    FastAPI의 /predict 엔드포인트에서 사용
+    모델 1개의 양성 확률
+    - DataFrame: sklearn 래퍼 predict_proba (피처명 검증 포함)
+    - ndarray (meta['features'] 순서): 네이티브 부스터 직접 호출 → 래퍼 검증 생략, 단건 기준 수십~수백 µs
+    - num_threads: 네이티브 경로 스레드 수 (단건은 1, 대량 배치는 -1 = 전체 코어)
+    """
+    if isinstance(X, pd.DataFrame):
+        return model.predict_proba(X)[:, 1]
+
+    if name == "lgb_model" and hasattr(model, "booster_"):
+        return model.booster_.predict(X, num_threads=max(num_threads, 0))
+    if name == "xgb_model" and hasattr(model, "get_booster"):
+        best = getattr(model, "best_iteration", None)
+        iteration_range = (0, best + 1) if best is not None else (0, 0)
+        return model.get_booster().inplace_predict(X, iteration_range=iteration_range)
+    if name == "cat_model":
+        return model.predict(X, prediction_type="Probability", thread_count=num_threads)[:, 1]
+    return model.predict_proba(X)[:, 1]
+
+
+def predict_proba_batch(models: Dict[str, Any], meta: Dict[str, Any], X, num_threads: int = 1):
     """
+    여러 행을 한 번에 예측 → (확률 배열, 레이블 배열)
+    - X: DataFrame (컬럼명은 meta['features'] 로 매핑) 또는 meta['features'] 순서의 2차원 ndarray
+    - 모델 호출은 행 수와 무관하게 모델당 1회
+    """
+    if isinstance(X, pd.DataFrame):
+        X = align_feature_names(X, meta)
+    else:
+        X = np.asarray(X, dtype=float)
+
     preds = []
+    for name in ("lgb_model", "xgb_model", "cat_model"):
+        if models.get(name):
+            preds.append(positive_proba(name, models[name], X, num_threads))
 
-    try:
-        if "lgb_model" in models and models["lgb_model"]:
-            preds.append(models["lgb_model"].predict_proba(df)[:, 1])
-        if "xgb_model" in models and models["xgb_model"]:
-            preds.append(models["xgb_model"].predict_proba(df)[:, 1])
-        if "cat_model" in models and models["cat_model"]:
-            preds.append(models["cat_model"].predict_proba(df)[:, 1])
+    if not preds:
+        raise ValueError("❌ 사용할 수 있는 모델이 없습니다.")
 
-        if not preds:
-            raise ValueError("❌ 사용할 수 있는 모델이 없습니다.")
+    avg_prob = sum(preds) / len(preds)
+    threshold = meta.get("threshold", 0.5)
+    return avg_prob, (avg_prob >= threshold).astype(int)
 
-        # 평균 확률 계산
-        avg_prob = sum(preds) / len(preds)
-        threshold = meta.get("threshold", 0.5)
-        pred_label = int(avg_prob[0] >= threshold)
 
-        return avg_prob[0], pred_label
+def predict_proba(models: Dict[str, Any], meta: Dict[str, Any], df):
+    """
+    여러 모델의 예측 확률 평균을 계산하고, threshold 기준으로 최종 레이블 반환
+    FastAPI의 /predict 엔드포인트에서 사용 (df: DataFrame 또는 meta['features'] 순서 ndarray 1행)
+    """
+    try:
+        avg_prob, labels = predict_proba_batch(models, meta, df)
+        return avg_prob[0], int(labels[0])
 
     except Exception as e:
+        print(f"❌ predict_proba 내부 오류: {e}")
         raise RuntimeError(f"❌ predict_proba 실행 중 오류 발생: {e}")
+
+
+# ===========================
+# 🔀 채점 백엔드 선택
+# ===========================
+SCORING_BACKENDS = ("native", "compiled", "onnx")
+
+
+def resolve_model_dir(bundle: str, model_dir: str = MODEL_CACHE_DIR, endpoint: str = "",
+                      bucket: str = "", prefix: str = "") -> str:
+    """
+    MODEL_BUNDLE 값 → 사용할 모델 디렉터리
+    - 비어 있으면 model_dir 그대로 (개별 파일 또는 이미 번들인 디렉터리)
+    - 로컬 경로(번들 디렉터리 / .tar)면 그대로 열기, 아니면 MinIO 의 <prefix>/<bundle> 객체 1개를 내려받아 해제
+    """
+    if not bundle:
+        return model_dir
+    if os.path.exists(bundle):
+        return _open_bundle(bundle).root
+    if not endpoint:
+        raise RuntimeError(f"❌ 번들 경로가 없고 MinIO endpoint 도 설정되지 않음: {bundle}")
+    try:
+        from .model_bundle import download_bundle
+    except ImportError:
+        from model_bundle import download_bundle
+    return download_bundle(minio_client(endpoint), bucket, f"{prefix}/{bundle}", model_dir).root
+
+
+def load_scoring_backend(backend: str, model_dir: str = MODEL_CACHE_DIR,
+                         endpoint: str = "", bucket: str = "", prefix: str = "") -> tuple:
+    """
+    (models, meta, predict_batch_fn) 반환 — predict_batch_fn(models, meta, X, num_threads=1) → (확률, 레이블)
+    - native: joblib 부스터 3개 + predict_proba_batch
+    - compiled: compiled_ensemble.npz (tree_compiler.py 로 생성) + NumPy 평가기
+    - onnx: ensemble.onnx (onnx_backend.py 로 생성) + ONNX Runtime CPU
+    - compiled / onnx 는 meta 와 변환 산출물만 읽음 → lightgbm / xgboost / catboost 를 import 하지 않음, models = {}
+    - model_dir 이 번들이면 MinIO 개별 파일 동기화 없이 번들의 해당 백엔드 멤버만 검증 후 로드
+    """
+    if backend not in SCORING_BACKENDS:
+        raise ValueError(f"❌ 알 수 없는 SCORING_BACKEND: {backend} (가능: {SCORING_BACKENDS})")
+    bundle = _open_bundle(model_dir) if _is_bundle(model_dir) else None
+
+    if backend == "native":
+        if endpoint and bundle is None:
+            models, meta = load_models_from_minio(endpoint, bucket, prefix, model_dir)
+        else:
+            models, meta = load_local_models(model_dir)
+        return models, meta, predict_proba_batch
+
+    if backend == "compiled":
+        try:
+            from .tree_compiler import CompiledEnsemble, COMPILED_FILENAME as artifact
+        except ImportError:
+            from tree_compiler import CompiledEnsemble, COMPILED_FILENAME as artifact
+    else:
+        try:
+            from .onnx_backend import OnnxEnsemble, ONNX_FILENAME as artifact
+        except ImportError:
+            from onnx_backend import OnnxEnsemble, ONNX_FILENAME as artifact
+
+    if bundle is not None:
+        meta = bundle.meta
+        path = bundle.file(backend)
+    else:
+        if endpoint:
+            download_from_minio(endpoint, bucket, prefix, [artifact, "model_meta.json"], model_dir)
+        with open(os.path.join(model_dir, "model_meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        path = os.path.join(model_dir, artifact)
+        if not os.path.exists(path):
+            raise RuntimeError(f"❌ {backend} 백엔드 산출물이 없습니다: {path}")
+
+    if backend == "compiled":
+        ensemble = CompiledEnsemble.load(path)
+
+        def predict_batch(models, meta, X, num_threads: int = 1):
+            return ensemble.predict(np.asarray(X, dtype=float))
+    else:
+        ensemble = OnnxEnsemble(path)
+
+        def predict_batch(models, meta, X, num_threads: int = 1):
+            return ensemble.predict(X, num_threads)
+
+    predict_batch.info = ensemble.info
+    if ensemble.info.get("version") != meta.get("version"):
+        raise RuntimeError(f"❌ {artifact} 버전({ensemble.info.get('version')})이 model_meta.json({meta.get('version')})과 "
+                           f"다릅니다 → 현재 모델로 다시 생성하세요")
+    print(f"✅ {backend} 백엔드 로드 완료 ({artifact}, 가중치 {ensemble.info.get('weights')})")
+    return {}, meta, predict_batch
@@ -0,0 +1,240 @@
+# ============================================================
+# 🧊 onnx_backend.py — 앙상블 → 단일 ONNX 그래프 + ONNX Runtime(CPU) 채점
+# ------------------------------------------------------------
+# python onnx_backend.py                       # models_cache → ensemble.onnx + 일치 검증
+# python onnx_backend.py --model-dir ../models --weights meta
+#
+# - 내보내기(이 파일의 __main__)에만 onnx / onnxmltools 필요, 서빙(OnnxEnsemble)은 onnxruntime 만 사용
+# ============================================================
+import os
+import json
+import argparse
+import tempfile
+import numpy as np
+
+try:
+    from .model_utils import MODEL_CACHE_DIR
+except ImportError:
+    from model_utils import MODEL_CACHE_DIR
+
+ONNX_FILENAME = "ensemble.onnx"
+ONNX_OPSET = 15
+ONNX_ML_OPSET = 2
+INPUT_NAME = "input"
+# 단건/소배치 세션 스레드 수 (대량 채점은 num_threads != 1 일 때 전체 코어 세션을 따로 생성)
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "1"))
+
+MODEL_PREFIX = {"lgb_model": "lgb_", "xgb_model": "xgb_", "cat_model": "cat_"}
+
+
+# ============================================================
+# 📦 모델별 ONNX 변환 → (ModelProto, 입력 이름, 확률 텐서[N,2] 이름)
+# ============================================================
+def _lgb_onnx(model, n_features: int):
+    import onnxmltools
+    from onnxmltools.convert.common.data_types import FloatTensorType
+    onx = onnxmltools.convert_lightgbm(model, initial_types=[(INPUT_NAME, FloatTensorType([None, n_features]))],
+                                       target_opset=ONNX_OPSET, zipmap=False)
+    return onx, INPUT_NAME, "probabilities"
+
+
+def _xgb_onnx(model, n_features: int):
+    import xgboost
+    import onnxmltools
+    from onnxmltools.convert.common.data_types import FloatTensorType
+    # 변환기는 f0, f1 ... 형식의 피처명만 해석 → 피처명을 지운 복사본을 다시 로드해서 변환
+    booster = model.get_booster().copy()
+    booster.feature_names = None
+    best = getattr(model, "best_iteration", None)
+    if best is not None:
+        booster = booster[: best + 1]
+    clf = xgboost.XGBClassifier()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "xgb.json")
+        booster.save_model(path)
+        clf.load_model(path)
+    onx = onnxmltools.convert_xgboost(clf, initial_types=[(INPUT_NAME, FloatTensorType([None, n_features]))],
+                                      target_opset=ONNX_OPSET)
+    return onx, INPUT_NAME, "probabilities"
+
+
+def _cat_onnx(model, n_features: int):
+    import onnx
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cat.onnx")
+        model.save_model(path, format="onnx")
+        onx = onnx.load(path)
+    # ZipMap(확률 → 딕셔너리 목록) 제거 → TreeEnsembleClassifier 의 확률 텐서를 그대로 사용
+    zipmaps = [n for n in onx.graph.node if n.op_type == "ZipMap"]
+    prob = zipmaps[0].input[0] if zipmaps else "probabilities"
+    for n in zipmaps:
+        onx.graph.node.remove(n)
+    return onx, onx.graph.input[0].name, prob
+
+
+# ============================================================
+# 🧱 단일 그래프로 결합
+# ============================================================
+def export_ensemble(models: dict, meta: dict, weights: dict = None):
+    """
+    세 모델 → 하나의 ONNX 그래프
+    - 입력: input float32[N, F] (meta['features'] 순서)
+    - 출력: probability float32[N] (모델별 양성 확률 가중 평균), label int64[N] (probability >= threshold)
+    - weights: None 이면 균등 평균 (predict_proba_batch 와 동일), {"lgb": 0.4, ...} 이면 가중 평균
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    from onnx.compose import add_prefix
+
+    n_features = len(meta.get("features") or [])
+    nodes, inits, names, parts = [], [], [], []
+    for name, convert in (("lgb_model", _lgb_onnx), ("xgb_model", _xgb_onnx), ("cat_model", _cat_onnx)):
+        model = models.get(name)
+        if not model:
+            continue
+        onx, in_name, prob_name = convert(model, n_features)
+        p = MODEL_PREFIX[name]
+        onx = add_prefix(onx, p)
+        nodes.append(helper.make_node("Identity", [INPUT_NAME], [p + in_name], name=p + "feed"))
+        nodes.extend(onx.graph.node)
+        inits.extend(onx.graph.initializer)
+        # 확률 텐서 [N, 2] 의 양성 열 → [N]
+        nodes.append(helper.make_node("Gather", [p + prob_name, "positive_index"], [p + "positive"],
+                                      name=p + "positive", axis=1))
+        names.append(name)
+        parts.append(p + "positive")
+
+    if not names:
+        raise ValueError("❌ 내보낼 모델이 없습니다.")
+
+    w = np.ones(len(names))
+    if weights:
+        w = np.array([float(weights.get(n.replace("_model", ""), 1.0)) for n in names])
+    w = w / w.sum()
+
+    inits += [
+        numpy_helper.from_array(np.array(1, dtype=np.int64), "positive_index"),
+        numpy_helper.from_array(np.array(meta.get("threshold", 0.5), dtype=np.float32), "threshold"),
+    ]
+    weighted = []
+    for part, wi in zip(parts, w):
+        inits.append(numpy_helper.from_array(np.array(wi, dtype=np.float32), part + "_weight"))
+        nodes.append(helper.make_node("Mul", [part, part + "_weight"], [part + "_weighted"]))
+        weighted.append(part + "_weighted")
+    nodes += [
+        helper.make_node("Sum", weighted, ["probability"], name="blend"),
+        helper.make_node("GreaterOrEqual", ["probability", "threshold"], ["is_positive"]),
+        helper.make_node("Cast", ["is_positive"], ["label"], to=TensorProto.INT64),
+    ]
+
+    graph = helper.make_graph(
+        nodes, "purchase_ensemble",
+        [helper.make_tensor_value_info(INPUT_NAME, TensorProto.FLOAT, [None, n_features])],
+        [helper.make_tensor_value_info("probability", TensorProto.FLOAT, [None]),
+         helper.make_tensor_value_info("label", TensorProto.INT64, [None])],
+        initializer=inits,
+    )
+    onx = helper.make_model(graph, opset_imports=[helper.make_opsetid("", ONNX_OPSET),
+                                                  helper.make_opsetid("ai.onnx.ml", ONNX_ML_OPSET)],
+                            producer_name="purchase-prediction")
+    onx.ir_version = 8
+    info = {
+        "models": names,
+        "features": meta.get("features"),
+        "threshold": meta.get("threshold", 0.5),
+        "version": meta.get("version"),
+        "weights": "meta" if weights else "equal",
+        "model_weight": [round(float(x), 6) for x in w],
+    }
+    helper.set_model_props(onx, {"ensemble_info": json.dumps(info, ensure_ascii=False)})
+    onnx.checker.check_model(onx)
+    return onx
+
+
+# ============================================================
+# ⚡ ONNX Runtime 채점기 (서빙용)
+# ============================================================
+class OnnxEnsemble:
+    """
+    ensemble.onnx 1개를 CPU 세션으로 실행
+    - predict(X) → (확률 배열, 레이블 배열): predict_proba_batch 와 같은 반환 형식
+    - 입력은 float32 로 변환 (부스터 내부 비교도 float32 기준이라 레이블은 그대로, 확률은 ~1e-7 차이)
+    """
+
+    def __init__(self, path: str, num_threads: int = ONNX_NUM_THREADS):
+        import onnxruntime as ort
+        self._ort = ort
+        self.path = path
+        self._sessions = {}
+        self.session = self._session(num_threads)
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.info = json.loads(meta.get("ensemble_info", "{}"))
+        self.threshold = self.info.get("threshold", 0.5)
+        self.n_features = self.session.get_inputs()[0].shape[1]
+
+    def _session(self, num_threads: int):
+        key = max(num_threads, 0)
+        if key not in self._sessions:
+            opts = self._ort.SessionOptions()
+            opts.intra_op_num_threads = key
+            opts.inter_op_num_threads = 1
+            self._sessions[key] = self._ort.InferenceSession(self.path, opts, providers=["CPUExecutionProvider"])
+        return self._sessions[key]
+
+    def predict(self, X, num_threads: int = ONNX_NUM_THREADS) -> tuple:
+        X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+        session = self.session if num_threads == ONNX_NUM_THREADS else self._session(num_threads)
+        prob, label = session.run(None, {INPUT_NAME: X})
+        return prob.astype(np.float64), label.astype(int)
+
+
+# ============================================================
+# 🔍 일치 검증
+# ============================================================
+def parity_report(ensemble: OnnxEnsemble, models: dict, meta: dict, X: np.ndarray) -> dict:
+    """네이티브 부스터(같은 가중치) 대비 최대 절대 오차 + 레이블 불일치 수"""
+    try:
+        from .model_utils import positive_proba
+    except ImportError:
+        from model_utils import positive_proba
+
+    native = np.column_stack([positive_proba(n, models[n], X, num_threads=-1)
+                              for n in ensemble.info["models"]]) @ np.array(ensemble.info["model_weight"])
+    prob, label = ensemble.predict(X, num_threads=-1)
+    threshold = meta.get("threshold", 0.5)
+    return {
+        "ensemble": float(np.max(np.abs(prob - native))),
+        "label_mismatch": int((label != (native >= threshold)).sum()),
+        "rows": len(X),
+    }
+
+
+if __name__ == "__main__":
+    try:
+        from .model_utils import load_local_models
+    except ImportError:
+        from model_utils import load_local_models
+
+    parser = argparse.ArgumentParser(description="트리 앙상블 → 단일 ONNX 그래프 내보내기")
+    parser.add_argument("--model-dir", default=MODEL_CACHE_DIR)
+    parser.add_argument("--weights", choices=["equal", "meta"], default="equal",
+                        help="equal: 서빙 기본 경로와 같은 균등 평균 / meta: model_meta.json weights")
+    parser.add_argument("--check-rows", type=int, default=20000, help="일치 검증용 합성 행 수")
+    args = parser.parse_args()
+
+    models, meta = load_local_models(args.model_dir)
+    onx = export_ensemble(models, meta, meta.get("weights") if args.weights == "meta" else None)
+    out_path = os.path.join(args.model_dir, ONNX_FILENAME)
+    with open(out_path, "wb") as f:
+        f.write(onx.SerializeToString())
+    print(f"✅ ONNX 내보내기 완료 → {out_path} ({os.path.getsize(out_path) / 1024:.0f}KB, "
+          f"노드 {len(onx.graph.node)}개)")
+
+    rng = np.random.default_rng(0)
+    X = rng.gamma(shape=1.5, scale=5.0, size=(args.check_rows, len(meta.get("features") or [])))
+    X[:, -2:] = rng.random((args.check_rows, 2))
+    X[rng.random(X.shape) < 0.01] = np.nan
+    report = parity_report(OnnxEnsemble(out_path), models, meta, X)
+    print("🔍 네이티브 대비 최대 절대 오차:")
+    for k, v in report.items():
+        print(f"   {k:>15}: {v}")
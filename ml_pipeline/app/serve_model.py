@@ -2,198 +2,463 @@
 # 🧠 serve_model.py — FastAPI 기반 구매 예측 API
 # ============================================================
 import os
-import json
-import joblib
-from typing import Dict, Any
-import boto3
-import pandas as pd
-from fastapi import FastAPI, HTTPException
+import time
+import threading
+from typing import List
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
+try:
+    from .drift_monitor import LiveDriftMonitor, load_reference_profile
+    from .kpi_stats import KpiStats
+    from .warmup import ServiceState
+    from .admission import AdmissionController, AdmissionMiddleware
+    from .budgeted_ensemble import BudgetedEnsemble, EnsembleTimeout, ENSEMBLE_BUDGET_MS
+    from .shadow import ShadowScorer, load_candidate_models, SHADOW_MODEL_DIR
+    from .wire_format import (
+        WireFormatError, decode_single, decode_batch, encode_response, response_type, openapi_body
+    )
+    from .bulk_scoring import (
+        ARROW_STREAM, PARQUET, NDJSON, BULK_MAX_CONCURRENT, BulkInputError, BulkSource, media_type,
+        score_stream, spool_to_file
+    )
+    from .batch_jobs import BatchJobManager
+    from .student import load_cascade, STUDENT_CASCADE, STUDENT_FILENAME
+    from .model_utils import (
+        MODEL_CACHE_DIR, download_from_minio, load_scoring_backend, minio_client, predict_proba,
+        resolve_model_dir
+    )
+except ImportError:
+    from drift_monitor import LiveDriftMonitor, load_reference_profile
+    from kpi_stats import KpiStats
+    from warmup import ServiceState
+    from admission import AdmissionController, AdmissionMiddleware
+    from budgeted_ensemble import BudgetedEnsemble, EnsembleTimeout, ENSEMBLE_BUDGET_MS
+    from shadow import ShadowScorer, load_candidate_models, SHADOW_MODEL_DIR
+    from wire_format import (
+        WireFormatError, decode_single, decode_batch, encode_response, response_type, openapi_body
+    )
+    from bulk_scoring import (
+        ARROW_STREAM, PARQUET, NDJSON, BULK_MAX_CONCURRENT, BulkInputError, BulkSource, media_type,
+        score_stream, spool_to_file
+    )
+    from batch_jobs import BatchJobManager
+    from student import load_cascade, STUDENT_CASCADE, STUDENT_FILENAME
+    from model_utils import (
+        MODEL_CACHE_DIR, download_from_minio, load_scoring_backend, minio_client, predict_proba,
+        resolve_model_dir
+    )
+
 # ============================================================
-# 📍 경로 설정 (Render & Local 겸용)
+# 🚀 FastAPI 서버 정의
 # ============================================================
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_CACHE_DIR = os.path.join(BASE_DIR, "models_cache")
-os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+app = FastAPI(
+    title="🛍️ Purchase Prediction API",
+    description="LightGBM + XGBoost + CatBoost 앙상블 기반 구매 예측 API (7개 feature 자동 매핑)",
+    version="1.0.0"
+)
+
+# 과부하 시 스레드풀에 쌓기 전에 429/503 으로 조기 거절 (/predict, /predict/batch)
+ADMISSION = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=ADMISSION)
 
 # ============================================================
-# 📦 로컬 모델 로드 함수
+# 🔹 요청 데이터 스키마 (feature_1 ~ feature_7)
 # ============================================================
-def load_local_models() -> tuple:
-    """로컬 캐시에서 모델 로드 후 (models, meta) 튜플 반환"""
-    print("💡 Loading models from local cache...")
-    try:
-        lgb_path = os.path.join(MODEL_CACHE_DIR, "lgb_model.joblib")
-        xgb_path = os.path.join(MODEL_CACHE_DIR, "xgb_model.joblib")
-        cat_path = os.path.join(MODEL_CACHE_DIR, "cat_model.joblib")
-        meta_path = os.path.join(MODEL_CACHE_DIR, "model_meta.json")
-
-        models = {
-            "lgb_model": joblib.load(lgb_path),
-            "xgb_model": joblib.load(xgb_path),
-            "cat_model": joblib.load(cat_path) if os.path.exists(cat_path) else None
-        }
+class SessionFeatures(BaseModel):
+    feature_1: float
+    feature_2: float
+    feature_3: float
+    feature_4: float
+    feature_5: float
+    feature_6: float
+    feature_7: float
+
+FEATURE_KEYS = [f"feature_{i}" for i in range(1, 8)]
+
+class BatchSessionFeatures(BaseModel):
+    """여러 세션을 한 번에 예측 (각 행은 feature_1 ~ feature_7 순서의 값 7개)"""
+    instances: List[List[float]]
+
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+
+class BatchJobRequest(BaseModel):
+    """비동기 배치 채점 작업 (s3:// 또는 로컬 경로)"""
+    input_path: str
+    output_path: str
+    passthrough: List[str] = []
+
+# ============================================================
+# 🧩 모델 로드 (Render 환경 기준)
+# ============================================================
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "")
+BUCKET = os.getenv("BUCKET", "")
+PREFIX = os.getenv("PREFIX", "")
+ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
+# native: joblib 부스터 / compiled: compiled_ensemble.npz (NumPy) / onnx: ensemble.onnx (ONNX Runtime)
+SCORING_BACKEND = os.getenv("SCORING_BACKEND", "native").lower()
+# 모델 번들: 로컬 번들 디렉터리 / .tar 경로 또는 MinIO <PREFIX>/ 아래 객체 키 (예: bundles/v20251022T081526Z.tar)
+# - 설정하면 개별 파일 동기화 대신 번들 1개를 받아 manifest 해시 검증 후 백엔드에 필요한 멤버만 로드
+MODEL_BUNDLE = os.getenv("MODEL_BUNDLE", "")
+
+SERVICE_STATE = ServiceState()
+
+_load_started = time.perf_counter()
+if ENVIRONMENT == "production":
+    MODEL_DIR = resolve_model_dir(MODEL_BUNDLE, MODEL_CACHE_DIR, MINIO_ENDPOINT, BUCKET, PREFIX)
+    MODELS, META, PREDICT_BATCH = load_scoring_backend(SCORING_BACKEND, MODEL_DIR, MINIO_ENDPOINT, BUCKET, PREFIX)
+else:
+    MODEL_DIR = resolve_model_dir(MODEL_BUNDLE)
+    MODELS, META, PREDICT_BATCH = load_scoring_backend(SCORING_BACKEND, MODEL_DIR)
+SERVICE_STATE.mark_loaded(time.perf_counter() - _load_started)
+
+# 합성 배치로 부스터 지연 초기화를 미리 끝냄 (완료 전까지 /ready 는 503)
+SERVICE_STATE.start_warmup(MODELS, META, PREDICT_BATCH)
 
-        with open(meta_path, "r", encoding="utf-8") as f:
-            meta = json.load(f)
+# ============================================================
+# 📡 실시간 드리프트 모니터 (기준 분포 요약이 있을 때만 활성화)
+# ============================================================
+DRIFT_MONITOR = None
+try:
+    _s3 = minio_client(MINIO_ENDPOINT) if ENVIRONMENT == "production" and MINIO_ENDPOINT else None
+    _profile = load_reference_profile(MODEL_CACHE_DIR, _s3)
+    if _profile:
+        DRIFT_MONITOR = LiveDriftMonitor(_profile, META.get("features", []))
+        print(f"✅ 실시간 드리프트 모니터 활성화 (피처 {len(DRIFT_MONITOR.features)}개)")
+except Exception as e:
+    print(f"⚠️ 실시간 드리프트 모니터 초기화 실패: {e}")
+
+# ============================================================
+# ⏱️ 시간 예산 앙상블 (ENSEMBLE_BUDGET_MS > 0 일 때만)
+# ============================================================
+# 모델별 호출이 필요하므로 native 백엔드에서만 (compiled / onnx 는 한 번의 호출로 세 모델을 함께 평가)
+BUDGETED_ENSEMBLE = BudgetedEnsemble(MODELS, META) if ENSEMBLE_BUDGET_MS > 0 and MODELS else None
+if BUDGETED_ENSEMBLE is not None:
+    print(f"✅ 시간 예산 앙상블 활성화 (예산 {ENSEMBLE_BUDGET_MS:.0f}ms)")
+elif ENSEMBLE_BUDGET_MS > 0:
+    print(f"⚠️ {SCORING_BACKEND} 백엔드에서는 시간 예산 앙상블을 사용하지 않습니다")
+
+# ============================================================
+# 🎓 학생 모델 캐스케이드 (STUDENT_CASCADE=1 + student_model.npz 가 있을 때만)
+# ============================================================
+if STUDENT_CASCADE and ENVIRONMENT == "production" and MINIO_ENDPOINT and not MODEL_BUNDLE:
+    download_from_minio(MINIO_ENDPOINT, BUCKET, PREFIX, [STUDENT_FILENAME], MODEL_CACHE_DIR)
+CASCADE = load_cascade(MODEL_DIR, META)
+if CASCADE is not None:
+    print(f"✅ 학생 캐스케이드 활성화 (앙상블 구간 [{CASCADE.low:.4f}, {CASCADE.high:.4f}), "
+          f"검증 커버리지 {CASCADE.info.get('coverage')})")
+
+def score(X: np.ndarray, request: Request):
+    """
+    X: meta['features'] 순서의 2차원 배열 → (확률 배열, 레이블 배열, 응답에 덧붙일 필드)
+    - 캐스케이드: 학생 모델이 확실한 행은 바로 응답, 나머지 행만 앙상블 (escalated = 앙상블로 넘긴 행 수)
+    """
+    if CASCADE is None:
+        return ensemble_score(X, request)
+    return CASCADE.predict(X, lambda idx: ensemble_score(X[idx], request))
+
+def ensemble_score(X: np.ndarray, request: Request):
+    """
+    앙상블 채점 (확률 배열, 레이블 배열, 응답에 덧붙일 필드)
+    - 예산 모드: 예산/요청 마감시간 안에 끝난 모델만 가중 평균, degraded 여부 표시
+    """
+    if BUDGETED_ENSEMBLE is None:
+        probs, preds = PREDICT_BATCH(MODELS, META, X)
+        return probs, preds, {}
+    probs, preds, info = BUDGETED_ENSEMBLE.predict(X, getattr(request.state, "deadline", None))
+    return probs, preds, {"degraded": info["degraded"], "models_used": info["models_used"]}
+
+# ============================================================
+# 🕶️ 후보 모델 섀도 채점 (SHADOW_MODEL_DIR 이 있을 때만)
+# ============================================================
+SHADOW = None
+if SHADOW_MODEL_DIR:
+    try:
+        _cand_models, _cand_meta = load_candidate_models(SHADOW_MODEL_DIR)
+        _s3 = minio_client(MINIO_ENDPOINT) if ENVIRONMENT == "production" and MINIO_ENDPOINT else None
+        SHADOW = ShadowScorer(_cand_models, _cand_meta, META, s3_client=_s3)
+        print(f"✅ 섀도 채점 활성화 ({SHADOW.version}, 비율 {SHADOW.fraction:.0%})")
+    except Exception as e:
+        print(f"⚠️ 섀도 채점 초기화 실패: {e}")
 
-        print("✅ 로컬 모델 로드 완료")
-        return models, meta
+def shadow_submit(X, probs, preds, started: float):
+    """샘플링 후 대기열에 넣기만 함 (후보 채점/로그 저장은 섀도 스레드에서)"""
+    if SHADOW is None:
+        return
+    try:
+        SHADOW.submit(X, probs, preds, (time.perf_counter() - started) * 1000)
     except Exception as e:
-        raise RuntimeError(f"❌ 로컬 모델 로드 실패: {e}")
+        print(f"⚠️ 섀도 샘플 전달 실패: {e}")
+
+# ============================================================
+# 📊 대시보드 KPI 집계 (분 단위 링버퍼)
+# ============================================================
+KPI_STATS = KpiStats()
+
+# ============================================================
+# ✅ Health Check
+# ============================================================
+@app.get("/")
+def health_check():
+    return {"status": "ok", "message": "Purchase Prediction API is running 🚀", "backend": SCORING_BACKEND,
+            "model_version": META.get("version")}
+
+@app.get("/health")
+def liveness():
+    """라이브니스: 프로세스 응답 여부만 확인 (모델/워밍업 상태와 무관)"""
+    return SERVICE_STATE.liveness()
+
+@app.get("/ready")
+def readiness():
+    """레디니스: 모델 로드 + 워밍업 완료 시 200, 그 전에는 503 (로드/워밍업 소요 시간 포함)"""
+    body = SERVICE_STATE.readiness()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
 
 # ============================================================
-# ☁️ MinIO에서 모델 로드 함수
+# 🧠 예측 엔드포인트
 # ============================================================
-def load_models_from_minio(endpoint: str, bucket: str, prefix: str, local_dir: str = MODEL_CACHE_DIR):
-    """MinIO에서 모델 다운로드 후 (models, meta) 반환"""
-    print("📥 MinIO에서 모델 다운로드 시도 중...")
+@app.post("/predict", openapi_extra=openapi_body(SessionFeatures.schema()))
+async def predict_purchase(request: Request):
+    """
+    단일 고객 세션의 구매 확률 예측 (7개 feature)
+    - 요청: JSON / msgpack / float32 (Content-Type), 응답: Accept (없으면 요청과 같은 형식)
+    """
+    try:
+        values = decode_single(await request.body(), request.headers.get("content-type"), FEATURE_KEYS)
+    except WireFormatError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    payload = await run_in_threadpool(predict_single, dict(zip(FEATURE_KEYS, values)), request)
+    return encode_response(payload, response_type(request.headers.get("accept"), request.headers.get("content-type")))
+
+def predict_single(row: dict, request: Request) -> dict:
     try:
-        if not endpoint:
-            print("⚠️ MinIO endpoint가 설정되지 않음 → 로컬 캐시 사용 예정")
-            return load_local_models()
-
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=endpoint,
-            aws_access_key_id=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
-            aws_secret_access_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
-            region_name="us-east-1",
-        )
-
-        model_files = ["lgb_model.joblib", "xgb_model.joblib", "cat_model.joblib", "model_meta.json"]
-        for fname in model_files:
-            s3_key = f"{prefix}/{fname}"
-            local_path = os.path.join(local_dir, fname)
+        started = time.perf_counter()
+        # FEATURE_KEYS 순서 = meta['features'] 순서 → 네이티브 부스터 직접 호출 (DataFrame / 피처명 매핑 생략)
+        X = np.array([list(row.values())], dtype=float)
+        if BUDGETED_ENSEMBLE is None and CASCADE is None and MODELS:
+            prob, pred = predict_proba(MODELS, META, X)
+            extra = {}
+        else:
+            probs, preds, extra = score(X, request)
+            prob, pred = probs[0], preds[0]
+
+        if DRIFT_MONITOR is not None:
             try:
-                s3_client.download_file(bucket, s3_key, local_path)
-                print(f"✅ {fname} 다운로드 성공")
+                DRIFT_MONITOR.record(list(row.values()), float(prob))
             except Exception as e:
-                print(f"⚠️ {fname} 다운로드 실패 ({e}) → 로컬 캐시 사용 예정")
-
-        return load_local_models()
+                print(f"⚠️ 드리프트 모니터 기록 실패: {e}")
+        KPI_STATS.record(float(prob), int(pred))
+        shadow_submit([list(row.values())], [prob], [pred], started)
 
+        return {
+            "probability": float(prob),
+            "prediction": int(pred),
+            "threshold": META.get("threshold", 0.5),
+            **extra
+        }
+    except EnsembleTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        print(f"❌ MinIO 로드 중 오류 발생: {e}")
-        print("⚠️ 로컬 캐시 모델로 대체합니다.")
-        return load_local_models()
+        raise HTTPException(status_code=500, detail=str(e))
 
 # ============================================================
-# 🧩 feature 이름 자동 매핑 함수
+# 📦 배치 예측 엔드포인트
 # ============================================================
-def align_feature_names(df, meta):
+@app.post("/predict/batch", openapi_extra=openapi_body(BatchSessionFeatures.schema()))
+async def predict_purchase_batch(request: Request):
     """
-    입력 DataFrame 컬럼명을 meta['features']에 정의된 실제 학습 피처명으로 매핑
+    여러 고객 세션의 구매 확률을 한 번에 예측 (대시보드 CSV 업로드용)
+    - 응답 순서 = 요청 instances 순서
+    - float32 요청은 행 × 7 × 4바이트, float32 응답은 확률 float32[n] + 레이블 uint8[n] (X-Threshold 헤더)
     """
-    expected_features = meta.get("features")
+    try:
+        X = decode_batch(await request.body(), request.headers.get("content-type"), len(FEATURE_KEYS))
+    except WireFormatError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    mt = response_type(request.headers.get("accept"), request.headers.get("content-type"))
+
+    n_rows = len(X)
+    if n_rows == 0:
+        return encode_response({"probabilities": np.empty(0), "predictions": np.empty(0, dtype=int),
+                                "threshold": META.get("threshold", 0.5)}, mt)
+    if n_rows > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {MAX_BATCH_ROWS}행까지 예측할 수 있습니다 (요청 {n_rows}행)")
 
-    if expected_features and len(expected_features) == df.shape[1]:
-        old_cols = list(df.columns)
-        df.columns = expected_features
-        print(f"✅ 입력 피처명 매핑 완료:\n   {old_cols} → {expected_features}")
-    else:
-        print("⚠️ meta['features'] 정보가 없거나 수 불일치로 rename 생략")
+    payload = await run_in_threadpool(predict_rows, X, request)
+    return encode_response(payload, mt)
 
-    return df
+def predict_rows(X: np.ndarray, request: Request) -> dict:
+    try:
+        started = time.perf_counter()
+        probs, preds, extra = score(np.asarray(X, dtype=float), request)
+
+        if DRIFT_MONITOR is not None:
+            try:
+                DRIFT_MONITOR.record_batch(X, probs)
+            except Exception as e:
+                print(f"⚠️ 드리프트 모니터 기록 실패: {e}")
+        KPI_STATS.record_batch(probs, preds)
+        shadow_submit(X, probs, preds, started)
+
+        return {
+            "probabilities": probs,
+            "predictions": preds,
+            "threshold": META.get("threshold", 0.5),
+            **extra
+        }
+    except EnsembleTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # ============================================================
-# 🧠 예측 유틸리티
+# 🗂️ 대량 채점 엔드포인트 (Arrow IPC / Parquet → Arrow / NDJSON 스트림)
 # ============================================================
-def predict_proba(models: Dict[str, Any], meta: Dict[str, Any], df: pd.DataFrame):
+BULK_SLOTS = threading.BoundedSemaphore(BULK_MAX_CONCURRENT)
+
+@app.post("/predict/bulk", openapi_extra={"requestBody": {"required": True, "content": {
+    ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+    PARQUET: {"schema": {"type": "string", "format": "binary"}},
+}}})
+async def predict_bulk(request: Request):
     """
-    여러 모델의 예측 확률 평균을 계산하고, threshold 기준으로 최종 레이블 반환
+    고객 전체 야간 채점용
+    - 요청: Arrow IPC 스트림 (임시 파일 → 레코드 배치 순회) 또는 Parquet (임시 파일 → 행 그룹 순회)
+      본문은 응답 시작 전에 모두 받아 둠 (StreamingResponse 안에서 요청을 읽으면 본문 메시지가 유실됨)
+    - 피처 컬럼: meta['features'] 이름 또는 feature_1 ~ feature_7, row_id 컬럼이 있으면 그대로 반환 (없으면 0부터 행 번호)
+    - 응답: Accept 가 NDJSON 이면 줄 단위 JSON, 그 외 Arrow IPC 스트림 (row_id, probability, prediction)
     """
-    preds = []
+    in_type = media_type(request.headers.get("content-type"), (ARROW_STREAM, PARQUET))
+    if in_type is None:
+        raise HTTPException(status_code=415, detail=f"Content-Type 은 {ARROW_STREAM} 또는 {PARQUET} 이어야 합니다")
+    out_type = media_type(request.headers.get("accept"), (ARROW_STREAM, NDJSON)) or ARROW_STREAM
+
+    if not BULK_SLOTS.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="대량 채점 작업이 이미 실행 중입니다",
+                            headers={"Retry-After": "30"})
+    path = None
     try:
-        # ✅ 입력 컬럼명 자동 매핑
-        df = align_feature_names(df, meta)
+        path = await spool_to_file(request, ".parquet" if in_type == PARQUET else ".arrows")
+        source = await run_in_threadpool(BulkSource, in_type, META, FEATURE_KEYS, path)
+    except Exception as e:
+        BULK_SLOTS.release()
+        if path and os.path.exists(path):
+            os.remove(path)
+        if isinstance(e, BulkInputError):
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        raise
 
-        print(f"[DEBUG] 모델 키: {list(models.keys())}")
-        for name, m in models.items():
-            print(f"[DEBUG] {name}: {'✅ 로드됨' if m else '❌ None'}")
+    def body():
+        try:
+            yield from score_stream(source, MODELS, META, out_type, predict_fn=PREDICT_BATCH)
+        finally:
+            BULK_SLOTS.release()
 
-        # 모델별 예측 확률 계산
-        if models.get("lgb_model"):
-            preds.append(models["lgb_model"].predict_proba(df)[:, 1])
-        if models.get("xgb_model"):
-            preds.append(models["xgb_model"].predict_proba(df)[:, 1])
-        if models.get("cat_model"):
-            preds.append(models["cat_model"].predict_proba(df)[:, 1])
+    return StreamingResponse(body(), media_type=out_type)
 
-        if not preds:
-            raise ValueError("❌ 사용할 수 있는 모델이 없습니다.")
+# ============================================================
+# 🧾 비동기 배치 채점 작업 (입력 Parquet → 출력 파트 Parquet, 행 그룹 단위 체크포인트)
+# ============================================================
+BATCH_JOBS = BatchJobManager(MODELS, META, FEATURE_KEYS, predict_fn=PREDICT_BATCH)
 
-        avg_prob = sum(preds) / len(preds)
-        threshold = meta.get("threshold", 0.5)
-        pred_label = int(avg_prob[0] >= threshold)
+@app.post("/jobs", status_code=202)
+def submit_batch_job(req: BatchJobRequest):
+    """
+    작업 제출 → job_id 즉시 반환, 진행 상황은 GET /jobs/{job_id}
+    - 예: {"input_path": "s3://feature-data/session_features.parquet",
+           "output_path": "s3://model-logs/session-purchase/batch-scores/2025-10-22"}
+    """
+    return BATCH_JOBS.submit(req.input_path, req.output_path, req.passthrough)
 
-        print(f"[DEBUG] 예측 성공: 확률={avg_prob[0]}, 라벨={pred_label}")
-        return avg_prob[0], pred_label
+@app.get("/jobs")
+def list_batch_jobs(limit: int = 20):
+    return BATCH_JOBS.recent(limit)
 
-    except Exception as e:
-        print(f"❌ predict_proba 내부 오류: {e}")
-        raise RuntimeError(f"❌ predict_proba 실행 중 오류 발생: {e}")
+@app.get("/jobs/{job_id}")
+def batch_job_status(job_id: str):
+    job = BATCH_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"작업 없음: {job_id}")
+    return job
+
+@app.post("/jobs/{job_id}/resume", status_code=202)
+def resume_batch_job(job_id: str):
+    """실패 / 중단된 작업 재실행 (출력 경로의 _checkpoint.json 에 있는 행 그룹은 건너뜀)"""
+    job = BATCH_JOBS.resume(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"작업 없음: {job_id}")
+    return job
 
 # ============================================================
-# 🚀 FastAPI 서버 정의
+# 📡 실시간 드리프트 조회
 # ============================================================
-app = FastAPI(
-    title="🛍️ Purchase Prediction API",
-    description="LightGBM + XGBoost + CatBoost 앙상블 기반 구매 예측 API (7개 feature 자동 매핑)",
-    version="1.0.0"
-)
+@app.get("/drift")
+def live_drift(minutes: int = 15):
+    """
+    최근 N분간 입력 피처 / 예측 확률 분포의 PSI (워커 병합)
+    """
+    if DRIFT_MONITOR is None:
+        return {"enabled": False, "reason": "reference_profile.json 이 없어 비활성화됨"}
+    return DRIFT_MONITOR.report(minutes)
 
 # ============================================================
-# 🔹 요청 데이터 스키마 (feature_1 ~ feature_7)
+# 📊 KPI 집계 조회
 # ============================================================
-class SessionFeatures(BaseModel):
-    feature_1: float
-    feature_2: float
-    feature_3: float
-    feature_4: float
-    feature_5: float
-    feature_6: float
-    feature_7: float
+@app.get("/stats")
+def prediction_stats(minutes: int = 60):
+    """
+    최근 N분 / 직전 N분 / 오늘 누적 예측 KPI (워커 병합, 짧게 캐시)
+    """
+    return KPI_STATS.summary(minutes)
 
 # ============================================================
-# 🧩 모델 로드 (Render 환경 기준)
+# 🚦 수락 제어 지표
 # ============================================================
-MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "")
-BUCKET = os.getenv("BUCKET", "")
-PREFIX = os.getenv("PREFIX", "")
-ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
+@app.get("/metrics/admission")
+def admission_metrics(minutes: int = 15):
+    """
+    최근 N분 수락/거절 건수 (워커 병합) + 이 워커의 현재 동시 처리/대기 수
+    """
+    return ADMISSION.snapshot(minutes)
 
-if ENVIRONMENT == "production":
-    MODELS, META = load_models_from_minio(MINIO_ENDPOINT, BUCKET, PREFIX)
-else:
-    MODELS, META = load_local_models()
+# ============================================================
+# ⏱️ 시간 예산 앙상블 지표
+# ============================================================
+@app.get("/metrics/ensemble")
+def ensemble_metrics(minutes: int = 15):
+    """
+    최근 N분 degraded 비율 + 모델별 시간초과율/평균 지연 (워커 병합)
+    """
+    if BUDGETED_ENSEMBLE is None:
+        return {"enabled": False, "reason": "ENSEMBLE_BUDGET_MS 미설정 → 모든 모델 대기"}
+    return BUDGETED_ENSEMBLE.snapshot(minutes)
 
 # ============================================================
-# ✅ Health Check
+# 🕶️ 섀도 채점 지표
 # ============================================================
-@app.get("/")
-def health_check():
-    return {"status": "ok", "message": "Purchase Prediction API is running 🚀"}
+@app.get("/metrics/shadow")
+def shadow_metrics(minutes: int = 15):
+    """
+    최근 N분 기본 vs 후보 앙상블 일치율 / 확률 차이 / 행당 지연 (워커 병합)
+    """
+    if SHADOW is None:
+        return {"enabled": False, "reason": "SHADOW_MODEL_DIR 미설정"}
+    return SHADOW.snapshot(minutes)
 
 # ============================================================
-# 🧠 예측 엔드포인트
+# 🎓 학생 캐스케이드 지표
 # ============================================================
-@app.post("/predict")
-def predict_purchase(features: SessionFeatures):
+@app.get("/metrics/cascade")
+def cascade_metrics(minutes: int = 15):
     """
-    단일 고객 세션의 구매 확률 예측 (7개 feature)
+    최근 N분 앙상블로 넘긴 행 비율 + 학생 지연 (워커 병합), 증류 시 검증 지표
     """
-    try:
-        df = pd.DataFrame([features.dict()])
-        prob, pred = predict_proba(MODELS, META, df)
-        return {
-            "probability": prob,
-            "prediction": int(pred),
-            "threshold": META.get("threshold", 0.5)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if CASCADE is None:
+        return {"enabled": False, "reason": "STUDENT_CASCADE 미설정 또는 student_model.npz 없음"}
+    return CASCADE.snapshot(minutes)
 
 # ============================================================
 # 🔍 로컬 실행용 진입점
@@ -0,0 +1,260 @@
+# ============================================================
+# 🕶️ shadow.py — 후보 모델 버전 섀도 채점 (응답 이후 백그라운드)
+# ============================================================
+import io
+import os
+import json
+import time
+import uuid
+import queue
+import random
+import threading
+from datetime import datetime
+import joblib
+import numpy as np
+import pandas as pd
+
+try:
+    from .metrics_utils import ShardedMinuteCounters
+    from .model_utils import positive_proba
+    from .model_bundle import BUNDLE_ARCHIVE_SUFFIX, is_bundle, open_bundle
+except ImportError:
+    from metrics_utils import ShardedMinuteCounters
+    from model_utils import positive_proba
+    from model_bundle import BUNDLE_ARCHIVE_SUFFIX, is_bundle, open_bundle
+
+# 후보 모델 디렉터리 (lgb/xgb/cat_model.joblib + model_meta.json), 비어 있으면 비활성화
+SHADOW_MODEL_DIR = os.getenv("SHADOW_MODEL_DIR", "")
+# 섀도 채점할 요청(행) 비율
+SHADOW_FRACTION = float(os.getenv("SHADOW_FRACTION", "0.05"))
+# 대기열이 차면 섀도 샘플은 버림 (기본 경로에 역압을 주지 않음)
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+# 로그 파트 파일 1개 = 최대 FLUSH_ROWS 행 또는 FLUSH_SEC 초
+SHADOW_FLUSH_ROWS = int(os.getenv("SHADOW_FLUSH_ROWS", "1000"))
+SHADOW_FLUSH_SEC = float(os.getenv("SHADOW_FLUSH_SEC", "60"))
+# 로그 저장 위치: production 은 MinIO, 그 외에는 로컬 디렉터리 (dt/hour 파티션 Parquet)
+SHADOW_LOG_BUCKET = os.getenv("SHADOW_LOG_BUCKET", "model-logs")
+SHADOW_LOG_PREFIX = os.getenv("SHADOW_LOG_PREFIX", "session-purchase/shadow-logs")
+SHADOW_LOG_DIR = os.getenv("SHADOW_LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "shadow_logs"))
+
+# 분 단위 카운터 칸
+(SAMPLED, SCORED, DROPPED, FAILED, AGREE, ABS_DIFF_SUM,
+ PRIMARY_MS_SUM, CANDIDATE_MS_SUM, PRIMARY_POSITIVE, CANDIDATE_POSITIVE) = range(10)
+
+MODEL_NAMES = ("lgb_model", "xgb_model", "cat_model")
+
+
+def load_candidate_models(model_dir: str) -> tuple:
+    """
+    후보 모델 세트 로드 → (models, meta)
+    - 기본 경로의 load_local_models 와 달리 없는 모델 파일은 건너뜀 (세트 구성이 버전마다 다름)
+    - model_dir 이 번들(디렉터리 / .tar)이면 manifest 기준으로 검증 후 로드
+    """
+    if model_dir.endswith(BUNDLE_ARCHIVE_SUFFIX) or is_bundle(model_dir):
+        bundle = open_bundle(model_dir)
+        models = bundle.models()
+        if not any(models.values()):
+            raise RuntimeError(f"❌ 후보 번들에 네이티브 모델이 없습니다: {model_dir}")
+        return models, bundle.meta
+    models = {}
+    for name in MODEL_NAMES:
+        path = os.path.join(model_dir, f"{name}.joblib")
+        models[name] = joblib.load(path) if os.path.exists(path) else None
+    if not any(models.values()):
+        raise RuntimeError(f"❌ 후보 모델 파일이 없습니다: {model_dir}")
+    with open(os.path.join(model_dir, "model_meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return models, meta
+
+
+class ShadowScorer:
+    """
+    기본 앙상블 응답 후 일부 요청을 후보 앙상블로 재채점
+    - 요청 스레드는 샘플을 대기열에 넣기만 함 (put_nowait, 가득 차면 버림)
+    - 전용 스레드가 모아서 한 번에 채점 → 비교 지표 누적 + 로그 파트 파일 저장
+    """
+
+    def __init__(self, models: dict, meta: dict, primary_meta: dict, fraction: float = SHADOW_FRACTION,
+                 s3_client=None):
+        self.models = {name: m for name, m in models.items() if m}
+        self.meta = meta
+        self.fraction = fraction
+        self.s3_client = s3_client
+        self.threshold = meta.get("threshold", 0.5)
+        self.version = meta.get("version", "candidate")
+        self.primary_version = primary_meta.get("version", "primary")
+
+        # 기본 경로 입력(primary meta['features'] 순서) → 후보 피처 순서로 재배열할 인덱스
+        primary_features = list(primary_meta.get("features") or [])
+        features = list(meta.get("features") or [])
+        if set(features) <= set(primary_features):
+            self.columns = [primary_features.index(f) for f in features]
+            self.missing_features = []
+        elif len(features) == len(primary_features):
+            # align_feature_names 와 같은 규칙: 수가 같으면 위치 기준 매핑
+            self.columns = list(range(len(features)))
+            self.missing_features = []
+        else:
+            # predict_and_log.py 와 같은 규칙: 없는 피처는 0
+            self.columns = [primary_features.index(f) if f in primary_features else None for f in features]
+            self.missing_features = [f for f, c in zip(features, self.columns) if c is None]
+        self.primary_features = primary_features
+        self.features = features
+
+        self.queue = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        self.counters = ShardedMinuteCounters("shadow", 10, 60)
+        self.counters.start_publisher()
+        self._buffer, self._buffer_since = [], time.monotonic()
+        self.last_flush_error = None
+        threading.Thread(target=self._run, name="shadow-scorer", daemon=True).start()
+
+        if self.missing_features:
+            print(f"⚠️ 섀도 후보에 없는 입력 피처 {len(self.missing_features)}개 → 0 으로 채움: {self.missing_features}")
+
+    # --------------------------------------------------------
+    # 📥 요청 스레드 쪽 (샘플링 + 대기열 투입만)
+    # --------------------------------------------------------
+    def submit(self, X: np.ndarray, primary_prob: np.ndarray, primary_pred: np.ndarray, primary_ms: float):
+        """
+        X: 기본 경로 입력 (행 × primary 피처), primary_ms: 기본 앙상블 채점 시간 (요청 전체)
+        """
+        n = len(X)
+        if n == 1:
+            if random.random() >= self.fraction:
+                return
+            idx = np.array([0])
+        else:
+            idx = np.flatnonzero(np.random.random(n) < self.fraction)
+            if not len(idx):
+                return
+        slot = self.counters.current()
+        slot[SAMPLED] += len(idx)
+        try:
+            self.queue.put_nowait((np.asarray(X, dtype=float)[idx], np.asarray(primary_prob, dtype=float)[idx],
+                                   np.asarray(primary_pred)[idx], primary_ms / n, datetime.now()))
+        except queue.Full:
+            slot[DROPPED] += len(idx)
+
+    # --------------------------------------------------------
+    # 🕶️ 백그라운드 채점
+    # --------------------------------------------------------
+    def _candidate_input(self, X: np.ndarray) -> np.ndarray:
+        out = np.zeros((len(X), len(self.columns)))
+        for j, c in enumerate(self.columns):
+            if c is not None:
+                out[:, j] = X[:, c]
+        return out
+
+    def _run(self):
+        while True:
+            try:
+                items = [self.queue.get(timeout=SHADOW_FLUSH_SEC)]
+            except queue.Empty:
+                self._flush()
+                continue
+            # 쌓여 있는 샘플은 한 번에 채점
+            while len(items) < SHADOW_QUEUE_SIZE:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._score(items)
+
+    def _score(self, items):
+        X = np.vstack([it[0] for it in items])
+        primary_prob = np.concatenate([it[1] for it in items])
+        primary_pred = np.concatenate([it[2] for it in items])
+        primary_ms = np.concatenate([np.full(len(it[0]), it[3]) for it in items])
+        ts = [it[4] for it in items for _ in range(len(it[0]))]
+
+        slot = self.counters.current()
+        try:
+            t0 = time.perf_counter()
+            Xc = self._candidate_input(X)
+            prob = sum(positive_proba(name, m, Xc) for name, m in self.models.items()) / len(self.models)
+            candidate_ms = (time.perf_counter() - t0) * 1000 / len(X)
+        except Exception as e:
+            slot[FAILED] += len(X)
+            print(f"⚠️ 섀도 채점 실패: {e}")
+            return
+        pred = (prob >= self.threshold).astype(int)
+
+        slot[SCORED] += len(X)
+        slot[AGREE] += int((pred == primary_pred).sum())
+        slot[ABS_DIFF_SUM] += float(np.abs(prob - primary_prob).sum())
+        slot[PRIMARY_MS_SUM] += float(primary_ms.sum())
+        slot[CANDIDATE_MS_SUM] += candidate_ms * len(X)
+        slot[PRIMARY_POSITIVE] += int((primary_pred == 1).sum())
+        slot[CANDIDATE_POSITIVE] += int((pred == 1).sum())
+
+        log = pd.DataFrame(X, columns=self.primary_features or None)
+        log["primary_probability"] = primary_prob
+        log["primary_prediction"] = primary_pred
+        log["primary_version"] = self.primary_version
+        log["primary_latency_ms"] = primary_ms
+        log["candidate_probability"] = prob
+        log["candidate_prediction"] = pred
+        log["candidate_version"] = self.version
+        log["candidate_latency_ms"] = candidate_ms
+        log["timestamp"] = pd.to_datetime(ts)
+        self._buffer.append(log)
+        if sum(len(b) for b in self._buffer) >= SHADOW_FLUSH_ROWS or \
+                time.monotonic() - self._buffer_since >= SHADOW_FLUSH_SEC:
+            self._flush()
+
+    # --------------------------------------------------------
+    # 💾 로그 저장 (inference-logs 와 같은 dt/hour 파티션 파트 파일)
+    # --------------------------------------------------------
+    def _flush(self):
+        self._buffer_since = time.monotonic()
+        if not self._buffer:
+            return
+        df = pd.concat(self._buffer, ignore_index=True)
+        self._buffer = []
+        ts = datetime.now()
+        key = (f"dt={ts:%Y-%m-%d}/hour={ts:%H}/"
+               f"part-{ts:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+        try:
+            buf = io.BytesIO()
+            df.to_parquet(buf, index=False)
+            if self.s3_client is not None:
+                self.s3_client.put_object(Bucket=SHADOW_LOG_BUCKET, Key=f"{SHADOW_LOG_PREFIX}/{key}",
+                                          Body=buf.getvalue())
+            else:
+                path = os.path.join(SHADOW_LOG_DIR, key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(buf.getvalue())
+            self.last_flush_error = None
+        except Exception as e:
+            self.last_flush_error = str(e)
+            print(f"⚠️ 섀도 로그 저장 실패 ({len(df)}행): {e}")
+
+    # --------------------------------------------------------
+    # 📊 조회
+    # --------------------------------------------------------
+    def snapshot(self, minutes: int = 15) -> dict:
+        totals = self.counters.merged(minutes)
+        n = int(totals[SCORED])
+        return {
+            "enabled": True,
+            "primary_version": self.primary_version,
+            "candidate_version": self.version,
+            "candidate_models": list(self.models),
+            "fraction": self.fraction,
+            "missing_features": self.missing_features,
+            "window_minutes": minutes,
+            "sampled": int(totals[SAMPLED]),
+            "scored": n,
+            "dropped": int(totals[DROPPED]),
+            "failed": int(totals[FAILED]),
+            "agreement_rate": float(totals[AGREE] / n) if n else None,
+            "mean_abs_prob_diff": float(totals[ABS_DIFF_SUM] / n) if n else None,
+            "primary_positive_rate": float(totals[PRIMARY_POSITIVE] / n) if n else None,
+            "candidate_positive_rate": float(totals[CANDIDATE_POSITIVE] / n) if n else None,
+            "primary_latency_ms_per_row": float(totals[PRIMARY_MS_SUM] / n) if n else None,
+            "candidate_latency_ms_per_row": float(totals[CANDIDATE_MS_SUM] / n) if n else None,
+            "queue_depth": self.queue.qsize(),
+            "last_flush_error": self.last_flush_error,
+            "workers": self.counters.n_workers(),
+        }
@@ -0,0 +1,266 @@
+# ============================================================
+# 🎓 student.py — 앙상블 증류 학생 모델 + 2단계(학생 → 앙상블) 캐스케이드
+# ------------------------------------------------------------
+# python student.py --input s3://feature-data/session_features.parquet   # → models_cache/student_model.npz
+# python student.py --input features.parquet --target-agreement 0.999 --trees 100 --leaves 8
+#
+# - 학생: 얕은 LightGBM (cross_entropy) 을 앙상블 혼합 확률(소프트 레이블)에 맞춰 학습
+#         → tree_compiler 로 NumPy 배열 변환 → 서빙에서는 lightgbm 없이 수십 µs
+# - 검증 구간에서 학생 확률 [low, high) 구간만 앙상블로 넘기도록 경계 선택 (넘기지 않은 행의 레이블 일치율 ≥ 목표)
+# ============================================================
+import os
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+
+try:
+    from .metrics_utils import ShardedMinuteCounters
+    from .model_utils import MODEL_CACHE_DIR
+    from .tree_compiler import CompiledEnsemble, compile_ensemble
+    from .model_bundle import member_path
+except ImportError:
+    from metrics_utils import ShardedMinuteCounters
+    from model_utils import MODEL_CACHE_DIR
+    from tree_compiler import CompiledEnsemble, compile_ensemble
+    from model_bundle import member_path
+
+STUDENT_FILENAME = "student_model.npz"
+# 1 이면 student_model.npz 가 있을 때 학생 모델을 1단계로 사용
+STUDENT_CASCADE = os.getenv("STUDENT_CASCADE", "0") == "1"
+# 산출물에 기록된 경계 대신 사용할 값 (비우면 산출물 값)
+CASCADE_LOW = os.getenv("CASCADE_LOW", "")
+CASCADE_HIGH = os.getenv("CASCADE_HIGH", "")
+
+STUDENT_PARAMS = {"n_estimators": 60, "num_leaves": 8, "max_depth": 3, "learning_rate": 0.1,
+                  "min_child_samples": 50, "subsample": 0.8, "subsample_freq": 1, "verbose": -1}
+
+# 분 단위 카운터: 요청 / 행 / 앙상블로 넘긴 행 / 학생 지연 합 ms
+REQUESTS, ROWS, ESCALATED, STUDENT_MS = range(4)
+
+
+# ============================================================
+# 🧪 증류
+# ============================================================
+def choose_band(student: np.ndarray, teacher_label: np.ndarray, threshold: float, target: float) -> tuple:
+    """
+    학생 확률 기준 (low, high) — low 미만은 0, high 이상은 1 로 학생이 바로 응답
+    - 아래쪽: 확률 오름차순 누적으로 '교사 레이블 0' 비율 ≥ target 인 가장 넓은 구간 (low ≤ threshold)
+    - 위쪽: 내림차순 누적으로 '교사 레이블 1' 비율 ≥ target 인 가장 넓은 구간 (high ≥ threshold)
+    """
+    order = np.argsort(student, kind="stable")
+    s, t = student[order], teacher_label[order]
+    n = np.arange(1, len(s) + 1)
+
+    low = float(np.nextafter(s.min(), -np.inf)) if len(s) else threshold
+    ok = (1 - np.cumsum(t == 1) / n >= target) & (s < threshold)
+    # 같은 확률 값 사이에서는 자르지 않음 (경계는 다음 값)
+    cut = np.flatnonzero(ok[:-1] & (s[1:] > s[:-1]))
+    if ok[-1:].any():
+        low = threshold
+    elif len(cut):
+        low = float(s[cut[-1] + 1])
+
+    s_desc, t_desc = s[::-1], t[::-1]
+    high = float(np.nextafter(s.max(), np.inf)) if len(s) else threshold
+    ok = (1 - np.cumsum(t_desc == 0) / n >= target) & (s_desc >= threshold)
+    cut = np.flatnonzero(ok[:-1] & (s_desc[1:] < s_desc[:-1]))
+    if ok[-1:].any():
+        high = float(s_desc[-1])
+    elif len(cut):
+        high = float(s_desc[cut[-1]])
+    return min(low, threshold), max(high, threshold)
+
+
+def cascade_report(student: np.ndarray, teacher: np.ndarray, threshold: float, low: float, high: float) -> dict:
+    """검증 행 기준 학생 단독 / 캐스케이드 지표"""
+    t_label = teacher >= threshold
+    s_label = student >= threshold
+    resolved = (student < low) | (student >= high)
+    final = np.where(resolved, s_label, t_label)
+    return {
+        "agreement": float((s_label == t_label).mean()),
+        "prob_mae": float(np.abs(student - teacher).mean()),
+        "coverage": float(resolved.mean()),
+        "resolved_agreement": float((s_label[resolved] == t_label[resolved]).mean()) if resolved.any() else None,
+        "cascade_agreement": float((final == t_label).mean()),
+        "resolved_prob_mae": float(np.abs(student - teacher)[resolved].mean()) if resolved.any() else None,
+    }
+
+
+def distill(X: np.ndarray, teacher_prob: np.ndarray, meta: dict, params: dict = None,
+            target_agreement: float = 0.999, val_fraction: float = 0.2, seed: int = 0) -> CompiledEnsemble:
+    """
+    (피처, 교사 확률) → 학생 CompiledEnsemble (info['student'] 에 경계 / 검증 지표)
+    - 검증 구간은 학습에 쓰지 않은 행 (경계 선택과 일치율 측정 모두 검증 구간에서)
+    """
+    import lightgbm as lgb
+
+    rng = np.random.default_rng(seed)
+    idx = rng.permutation(len(X))
+    n_val = max(int(len(X) * val_fraction), 1)
+    val, train = idx[:n_val], idx[n_val:]
+
+    params = {**STUDENT_PARAMS, **(params or {})}
+    model = lgb.LGBMRegressor(objective="cross_entropy", random_state=seed, **params)
+    model.fit(X[train], np.clip(teacher_prob[train], 0.0, 1.0))
+
+    student = compile_ensemble({"lgb_model": model}, meta)
+    threshold = meta.get("threshold", 0.5)
+    s_val = student.predict_proba(X[val])
+    low, high = choose_band(s_val, teacher_prob[val] >= threshold, threshold, target_agreement)
+
+    student.info["student"] = {
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "teacher_version": meta.get("version"),
+        "rows_train": int(len(train)),
+        "rows_val": int(len(val)),
+        "params": params,
+        "target_agreement": target_agreement,
+        "low": low,
+        "high": high,
+        **cascade_report(s_val, teacher_prob[val], threshold, low, high),
+    }
+    return student
+
+
+# ============================================================
+# 🚦 서빙: 학생 1단계 → 불확실 구간만 앙상블
+# ============================================================
+class StudentCascade:
+    """
+    predict(X, escalate_fn) → (확률, 레이블, extra)
+    - 학생 확률 < low 또는 ≥ high: 학생 결과 그대로
+    - 나머지 행만 escalate_fn(행 인덱스) → (확률, 레이블, extra) 로 앙상블 채점 후 제자리에 합침
+    """
+
+    def __init__(self, path: str, low: float = None, high: float = None):
+        self.student = CompiledEnsemble.load(path)
+        info = self.student.info.get("student") or {}
+        self.info = info
+        self.threshold = self.student.threshold
+        self.low = float(CASCADE_LOW) if CASCADE_LOW else (low if low is not None else info.get("low", self.threshold))
+        self.high = float(CASCADE_HIGH) if CASCADE_HIGH else (high if high is not None else info.get("high", self.threshold))
+        self.counters = ShardedMinuteCounters("cascade", 4, 60)
+        self.counters.start_publisher()
+
+    def predict(self, X, escalate_fn) -> tuple:
+        t0 = time.perf_counter()
+        Xa = np.asarray(X, dtype=float)
+        probs = self.student.predict_proba(Xa)
+        student_ms = (time.perf_counter() - t0) * 1000
+        preds = (probs >= self.threshold).astype(int)
+        escalate = np.flatnonzero((probs >= self.low) & (probs < self.high))
+
+        extra = {}
+        if len(escalate):
+            sub_probs, sub_preds, extra = escalate_fn(escalate)
+            probs[escalate] = sub_probs
+            preds[escalate] = sub_preds
+
+        slot = self.counters.current()
+        slot[REQUESTS] += 1
+        slot[ROWS] += len(Xa)
+        slot[ESCALATED] += len(escalate)
+        slot[STUDENT_MS] += student_ms
+        return probs, preds, {**extra, "escalated": int(len(escalate))}
+
+    def snapshot(self, minutes: int = 15) -> dict:
+        totals = self.counters.merged(minutes)
+        rows, requests = int(totals[ROWS]), int(totals[REQUESTS])
+        return {
+            "enabled": True,
+            "band": {"low": self.low, "high": self.high},
+            "window_minutes": minutes,
+            "requests": requests,
+            "rows": rows,
+            "escalated": int(totals[ESCALATED]),
+            "escalation_rate": float(totals[ESCALATED] / rows) if rows else None,
+            "mean_student_ms": float(totals[STUDENT_MS] / requests) if requests else None,
+            "workers": self.counters.n_workers(),
+            "distillation": {k: v for k, v in self.info.items() if k != "params"},
+        }
+
+
+def load_cascade(model_dir: str = MODEL_CACHE_DIR, meta: dict = None) -> "StudentCascade":
+    """
+    STUDENT_CASCADE=1 이고 산출물이 있으면 StudentCascade, 아니면 None (번들이면 student 멤버)
+    - 교사 버전이 meta 와 다르면 RuntimeError (이전 모델의 학생으로 서빙하지 않음)
+    """
+    if not STUDENT_CASCADE:
+        return None
+    path = member_path(model_dir, "student")
+    if path is None or not os.path.exists(path):
+        print(f"⚠️ STUDENT_CASCADE=1 이지만 {model_dir} 에 {STUDENT_FILENAME} 가 없어 비활성화")
+        return None
+    cascade = StudentCascade(path)
+    if meta is not None and cascade.info.get("teacher_version") != meta.get("version"):
+        raise RuntimeError(f"❌ 학생 모델의 교사 버전({cascade.info.get('teacher_version')})이 "
+                           f"model_meta.json({meta.get('version')})과 다릅니다 → student.py 로 다시 증류하세요")
+    return cascade
+
+
+if __name__ == "__main__":
+    import pyarrow.parquet as pq
+    try:
+        from .model_utils import load_scoring_backend
+        from .batch_jobs import get_filesystem
+        from .bulk_scoring import feature_columns
+    except ImportError:
+        from model_utils import load_scoring_backend
+        from batch_jobs import get_filesystem
+        from bulk_scoring import feature_columns
+
+    parser = argparse.ArgumentParser(description="앙상블 → 학생 모델 증류 (캐스케이드 1단계)")
+    parser.add_argument("--input", default="s3://feature-data/session_features.parquet", help="피처 Parquet 경로")
+    parser.add_argument("--model-dir", default=MODEL_CACHE_DIR)
+    parser.add_argument("--teacher-backend", default="native", help="교사 채점 백엔드 (native / compiled / onnx)")
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    parser.add_argument("--target-agreement", type=float, default=0.999,
+                        help="학생이 바로 응답하는 행의 교사 레이블 일치율 하한")
+    parser.add_argument("--trees", type=int, default=STUDENT_PARAMS["n_estimators"])
+    parser.add_argument("--leaves", type=int, default=STUDENT_PARAMS["num_leaves"])
+    args = parser.parse_args()
+
+    models, meta, teacher = load_scoring_backend(args.teacher_backend, args.model_dir)
+    fs, path = get_filesystem(args.input)
+    with fs.open_input_file(path) as f:
+        pf = pq.ParquetFile(f)
+        columns = feature_columns(pf.schema_arrow, meta, [f"feature_{i}" for i in range(1, 8)])
+        chunks, n = [], 0
+        for batch in pf.iter_batches(batch_size=65536, columns=columns):
+            chunks.append(np.column_stack([
+                batch.column(c).to_numpy(zero_copy_only=False).astype(float, copy=False) for c in columns
+            ]))
+            n += batch.num_rows
+            if n >= args.max_rows:
+                break
+    X = np.concatenate(chunks)[:args.max_rows]
+
+    t0 = time.perf_counter()
+    teacher_prob, _ = teacher(models, meta, X, num_threads=-1)
+    teacher_sec = time.perf_counter() - t0
+    print(f"📥 {len(X):,}행 교사 채점 완료 ({teacher_sec:.1f}s)")
+
+    student = distill(X, teacher_prob, meta, {"n_estimators": args.trees, "num_leaves": args.leaves},
+                      target_agreement=args.target_agreement)
+
+    def single_row_ms(fn, n: int = 300) -> float:
+        fn()
+        times = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return round(float(np.median(times)) * 1000, 4)
+
+    row = X[:1]
+    student.info["student"]["student_ms_1row"] = single_row_ms(lambda: student.predict_proba(row))
+    student.info["student"]["teacher_ms_1row"] = single_row_ms(lambda: teacher(models, meta, row))
+
+    out_path = os.path.join(args.model_dir, STUDENT_FILENAME)
+    student.save(out_path)
+    print(f"✅ 학생 모델 저장 → {out_path}")
+    for k, v in student.info["student"].items():
+        if k != "params":
+            print(f"   {k:>20}: {v}")
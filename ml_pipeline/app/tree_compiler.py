@@ -0,0 +1,451 @@
+# ============================================================
+# 🌲 tree_compiler.py — LightGBM / XGBoost / CatBoost 트리를 NumPy 배열로 펼쳐 직접 평가
+# ------------------------------------------------------------
+# python tree_compiler.py                       # models_cache → compiled_ensemble.npz + 일치 검증
+# python tree_compiler.py --model-dir ../models --weights meta
+# ============================================================
+import os
+import json
+import argparse
+import tempfile
+import numpy as np
+
+try:
+    from .model_utils import MODEL_CACHE_DIR
+except ImportError:
+    from model_utils import MODEL_CACHE_DIR
+
+COMPILED_FILENAME = "compiled_ensemble.npz"
+# LightGBM kZeroThreshold (missing_type=Zero 판정)
+ZERO_THRESHOLD = 1e-35
+# 한 번에 평가하는 (행 × 트리) 원소 수 상한 → 10만 행도 수십 MB 안에서 처리
+MAX_CELLS = int(os.getenv("COMPILED_MAX_CELLS", str(1 << 22)))
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+# ============================================================
+# 📦 모델별 추출 → 공통 형식
+# ------------------------------------------------------------
+# 일반 트리 노드: (feature, threshold, left, right, nan_left, zero_missing, value)
+#   - 왼쪽 조건은 모두 "x < threshold" 로 통일
+#   - feature 는 입력 확장 행렬 [X(float64), X(float32 반올림)] 의 열 번호
+# 대칭(oblivious) 트리: 레벨별 (feature, border, nan_bit) + 리프 값 2^depth 개
+# ============================================================
+def _lgb_trees(booster, n_features: int):
+    dump = booster.dump_model()
+    objective = dump.get("objective", "binary sigmoid:1")
+    # cross_entropy (확률 레이블 회귀, student.py 증류 모델) 도 sigmoid(마진)
+    if not objective.startswith(("binary", "cross_entropy")):
+        raise NotImplementedError(f"LightGBM objective {objective} 미지원")
+    sigmoid = float(objective.split("sigmoid:")[1].split()[0]) if "sigmoid:" in objective else 1.0
+    n_iter = booster.best_iteration if booster.best_iteration > 0 else booster.current_iteration()
+
+    trees = []
+    for info in dump["tree_info"][:n_iter]:
+        nodes = []
+
+        def walk(node):
+            idx = len(nodes)
+            nodes.append(None)
+            if "leaf_value" in node:
+                nodes[idx] = (0, np.inf, idx, idx, True, False, float(node["leaf_value"]))
+                return idx
+            if node.get("decision_type", "<=") != "<=":
+                raise NotImplementedError("LightGBM 범주형 분할 미지원")
+            left = walk(node["left_child"])
+            right = walk(node["right_child"])
+            threshold = float(node["threshold"])
+            missing = node.get("missing_type", "None")
+            default_left = bool(node.get("default_left", True))
+            # missing_type=None 이면 NaN 을 0 으로 비교, 그 외에는 default 방향
+            nan_left = (0.0 <= threshold) if missing == "None" else default_left
+            # x <= t  ⇔  x < nextafter(t, +inf)
+            nodes[idx] = (int(node["split_feature"]), np.nextafter(threshold, np.inf), left, right,
+                          nan_left, missing == "Zero", 0.0)
+            return idx
+
+        walk(info["tree_structure"])
+        trees.append(nodes)
+    return trees, {"transform": "sigmoid", "scale": sigmoid, "bias": 0.0}
+
+
+def _xgb_trees(booster, n_features: int, best_iteration=None):
+    model = json.loads(booster.save_raw(raw_format="json"))
+    learner = model["learner"]
+    objective = learner["objective"]["name"]
+    if objective != "binary:logistic":
+        raise NotImplementedError(f"XGBoost objective {objective} 미지원")
+    gb = learner["gradient_booster"]
+    if gb["name"] != "gbtree":
+        raise NotImplementedError(f"XGBoost booster {gb['name']} 미지원")
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    raw_trees = gb["model"]["trees"]
+    if best_iteration is not None:
+        raw_trees = raw_trees[:best_iteration + 1]
+
+    trees = []
+    for t in raw_trees:
+        if any(t.get("split_type", [])):
+            raise NotImplementedError("XGBoost 범주형 분할 미지원")
+        nodes = []
+        for j, (l, r) in enumerate(zip(t["left_children"], t["right_children"])):
+            cond = float(np.float32(t["split_conditions"][j]))
+            if l == -1:
+                nodes.append((0, np.inf, j, j, True, False, cond))
+            else:
+                # XGBoost 는 float32 로 비교 → 반올림 열(n_features + f) 사용
+                nodes.append((n_features + int(t["split_indices"][j]), cond, int(l), int(r),
+                              bool(t["default_left"][j]), False, 0.0))
+        trees.append(nodes)
+    bias = float(np.log(base_score / (1 - base_score)))
+    return trees, {"transform": "sigmoid", "scale": 1.0, "bias": bias}
+
+
+def _cat_oblivious(model, n_features: int):
+    path = tempfile.mktemp(suffix=".json")
+    try:
+        model.save_model(path, format="json")
+        with open(path, "r", encoding="utf-8") as f:
+            cm = json.load(f)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    if set(cm["features_info"]) - {"float_features"}:
+        raise NotImplementedError("CatBoost 범주형/텍스트 피처 미지원")
+    float_info = cm["features_info"]["float_features"]
+    flat_index = {f["feature_index"]: f["flat_feature_index"] for f in float_info}
+    nan_max = {f["feature_index"]: f.get("nan_value_treatment") == "Max" for f in float_info}
+
+    levels, leaves = [], []
+    for t in cm["oblivious_trees"]:
+        lv = []
+        for s in t["splits"]:
+            if s.get("split_type", "FloatFeature") != "FloatFeature":
+                raise NotImplementedError("CatBoost 범주형 분할 미지원")
+            fi = s["float_feature_index"]
+            # CatBoost 도 float32 비교 (x > border → 비트 1)
+            lv.append((n_features + flat_index[fi], float(s["border"]), nan_max[fi]))
+        levels.append(lv)
+        leaves.append([float(v) for v in t["leaf_values"]])
+    scale, bias = cm.get("scale_and_bias", [1.0, [0.0]])
+    bias = bias[0] if isinstance(bias, list) else bias
+    return levels, leaves, {"transform": "sigmoid", "scale": float(scale), "bias": float(bias)}
+
+
+# ============================================================
+# 🔗 구조가 같은 트리 병합 (리프 값 합산 → 결과 동일, 평가할 트리 수 감소)
+# ============================================================
+def _merge_trees(trees: list) -> list:
+    merged = {}
+    for nodes in trees:
+        key = tuple(n[:6] if n[2] != i or n[3] != i else ("leaf",) for i, n in enumerate(nodes))
+        if key not in merged:
+            merged[key] = [list(n) for n in nodes]
+        else:
+            for node, n in zip(merged[key], nodes):
+                node[6] += n[6]
+    return [[tuple(n) for n in nodes] for nodes in merged.values()]
+
+
+def _merge_oblivious(levels: list, leaves: list) -> tuple:
+    merged = {}
+    for lv, lf in zip(levels, leaves):
+        key = tuple(lv)
+        if key not in merged:
+            merged[key] = np.array(lf, dtype=np.float64)
+        else:
+            merged[key] += lf
+    return [list(k) for k in merged], [v.tolist() for v in merged.values()]
+
+
+# ============================================================
+# 🧱 배열로 포장
+# ============================================================
+def compile_ensemble(models: dict, meta: dict, weights: dict = None) -> "CompiledEnsemble":
+    """
+    models_cache 의 세 모델 → CompiledEnsemble
+    - weights: None 이면 균등 평균 (predict_proba_batch 와 동일), {"lgb": 0.4, ...} 이면 가중 평균
+    """
+    n_features = len(meta.get("features") or [])
+    node_rows, roots, tree_model = [], [], []
+    obl_levels, obl_leaves, obl_model = [], [], []
+    outputs, names, source_trees = [], [], {}
+
+    for name in ("lgb_model", "xgb_model", "cat_model"):
+        model = models.get(name)
+        if not model:
+            continue
+        m = len(names)
+        if name == "lgb_model":
+            trees, out = _lgb_trees(model.booster_, n_features)
+        elif name == "xgb_model":
+            trees, out = _xgb_trees(model.get_booster(), n_features, getattr(model, "best_iteration", None))
+        if name != "cat_model":
+            source_trees[name] = len(trees)
+            trees = _merge_trees(trees)
+        else:
+            levels, leaves, out = _cat_oblivious(model, n_features)
+            source_trees[name] = len(levels)
+            levels, leaves = _merge_oblivious(levels, leaves)
+            obl_levels += levels
+            obl_leaves += leaves
+            obl_model += [m] * len(levels)
+            trees = []
+        for nodes in trees:
+            base = len(node_rows)
+            roots.append(base)
+            tree_model.append(m)
+            for f, thr, l, r, nan_left, zero_missing, value in nodes:
+                node_rows.append((f, thr, base + l, base + r, nan_left, zero_missing, value))
+        outputs.append(out)
+        names.append(name)
+
+    if not names:
+        raise ValueError("❌ 컴파일할 모델이 없습니다.")
+
+    w = np.ones(len(names))
+    if weights:
+        w = np.array([float(weights.get(n.replace("_model", ""), 1.0)) for n in names])
+
+    arrays = {
+        "node_feature": np.array([r[0] for r in node_rows], dtype=np.int32),
+        "node_threshold": np.array([r[1] for r in node_rows], dtype=np.float64),
+        "node_left": np.array([r[2] for r in node_rows], dtype=np.int32),
+        "node_right": np.array([r[3] for r in node_rows], dtype=np.int32),
+        "node_nan_left": np.array([r[4] for r in node_rows], dtype=bool),
+        "node_zero_missing": np.array([r[5] for r in node_rows], dtype=bool),
+        "node_value": np.array([r[6] for r in node_rows], dtype=np.float64),
+        "tree_root": np.array(roots, dtype=np.int32),
+        "tree_model": np.array(tree_model, dtype=np.int32),
+        "model_scale": np.array([o["scale"] for o in outputs]),
+        "model_bias": np.array([o["bias"] for o in outputs]),
+        "model_weight": w / w.sum(),
+    }
+
+    depth = max((len(lv) for lv in obl_levels), default=0)
+    n_obl = len(obl_levels)
+    obl_feature = np.zeros((n_obl, depth), dtype=np.int32)
+    obl_border = np.full((n_obl, depth), np.inf)
+    obl_nan_bit = np.zeros((n_obl, depth), dtype=bool)
+    obl_leaf = np.zeros((n_obl, 1 << depth))
+    for t, (lv, leaves) in enumerate(zip(obl_levels, obl_leaves)):
+        for d, (f, border, nan_bit) in enumerate(lv):
+            obl_feature[t, d], obl_border[t, d], obl_nan_bit[t, d] = f, border, nan_bit
+        obl_leaf[t, :len(leaves)] = leaves
+    arrays.update(obl_feature=obl_feature, obl_border=obl_border, obl_nan_bit=obl_nan_bit,
+                  obl_leaf=obl_leaf, obl_model=np.array(obl_model, dtype=np.int32))
+
+    info = {
+        "models": names,
+        "n_features": n_features,
+        "features": meta.get("features"),
+        "threshold": meta.get("threshold", 0.5),
+        "version": meta.get("version"),
+        "weights": "meta" if weights else "equal",
+        "source_trees": source_trees,
+    }
+    return CompiledEnsemble(arrays, info)
+
+
+# ============================================================
+# ⚡ 벡터화 평가기
+# ============================================================
+class CompiledEnsemble:
+    """
+    배열로 펼친 앙상블
+    - 분할 조건을 (열, 임계값) 단위로 중복 제거 → 배치당 비교는 고유 분할 수만큼 한 번씩 (행 × 고유 분할)
+    - 일반 트리(LightGBM/XGBoost): 모든 트리를 레벨 단위로 동시에 한 칸씩 내려감 (리프는 자기 자신을 가리킴)
+    - 대칭 트리(CatBoost): 비교 비트 행렬 @ 2^레벨 가중치 행렬 = 리프 번호 (순회 없음)
+    - 모델별 마진 합 → 시그모이드 → 가중 평균을 한 번의 호출에서 처리
+    """
+
+    def __init__(self, arrays: dict, info: dict):
+        self.a = arrays
+        self.info = info
+        self.n_models = len(info["models"])
+        self.n_features = info["n_features"]
+        self.threshold = info["threshold"]
+        self.n_trees = len(arrays["tree_root"])
+        self.n_obl = len(arrays["obl_model"])
+        # 레벨 순회 횟수 = 가장 깊은 트리 깊이
+        self.max_depth = self._max_depth()
+        self.has_zero_missing = bool(arrays["node_zero_missing"].any())
+        self._prepare()
+
+    def _max_depth(self) -> int:
+        left, right = self.a["node_left"], self.a["node_right"]
+        depth = 0
+        frontier = self.a["tree_root"].copy()
+        while len(frontier):
+            leaf = (left[frontier] == frontier) & (right[frontier] == frontier)
+            frontier = frontier[~leaf]
+            if not len(frontier):
+                break
+            frontier = np.concatenate([left[frontier], right[frontier]])
+            depth += 1
+        return depth
+
+    def _prepare(self):
+        """로드 시 1회: 고유 분할 테이블 + 트리 → 모델 합산 행렬"""
+        a = self.a
+        # 일반 트리: 리프는 항상 참인 마지막 열(임계값 +inf)을 가리킴
+        keys = np.stack([a["node_feature"].astype(np.float64), a["node_threshold"]], axis=1)
+        uniq, self.node_split = np.unique(keys, axis=0, return_inverse=True)
+        self.node_split = self.node_split.reshape(-1).astype(np.int32)
+        self.split_feature = uniq[:, 0].astype(np.int32)
+        self.split_threshold = uniq[:, 1]
+        self.tree_to_model = np.zeros((self.n_trees, self.n_models))
+        self.tree_to_model[np.arange(self.n_trees), a["tree_model"]] = 1.0
+
+        # 대칭 트리: 레벨별 분할 → 고유 분할 열, 리프 번호 = 비트 @ 2^d
+        depth = a["obl_feature"].shape[1]
+        keys = np.stack([a["obl_feature"].ravel().astype(np.float64), a["obl_border"].ravel(),
+                         a["obl_nan_bit"].ravel().astype(np.float64)], axis=1)
+        valid = np.isfinite(a["obl_border"].ravel())
+        uniq, inverse = np.unique(keys[valid], axis=0, return_inverse=True) if valid.any() \
+            else (np.zeros((0, 3)), np.zeros(0, dtype=np.int64))
+        self.obl_split_feature = uniq[:, 0].astype(np.int32)
+        self.obl_split_border = uniq[:, 1]
+        self.obl_split_nan_bit = uniq[:, 2].astype(bool)
+        level_weight = np.tile(1 << np.arange(depth), self.n_obl)[valid]
+        tree_of_level = np.repeat(np.arange(self.n_obl), depth)[valid]
+        self.obl_leaf_matrix = np.zeros((len(uniq), self.n_obl))
+        np.add.at(self.obl_leaf_matrix, (inverse.reshape(-1), tree_of_level), level_weight)
+        self.obl_leaf_flat = a["obl_leaf"].ravel()
+        self.obl_leaf_offset = np.arange(self.n_obl) * a["obl_leaf"].shape[1]
+        self.obl_to_model = np.zeros((self.n_obl, self.n_models))
+        self.obl_to_model[np.arange(self.n_obl), a["obl_model"]] = 1.0
+        # (행 × 트리) 원소 수 기준 청크 크기
+        self.chunk_rows = max(1, MAX_CELLS // max(self.n_trees + self.n_obl, 1))
+
+    def _margins(self, Xa: np.ndarray) -> np.ndarray:
+        """확장 입력 (행 × 2F) → 모델별 마진 (행 × 모델)"""
+        a = self.a
+        n = len(Xa)
+        margins = np.zeros((n, self.n_models))
+        any_nan = np.isnan(Xa).any()
+
+        if self.n_trees:
+            x = Xa[:, self.split_feature]
+            go = x < self.split_threshold                    # 행 × 고유 분할
+            nan = np.isnan(x) if any_nan else None
+            zero = (np.abs(x) <= ZERO_THRESHOLD) if self.has_zero_missing else None
+            n_split = go.shape[1]
+            go = go.ravel()
+            row_base = (np.arange(n) * n_split)[:, None]
+            node = np.broadcast_to(a["tree_root"], (n, self.n_trees))
+            for _ in range(self.max_depth):
+                cell = row_base + self.node_split[node]
+                go_left = go[cell]
+                if nan is not None or zero is not None:
+                    missing = np.zeros_like(go_left)
+                    if nan is not None:
+                        missing |= nan.ravel()[cell]
+                    if zero is not None:
+                        missing |= zero.ravel()[cell] & a["node_zero_missing"][node]
+                    if missing.any():
+                        go_left = np.where(missing, a["node_nan_left"][node], go_left)
+                node = np.where(go_left, a["node_left"][node], a["node_right"][node])
+            margins += a["node_value"][node] @ self.tree_to_model
+
+        if self.n_obl:
+            x = Xa[:, self.obl_split_feature]
+            bits = x > self.obl_split_border                  # 행 × 고유 분할
+            if any_nan:
+                bits = np.where(np.isnan(x), self.obl_split_nan_bit, bits)
+            leaf = (bits.astype(np.float64) @ self.obl_leaf_matrix).astype(np.int64)
+            margins += self.obl_leaf_flat[leaf + self.obl_leaf_offset] @ self.obl_to_model
+        return margins
+
+    def model_proba(self, X) -> np.ndarray:
+        """모델별 양성 확률 (행 × 모델)"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        Xa = np.hstack([X, X.astype(np.float32).astype(np.float64)])
+        chunk = self.chunk_rows
+        out = np.empty((len(X), self.n_models))
+        for i in range(0, len(X), chunk):
+            margins = self._margins(Xa[i:i + chunk])
+            out[i:i + chunk] = _sigmoid(self.a["model_scale"] * margins + self.a["model_bias"])
+        return out
+
+    def predict_proba(self, X) -> np.ndarray:
+        """가중 평균 양성 확률"""
+        return self.model_proba(X) @ self.a["model_weight"]
+
+    def predict(self, X) -> tuple:
+        """(확률 배열, 레이블 배열) — predict_proba_batch 와 같은 반환 형식"""
+        prob = self.predict_proba(X)
+        return prob, (prob >= self.threshold).astype(int)
+
+    # --------------------------------------------------------
+    # 💾 저장 / 로드
+    # --------------------------------------------------------
+    def save(self, path: str):
+        np.savez_compressed(path, info=np.array(json.dumps(self.info, ensure_ascii=False)), **self.a)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledEnsemble":
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {k: z[k] for k in z.files if k != "info"}
+            info = json.loads(str(z["info"]))
+        return cls(arrays, info)
+
+
+# ============================================================
+# 🔍 일치 검증
+# ============================================================
+def parity_report(compiled: CompiledEnsemble, models: dict, X: np.ndarray) -> dict:
+    """모델별 / 앙상블 최대 절대 오차 (네이티브 부스터 대비)"""
+    try:
+        from .model_utils import positive_proba
+    except ImportError:
+        from model_utils import positive_proba
+
+    per_model = compiled.model_proba(X)
+    report, native = {}, []
+    for m, name in enumerate(compiled.info["models"]):
+        ref = positive_proba(name, models[name], X, num_threads=-1)
+        native.append(ref)
+        report[name] = float(np.max(np.abs(per_model[:, m] - ref)))
+    blended = np.column_stack(native) @ compiled.a["model_weight"]
+    report["ensemble"] = float(np.max(np.abs(per_model @ compiled.a["model_weight"] - blended)))
+    report["label_mismatch"] = int(((blended >= compiled.threshold) !=
+                                    (compiled.predict_proba(X) >= compiled.threshold)).sum())
+    return report
+
+
+if __name__ == "__main__":
+    try:
+        from .model_utils import load_local_models
+    except ImportError:
+        from model_utils import load_local_models
+
+    parser = argparse.ArgumentParser(description="트리 앙상블 → NumPy 배열 컴파일")
+    parser.add_argument("--model-dir", default=MODEL_CACHE_DIR)
+    parser.add_argument("--weights", choices=["equal", "meta"], default="equal",
+                        help="equal: 서빙 기본 경로와 같은 균등 평균 / meta: model_meta.json weights")
+    parser.add_argument("--check-rows", type=int, default=20000, help="일치 검증용 합성 행 수")
+    args = parser.parse_args()
+
+    models, meta = load_local_models(args.model_dir)
+    compiled = compile_ensemble(models, meta, meta.get("weights") if args.weights == "meta" else None)
+    out_path = os.path.join(args.model_dir, COMPILED_FILENAME)
+    compiled.save(out_path)
+    print(f"✅ 컴파일 완료 → {out_path} (원본 트리 {compiled.info['source_trees']} → "
+          f"일반 트리 {compiled.n_trees}개 / 노드 {len(compiled.a['node_value'])}개, "
+          f"대칭 트리 {compiled.n_obl}개, 최대 깊이 {compiled.max_depth})")
+
+    rng = np.random.default_rng(0)
+    X = rng.gamma(shape=1.5, scale=5.0, size=(args.check_rows, compiled.n_features))
+    X[:, -2:] = rng.random((args.check_rows, 2))
+    X[rng.random(X.shape) < 0.01] = np.nan
+    report = parity_report(CompiledEnsemble.load(out_path), models, X)
+    print("🔍 네이티브 대비 최대 절대 오차:")
+    for k, v in report.items():
+        print(f"   {k:>15}: {v}")
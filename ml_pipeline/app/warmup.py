@@ -0,0 +1,132 @@
+# ============================================================
+# 🔥 warmup.py — 기동 직후 모델 워밍업 + 준비 상태(readiness) 관리
+# ============================================================
+import os
+import time
+import threading
+from datetime import datetime
+import numpy as np
+
+try:
+    from .model_utils import positive_proba, predict_proba
+except ImportError:
+    from model_utils import positive_proba, predict_proba
+
+# 여러 크기의 합성 배치를 모델별로 한 번씩 → 부스터 내부 지연 초기화 유도
+WARMUP_BATCH_SIZES = [int(x) for x in os.getenv("WARMUP_BATCH_SIZES", "1,16,256,2048").split(",")]
+# 단건 경로 지연시간 안정화 판정: 창 1개 = WARMUP_WINDOW 회 호출
+WARMUP_WINDOW = int(os.getenv("WARMUP_WINDOW", "50"))
+WARMUP_MAX_WINDOWS = int(os.getenv("WARMUP_MAX_WINDOWS", "20"))
+# 직전 창 대비 p99 개선폭이 이 비율 이하면 안정화로 간주
+WARMUP_P99_TOLERANCE = float(os.getenv("WARMUP_P99_TOLERANCE", "0.10"))
+
+
+def _ms(sec: float) -> float:
+    return round(float(sec) * 1000, 3)
+
+
+def _synthetic_batch(n: int, n_features: int, seed: int = 0) -> np.ndarray:
+    """0 이상 값의 합성 입력 (카운트형 + 비율형 피처가 섞인 형태)"""
+    rng = np.random.default_rng(seed)
+    X = rng.gamma(shape=1.5, scale=5.0, size=(n, n_features))
+    X[:, -2:] = rng.random((n, 2))
+    return X
+
+
+class ServiceState:
+    """
+    서빙 프로세스 상태
+    - 라이브니스: 프로세스가 떠 있으면 항상 OK
+    - 레디니스: 모델 로드 + 워밍업(단건 p99 안정화)이 끝나야 OK
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.load_sec = None
+        self.warmup = None
+        self.error = None
+        self.ready = threading.Event()
+
+    def mark_loaded(self, load_sec: float):
+        self.load_sec = load_sec
+
+    def liveness(self) -> dict:
+        return {
+            "status": "alive",
+            "pid": os.getpid(),
+            "uptime_sec": round(time.time() - self.started_at, 1),
+        }
+
+    def readiness(self) -> dict:
+        return {
+            "ready": self.ready.is_set(),
+            "status": "ready" if self.ready.is_set() else ("failed" if self.error else "warming_up"),
+            "model_load_ms": _ms(self.load_sec) if self.load_sec is not None else None,
+            "warmup": self.warmup,
+            "error": self.error,
+        }
+
+    # --------------------------------------------------------
+    # 🔥 워밍업
+    # --------------------------------------------------------
+    def run_warmup(self, models: dict, meta: dict, predict_batch_fn):
+        """
+        서빙과 같은 입력(meta['features'] 순서 ndarray)과 같은 호출로 워밍업 → 네이티브 부스터 경로의 지연 초기화를 여기서 끝냄
+        1) 모델별(positive_proba) + 앙상블(predict_batch_fn, /predict/batch 경로) × 배치 크기별 합성 예측 (첫 호출 시간 기록)
+        2) serve_model.predict_single 과 같은 단건 경로로 창 단위 반복 → p99 가 안정되면 준비 완료
+           (네이티브: predict_proba / compiled·onnx: predict_batch_fn, 모두 1행 ndarray)
+        """
+        started = time.perf_counter()
+        n_features = len(meta.get("features") or [])
+        try:
+            def first_calls(fn) -> dict:
+                timings = {}
+                for n in WARMUP_BATCH_SIZES:
+                    X = _synthetic_batch(n, n_features, seed=n)
+                    t0 = time.perf_counter()
+                    fn(X)
+                    timings[str(n)] = _ms(time.perf_counter() - t0)
+                return timings
+
+            per_model = {name: first_calls(lambda X, name=name, model=model: positive_proba(name, model, X))
+                         for name, model in models.items() if model is not None}
+            per_model["ensemble"] = first_calls(lambda X: predict_batch_fn(models, meta, X))
+
+            def predict_one(row: np.ndarray):
+                if models:
+                    return predict_proba(models, meta, row)
+                return predict_batch_fn(models, meta, row)
+
+            windows, stable = [], False
+            X = _synthetic_batch(WARMUP_WINDOW, n_features, seed=1)
+            for _ in range(WARMUP_MAX_WINDOWS):
+                lat = []
+                for i in range(len(X)):
+                    row = X[i:i + 1]
+                    t0 = time.perf_counter()
+                    predict_one(row)
+                    lat.append(time.perf_counter() - t0)
+                windows.append({"p50_ms": _ms(np.percentile(lat, 50)), "p99_ms": _ms(np.percentile(lat, 99))})
+                stable = len(windows) >= 2 and \
+                    windows[-1]["p99_ms"] >= windows[-2]["p99_ms"] * (1 - WARMUP_P99_TOLERANCE)
+                if stable:
+                    break
+
+            self.warmup = {
+                "batch_first_call_ms": per_model,
+                "single_row_windows": windows,
+                "p99_stable": stable,
+                "warmup_ms": _ms(time.perf_counter() - started),
+                "finished_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self.ready.set()
+            print(f"✅ 워밍업 완료 ({self.warmup['warmup_ms']:.0f}ms, "
+                  f"단건 p99 {windows[-1]['p99_ms']}ms, 창 {len(windows)}개)")
+        except Exception as e:
+            self.error = f"워밍업 실패: {e}"
+            print(f"❌ {self.error}")
+
+    def start_warmup(self, models: dict, meta: dict, predict_batch_fn):
+        """백그라운드 스레드로 워밍업 (그동안 /health 는 응답, /ready 는 503)"""
+        threading.Thread(target=self.run_warmup, args=(models, meta, predict_batch_fn),
+                         name="model-warmup", daemon=True).start()
@@ -0,0 +1,189 @@
+# ============================================================
+# 📨 wire_format.py — 예측 요청/응답 직렬화 (JSON / msgpack / float32)
+# ============================================================
+import json
+import numpy as np
+from fastapi import Response
+
+# orjson / msgpack 이 없으면 표준 json 으로 대체, msgpack 요청은 415
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+# 리틀엔디언 float32 원시 배열 (요청: 행 × 피처, 응답: 확률 float32[n] + 레이블 uint8[n])
+FLOAT32 = "application/octet-stream"
+MEDIA_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+# OpenAPI 문서용 (본문을 직접 파싱하므로 pydantic 스키마 대신 명시)
+def openapi_body(schema: dict) -> dict:
+    return {"requestBody": {"required": True, "content": {
+        JSON: {"schema": schema},
+        MSGPACK: {"schema": schema},
+        FLOAT32: {"schema": {"type": "string", "format": "binary"}},
+    }}}
+
+
+class WireFormatError(Exception):
+    """요청 본문 해석 실패 (status_code: 415 미지원 형식 / 422 값 오류)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def media_type(header: str) -> str:
+    """Content-Type / Accept 헤더 → 지원 형식 1개 (파라미터, q 값은 무시하고 앞에서부터)"""
+    for part in (header or "").split(","):
+        mt = part.split(";")[0].strip().lower()
+        mt = MEDIA_ALIASES.get(mt, mt)
+        if mt in (JSON, MSGPACK, FLOAT32):
+            return mt
+    return None
+
+
+# ============================================================
+# 📥 요청 디코딩
+# ============================================================
+def _loads(body: bytes, content_type: str):
+    if content_type == MSGPACK:
+        if msgpack is None:
+            raise WireFormatError(415, "서버에 msgpack 이 설치되어 있지 않습니다")
+        return msgpack.unpackb(body)
+    if orjson is None:
+        return json.loads(body)
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        # orjson 은 NaN / Infinity 토큰을 거부 → 빈 셀을 NaN 으로 보내는 클라이언트(대시보드 등)를 위해 표준 json 으로 재시도
+        return json.loads(body)
+
+
+def _request_type(header: str) -> str:
+    # Content-Type 이 없으면 JSON 으로 간주 (기존 클라이언트 호환)
+    if not header:
+        return JSON
+    mt = media_type(header)
+    if mt is None:
+        raise WireFormatError(415, f"지원하지 않는 Content-Type: {header} ({JSON}, {MSGPACK}, {FLOAT32})")
+    return mt
+
+
+def decode_single(body: bytes, content_type: str, feature_keys: list) -> list:
+    """
+    단건 요청 → 피처 값 리스트 (feature_keys 순서)
+    - JSON / msgpack: {"feature_1": ..., ...} (msgpack 은 값 배열도 허용)
+    - float32: 피처 수 × 4바이트
+    """
+    mt = _request_type(content_type)
+    n = len(feature_keys)
+    if mt == FLOAT32:
+        if len(body) != 4 * n:
+            raise WireFormatError(422, f"float32 본문은 {4 * n}바이트여야 합니다 (받은 값 {len(body)}바이트)")
+        return np.frombuffer(body, dtype="<f4").astype(float).tolist()
+
+    try:
+        payload = _loads(body, mt)
+    except WireFormatError:
+        raise
+    except Exception as e:
+        raise WireFormatError(422, f"본문 해석 실패: {e}")
+
+    if isinstance(payload, (list, tuple)) and mt == MSGPACK:
+        values = list(payload)
+        if len(values) != n:
+            raise WireFormatError(422, f"값 {n}개가 필요합니다 (받은 값 {len(values)}개)")
+    elif isinstance(payload, dict):
+        missing = [k for k in feature_keys if k not in payload]
+        if missing:
+            raise WireFormatError(422, f"누락된 피처: {missing}")
+        values = [payload[k] for k in feature_keys]
+    else:
+        raise WireFormatError(422, f"{feature_keys} 키를 가진 객체가 필요합니다")
+
+    try:
+        return [float(v) for v in values]
+    except (TypeError, ValueError):
+        raise WireFormatError(422, "피처 값은 숫자여야 합니다")
+
+
+def decode_batch(body: bytes, content_type: str, n_features: int) -> np.ndarray:
+    """
+    배치 요청 → (행 × 피처) float 배열
+    - JSON / msgpack: {"instances": [[...], ...]}
+    - float32: 행 × 피처 × 4바이트 (행 우선)
+    """
+    mt = _request_type(content_type)
+    if mt == FLOAT32:
+        row_bytes = 4 * n_features
+        if len(body) % row_bytes:
+            raise WireFormatError(422, f"float32 본문 길이는 {row_bytes}바이트(행 1개)의 배수여야 합니다")
+        return np.frombuffer(body, dtype="<f4").reshape(-1, n_features).astype(float)
+
+    try:
+        payload = _loads(body, mt)
+    except WireFormatError:
+        raise
+    except Exception as e:
+        raise WireFormatError(422, f"본문 해석 실패: {e}")
+
+    instances = payload.get("instances") if isinstance(payload, dict) else None
+    if not isinstance(instances, list):
+        raise WireFormatError(422, "instances 배열이 필요합니다")
+    if not instances:
+        return np.empty((0, n_features))
+    if any(not isinstance(row, (list, tuple)) or len(row) != n_features for row in instances):
+        raise WireFormatError(422, f"각 행은 값 {n_features}개여야 합니다")
+    try:
+        return np.asarray(instances, dtype=float)
+    except (TypeError, ValueError):
+        raise WireFormatError(422, "피처 값은 숫자여야 합니다")
+
+
+# ============================================================
+# 📤 응답 인코딩
+# ============================================================
+def response_type(accept: str, content_type: str) -> str:
+    """Accept 가 지원 형식이면 그대로, 아니면 요청과 같은 형식 (기본 JSON)"""
+    mt = media_type(accept) or media_type(content_type) or JSON
+    if mt == MSGPACK and msgpack is None:
+        return JSON
+    return mt
+
+
+def encode_response(payload: dict, mt: str) -> Response:
+    """
+    payload: probability/prediction (단건) 또는 probabilities/predictions (배치, ndarray 가능)
+    - float32: 확률 float32[n] + 레이블 uint8[n], threshold/행 수는 헤더
+    """
+    if mt == FLOAT32:
+        probs = np.atleast_1d(np.asarray(payload.get("probabilities", payload.get("probability")), dtype="<f4"))
+        preds = np.atleast_1d(np.asarray(payload.get("predictions", payload.get("prediction")), dtype=np.uint8))
+        headers = {"X-Rows": str(len(probs)), "X-Threshold": repr(float(payload["threshold"]))}
+        if "degraded" in payload:
+            headers["X-Degraded"] = str(bool(payload["degraded"])).lower()
+        return Response(probs.tobytes() + preds.tobytes(), media_type=FLOAT32, headers=headers)
+
+    if mt == MSGPACK:
+        body = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in payload.items()}
+        return Response(msgpack.packb(body), media_type=MSGPACK)
+
+    if orjson is not None:
+        return Response(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY), media_type=JSON)
+    body = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in payload.items()}
+    return Response(json.dumps(body), media_type=JSON)
+
+
+def decode_float32_response(body: bytes) -> tuple:
+    """float32 응답 → (확률 배열, 레이블 배열) — 클라이언트/벤치마크용"""
+    n = len(body) // 5
+    probs = np.frombuffer(body[:4 * n], dtype="<f4")
+    preds = np.frombuffer(body[4 * n:], dtype=np.uint8)
+    return probs, preds
@@ -0,0 +1,131 @@
+# ============================================================
+# 🧊 onnx_backend_bench.py — 채점 백엔드(native / compiled / onnx) 비교
+# ------------------------------------------------------------
+#   python ml_pipeline/app/onnx_backend.py        # ensemble.onnx 생성
+#   python ml_pipeline/app/tree_compiler.py       # compiled_ensemble.npz 생성 (선택)
+#   python ml_pipeline/benchmarks/onnx_backend_bench.py [--model-dir ...] [--input holdout.parquet]
+#
+# - 백엔드마다 새 프로세스: import + 로드 시간, 최대 RSS, 배치 크기별 지연 (num_threads=1)
+# - 일치 검증: 학습/검증에 쓰지 않은 행 (--input Parquet 또는 별도 시드 합성 행) 에서 native 대비 오차
+# ============================================================
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+_STARTED = time.perf_counter()
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+BOOSTER_MODULES = ("lightgbm", "xgboost", "catboost")
+
+
+def make_rows(n: int, n_features: int, seed: int):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    X = rng.gamma(shape=1.5, scale=5.0, size=(n, n_features))
+    X[:, -2:] = rng.random((n, 2))
+    X[rng.random(X.shape) < 0.01] = np.nan
+    return X
+
+
+def time_call(fn, min_sec: float = 0.3, max_calls: int = 500) -> float:
+    """호출당 중앙값 ms"""
+    import numpy as np
+    fn()
+    times, started = [], time.perf_counter()
+    while len(times) < max_calls and (time.perf_counter() - started < min_sec or len(times) < 3):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)) * 1000
+
+
+def child(backend: str, model_dir: str) -> dict:
+    """새 프로세스 안에서 실행 → 결과 dict (stdout 마지막 줄 JSON)"""
+    import resource
+    import numpy as np
+    from model_utils import load_scoring_backend
+
+    models, meta, predict_batch = load_scoring_backend(backend, model_dir)
+    X = make_rows(1, len(meta["features"]), seed=0)
+    predict_batch(models, meta, X)  # 지연 초기화 포함 첫 호출까지를 로드 시간으로
+    res = {
+        "backend": backend,
+        "import_load_ms": round((time.perf_counter() - _STARTED) * 1000, 1),
+        "booster_modules": [m for m in BOOSTER_MODULES if m in sys.modules],
+    }
+    for n in BATCH_SIZES:
+        X = make_rows(n, len(meta["features"]), seed=n)
+        res[f"batch_{n}_ms"] = round(time_call(lambda: predict_batch(models, meta, X, num_threads=1)), 4)
+    # 대량 채점 경로 (BULK_NUM_THREADS=-1 과 같은 전체 코어)
+    res[f"batch_{BATCH_SIZES[-1]}_allthreads_ms"] = round(
+        time_call(lambda: predict_batch(models, meta, X, num_threads=-1)), 4)
+    res["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return res
+
+
+def parity(model_dir: str, input_path: str, rows: int) -> list:
+    import numpy as np
+    import pandas as pd
+    from model_utils import load_scoring_backend, load_local_models, predict_proba_batch
+
+    models, meta = load_local_models(model_dir)
+    if input_path:
+        X = pd.read_parquet(input_path, columns=meta["features"]).to_numpy(dtype=float)[:rows]
+    else:
+        # 학습 분포와 무관한 별도 시드 (tree_compiler / onnx_backend 검증 시드와도 다름)
+        X = make_rows(rows, len(meta["features"]), seed=20251022)
+    ref, ref_label = predict_proba_batch(models, meta, X, num_threads=-1)
+
+    out = []
+    for backend in ("compiled", "onnx"):
+        try:
+            _, _, predict_batch = load_scoring_backend(backend, model_dir)
+        except Exception as e:
+            print(f"⚠️ {backend} 건너뜀: {e}")
+            continue
+        if predict_batch.info.get("weights") != "equal":
+            print(f"⚠️ {backend} 산출물이 meta 가중치로 만들어짐 → 균등 평균(native 서빙)과 비교하려면 --weights equal 로 다시 생성")
+        prob, label = predict_batch({}, meta, X, num_threads=-1)
+        diff = np.abs(prob - ref)
+        out.append({"backend": backend, "rows": len(X), "max_abs_diff": float(diff.max()),
+                    "mean_abs_diff": float(diff.mean()), "label_mismatch": int((label != ref_label).sum())})
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="채점 백엔드 벤치마크 (import/로드 시간, RSS, 지연, 일치)")
+    parser.add_argument("--model-dir", default=os.path.join(APP_DIR, "models_cache"))
+    parser.add_argument("--input", default=None, help="일치 검증용 보류 데이터 Parquet (meta['features'] 컬럼)")
+    parser.add_argument("--parity-rows", type=int, default=100000)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.model_dir)))
+        sys.exit(0)
+
+    import pandas as pd
+
+    rows = []
+    for backend in ("native", "compiled", "onnx"):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", backend,
+                               "--model-dir", args.model_dir], capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"⚠️ {backend} 실패: {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        print(f"   {backend:>8}: 로드 {rows[-1]['import_load_ms']}ms, RSS {rows[-1]['max_rss_mb']}MB, "
+              f"단건 {rows[-1]['batch_1_ms']}ms")
+
+    pd.set_option("display.width", 200)
+    print()
+    print(pd.DataFrame(rows).to_string(index=False))
+    print()
+    print("🔍 native 대비 일치 검증:")
+    print(pd.DataFrame(parity(args.model_dir, args.input, args.parity_rows)).to_string(index=False))
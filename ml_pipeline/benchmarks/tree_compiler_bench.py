@@ -0,0 +1,78 @@
+# ============================================================
+# 🌲 tree_compiler_bench.py — 컴파일된 NumPy 평가기 vs 라이브러리 예측 경로
+# ------------------------------------------------------------
+#   python ml_pipeline/benchmarks/tree_compiler_bench.py [--model-dir ...] [--weights meta]
+# ============================================================
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from model_utils import MODEL_CACHE_DIR, load_local_models, predict_proba_batch  # noqa: E402
+from tree_compiler import compile_ensemble, parity_report  # noqa: E402
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+
+
+def make_rows(n: int, n_features: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    X = rng.gamma(shape=1.5, scale=5.0, size=(n, n_features))
+    X[:, -2:] = rng.random((n, 2))
+    return X
+
+
+def time_call(fn, min_sec: float = 0.5, max_calls: int = 2000) -> float:
+    """호출당 중앙값 ms (최소 min_sec 또는 max_calls 회)"""
+    fn()
+    times, started = [], time.perf_counter()
+    while len(times) < max_calls and (time.perf_counter() - started < min_sec or len(times) < 3):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="트리 컴파일 평가기 벤치마크")
+    parser.add_argument("--model-dir", default=MODEL_CACHE_DIR)
+    parser.add_argument("--weights", choices=["equal", "meta"], default="equal")
+    args = parser.parse_args()
+
+    models, meta = load_local_models(args.model_dir)
+    weights = meta.get("weights") if args.weights == "meta" else None
+    compiled = compile_ensemble(models, meta, weights)
+    features = meta.get("features")
+    w = compiled.a["model_weight"]
+
+    def library(X, num_threads):
+        if weights is None:
+            return predict_proba_batch(models, meta, X, num_threads=num_threads)[0]
+        from model_utils import positive_proba
+        return np.column_stack([positive_proba(n, models[n], X, num_threads)
+                                for n in compiled.info["models"]]) @ w
+
+    parity = parity_report(compiled, models, make_rows(20000, len(features), seed=1))
+    print(f"🔍 일치 검증 (2만 행, 최대 절대 오차): {parity}")
+
+    rows = []
+    for n in BATCH_SIZES:
+        X = make_rows(n, len(features))
+        df = pd.DataFrame(X, columns=features)
+        res = {"batch": n}
+        # 래퍼 경로는 10만 행에서 수 초 → 호출 수 제한
+        res["sklearn_wrapper_ms"] = time_call(lambda: predict_proba_batch(models, meta, df.copy()), max_calls=50) \
+            if weights is None else None
+        res["native_1thread_ms"] = time_call(lambda: library(X, 1), max_calls=200)
+        res["native_allthreads_ms"] = time_call(lambda: library(X, -1), max_calls=200)
+        res["compiled_ms"] = time_call(lambda: compiled.predict_proba(X), max_calls=200)
+        res["speedup_vs_native_1t"] = round(res["native_1thread_ms"] / res["compiled_ms"], 2)
+        rows.append(res)
+        print(f"   batch={n:>6}: native(1t) {res['native_1thread_ms']:.3f}ms  "
+              f"native(all) {res['native_allthreads_ms']:.3f}ms  compiled {res['compiled_ms']:.3f}ms")
+
+    pd.set_option("display.width", 160)
+    print()
+    print(pd.DataFrame(rows).round(3).to_string(index=False))
@@ -0,0 +1,192 @@
+# ============================================================
+# 📨 wire_format_bench.py — JSON vs msgpack vs float32 직렬화 벤치마크
+# ------------------------------------------------------------
+# 1) 코덱만: 요청 디코딩 + 응답 인코딩 (서버 없이, pydantic 기존 경로 포함)
+# 2) 엔드투엔드: 실행 중인 서빙 API 에 동시 요청 → requests/sec, rows/sec, p50/p99
+#
+#   uvicorn serve_model:app --port 8000 --workers 2     (ml_pipeline/app 에서)
+#   python ml_pipeline/benchmarks/wire_format_bench.py --url http://localhost:8000
+# ============================================================
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from wire_format import (  # noqa: E402
+    JSON, MSGPACK, FLOAT32, decode_single, decode_batch, encode_response, decode_float32_response, msgpack, orjson
+)
+
+FEATURE_KEYS = [f"feature_{i}" for i in range(1, 8)]
+BATCH_SIZES = [1, 100, 10000]
+FORMATS = [JSON, MSGPACK, FLOAT32]
+SHORT = {JSON: "json", MSGPACK: "msgpack", FLOAT32: "float32"}
+
+
+def make_rows(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    X = rng.gamma(shape=1.5, scale=5.0, size=(n, len(FEATURE_KEYS)))
+    X[:, -2:] = rng.random((n, 2))
+    return X
+
+
+def encode_request(X: np.ndarray, fmt: str) -> bytes:
+    """batch=1 → /predict 단건 형식, 그 외 → /predict/batch 형식"""
+    if fmt == FLOAT32:
+        return X.astype("<f4").tobytes()
+    body = dict(zip(FEATURE_KEYS, X[0].tolist())) if len(X) == 1 else {"instances": X.tolist()}
+    if fmt == MSGPACK:
+        return msgpack.packb(body)
+    return orjson.dumps(body)
+
+
+# ============================================================
+# 1️⃣ 코덱 벤치마크 (서버 없이)
+# ============================================================
+def bench_codec(repeat_sec: float = 1.0) -> pd.DataFrame:
+    from pydantic import BaseModel
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    import json
+
+    class SessionFeatures(BaseModel):
+        feature_1: float
+        feature_2: float
+        feature_3: float
+        feature_4: float
+        feature_5: float
+        feature_6: float
+        feature_7: float
+
+    class BatchSessionFeatures(BaseModel):
+        instances: List[List[float]]
+
+    def pydantic_path(body, n):
+        # 기존 경로: pydantic 검증 → dict/ndarray → jsonable_encoder + json.dumps
+        if n == 1:
+            row = SessionFeatures.model_validate_json(body).model_dump()
+            out = {"probability": 0.5, "prediction": 0, "threshold": 0.5}
+            _ = list(row.values())
+        else:
+            X = np.asarray(BatchSessionFeatures.model_validate_json(body).instances, dtype=float)
+            out = {"probabilities": np.full(len(X), 0.5).tolist(), "predictions": [0] * len(X), "threshold": 0.5}
+        return json.dumps(jsonable_encoder(out)).encode()
+
+    def new_path(body, fmt, n):
+        if n == 1:
+            decode_single(body, fmt, FEATURE_KEYS)
+            out = {"probability": 0.5, "prediction": 0, "threshold": 0.5}
+        else:
+            X = decode_batch(body, fmt, len(FEATURE_KEYS))
+            out = {"probabilities": np.full(len(X), 0.5), "predictions": np.zeros(len(X), dtype=int), "threshold": 0.5}
+        return encode_response(out, fmt).body
+
+    rows = []
+    for n in BATCH_SIZES:
+        X = make_rows(n)
+        cases = [("json (pydantic, 기존)", encode_request(X, JSON), lambda b: pydantic_path(b, n))]
+        for fmt in FORMATS:
+            cases.append((SHORT[fmt], encode_request(X, fmt), lambda b, f=fmt: new_path(b, f, n)))
+        for name, body, fn in cases:
+            fn(body)
+            calls, t0 = 0, time.perf_counter()
+            while time.perf_counter() - t0 < repeat_sec:
+                fn(body)
+                calls += 1
+            us = (time.perf_counter() - t0) / calls * 1e6
+            rows.append({"batch": n, "format": name, "request_bytes": len(body), "codec_us": round(us, 1)})
+    return pd.DataFrame(rows)
+
+
+# ============================================================
+# 2️⃣ 엔드투엔드 벤치마크 (실행 중인 API)
+# ============================================================
+def bench_http(url: str, n: int, fmt: str, duration: float, concurrency: int) -> dict:
+    X = make_rows(n)
+    body = encode_request(X, fmt)
+    path = "/predict" if n == 1 else "/predict/batch"
+    headers = {"Content-Type": fmt, "Accept": fmt, "X-Deadline-Ms": "60000"}
+
+    latencies, errors, lock = [], [0], threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local = []
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            r = session.post(url + path, data=body, headers=headers, timeout=60)
+            if r.status_code != 200:
+                with lock:
+                    errors[0] += 1
+                continue
+            if fmt == FLOAT32:
+                decode_float32_response(r.content)
+            elif fmt == MSGPACK:
+                msgpack.unpackb(r.content)
+            else:
+                orjson.loads(r.content)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    # 워밍업 1회
+    requests.post(url + path, data=body, headers=headers, timeout=60).raise_for_status()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    lat = np.array(latencies) * 1000
+    return {
+        "batch": n,
+        "format": SHORT[fmt],
+        "request_bytes": len(body),
+        "requests_per_sec": round(len(lat) / elapsed, 1),
+        "rows_per_sec": round(len(lat) * n / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2) if len(lat) else None,
+        "p99_ms": round(float(np.percentile(lat, 99)), 2) if len(lat) else None,
+        "errors": errors[0],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="예측 API 직렬화 형식별 처리량 비교")
+    parser.add_argument("--url", default=os.getenv("API_BASE_URL", ""),
+                        help="서빙 API 주소 (비우면 코덱 벤치마크만 실행)")
+    parser.add_argument("--duration", type=float, default=5.0, help="조합별 측정 시간(초)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 스레드 수")
+    parser.add_argument("--out", default="", help="결과 CSV 저장 경로 (선택)")
+    args = parser.parse_args()
+
+    if orjson is None or msgpack is None:
+        sys.exit("❌ orjson, msgpack 이 필요합니다 (pip install orjson msgpack)")
+
+    pd.set_option("display.width", 140)
+    print("📨 코덱 벤치마크 (요청 디코딩 + 응답 인코딩, 서버 없이)")
+    codec = bench_codec()
+    print(codec.to_string(index=False))
+
+    if args.url:
+        url = args.url.rstrip("/")
+        print(f"\n🚀 엔드투엔드 벤치마크 ({url}, 동시 {args.concurrency}, 조합별 {args.duration:.0f}s)")
+        results = []
+        for n in BATCH_SIZES:
+            for fmt in FORMATS:
+                res = bench_http(url, n, fmt, args.duration, args.concurrency)
+                print(f"   batch={n:>5} {res['format']:>8}: {res['requests_per_sec']:>8.1f} req/s "
+                      f"{res['rows_per_sec']:>10.1f} rows/s  p50 {res['p50_ms']}ms  p99 {res['p99_ms']}ms")
+                results.append(res)
+        e2e = pd.DataFrame(results)
+        print()
+        print(e2e.to_string(index=False))
+        if args.out:
+            e2e.to_csv(args.out, index=False)
+            print(f"✅ 결과 저장: {args.out}")
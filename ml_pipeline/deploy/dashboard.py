@@ -1,17 +1,305 @@
 # =====================================================
 # dashboard.py (최종 안정 버전)
 # =====================================================
+import os
+import sys
 import streamlit as st
 import pandas as pd
+import numpy as np
 import requests
 import plotly.graph_objects as go
 import time
+import random
+import gzip
+import shutil
+import tempfile
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
 # =========================================
 # 🔧 API 설정
 # =========================================
-API_URL = "https://purchase-prediction-system.onrender.com/predict"
+API_BASE_URL = os.getenv("API_BASE_URL", "https://purchase-prediction-system.onrender.com").rstrip("/")
+API_URL = f"{API_BASE_URL}/predict"
+BATCH_API_URL = f"{API_BASE_URL}/predict/batch"
+
+# 배치 예측: 청크 단위 요청 + 동시 요청 수 제한 + 청크별 재시도
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "2000"))
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "4"))
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "3"))
+BATCH_TIMEOUT_SEC = float(os.getenv("BATCH_TIMEOUT_SEC", "30"))
+
+# CSV 업로드는 이 행 수 단위로 읽고 → 예측 → 결과 파일에 이어쓰기 (메모리 사용량 일정)
+CSV_READ_CHUNK_ROWS = int(os.getenv("CSV_READ_CHUNK_ROWS", "50000"))
+RESULT_PREVIEW_ROWS = 1000
+# 결과 다운로드: download_button 은 파일 전체를 메모리에 올리므로 gzip 압축 후 이 크기 이하만 제공
+RESULT_DOWNLOAD_MAX_MB = int(os.getenv("RESULT_DOWNLOAD_MAX_MB", "50"))
+REQ_COLS = ["session_id", "event_count", "n_view", "n_cart", "n_trans", "n_trans_ratio", "n_view_ratio"]
+
+# 단건 예측 재시도 (Render 무료 플랜 콜드스타트 ~1분 → 2, 4, 8, 16, 30초 백오프)
+PREDICT_MAX_RETRIES = int(os.getenv("PREDICT_MAX_RETRIES", "6"))
+BACKOFF_BASE_SEC = 2.0
+BACKOFF_MAX_SEC = 30.0
+
+HEALTH_TTL_SEC = int(os.getenv("HEALTH_TTL_SEC", "30"))
+
+# 서버 KPI 집계(/stats) 폴링 주기 — 대시보드 프로세스 전체에서 TTL 당 1회만 호출
+STATS_TTL_SEC = int(os.getenv("STATS_TTL_SEC", "10"))
+KPI_WINDOW_MINUTES = int(os.getenv("KPI_WINDOW_MINUTES", "60"))
+
+# 추론 모드: "local" = 대시보드 프로세스 안에서 models_cache 로 직접 예측, "remote" = API 호출
+# (local 은 api_requirements.txt 의 모델 라이브러리 필요, 로드 실패 시 원격 API 로 대체)
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "remote").lower()
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+LOCAL_MODEL_DIR = os.getenv("LOCAL_MODEL_DIR", os.path.join(APP_DIR, "models_cache"))
+FEATURE_KEYS = [f"feature_{i}" for i in range(1, 8)]
+
+# =========================================
+# 🔌 HTTP 세션 (연결 재사용)
+# =========================================
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """
+    앱 프로세스 전체에서 공유하는 keep-alive 세션
+    - rerun 마다 TCP/TLS 연결을 새로 맺지 않음
+    - 풀 크기는 배치 동시 요청 수 이상
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(BATCH_MAX_IN_FLIGHT, 4) * 2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_SEC, cap: float = BACKOFF_MAX_SEC) -> float:
+    """지수 백오프 + 지터 (절반은 고정, 절반은 랜덤 → 여러 클라이언트 재시도 분산)"""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def retry_after_sec(response) -> float:
+    """429/503 응답의 Retry-After (초), 없으면 0"""
+    try:
+        return min(float(response.headers.get("Retry-After", 0)), BACKOFF_MAX_SEC)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@st.cache_data(ttl=HEALTH_TTL_SEC, show_spinner=False)
+def check_server_health() -> str:
+    """서버 준비 상태 (/ready, HEALTH_TTL_SEC 동안 캐시 → 위젯 조작마다 요청하지 않음)"""
+    try:
+        res = get_http_session().get(f"{API_BASE_URL}/ready", timeout=3)
+        if res.status_code == 200:
+            return "online"
+        return "warming_up" if res.status_code == 503 else "degraded"
+    except requests.exceptions.RequestException:
+        return "offline"
+
+@st.cache_data(ttl=STATS_TTL_SEC, show_spinner=False)
+def fetch_server_stats(minutes: int = KPI_WINDOW_MINUTES):
+    """서버 KPI 집계 (실패 시 None → 세션 통계 표시)"""
+    try:
+        res = get_http_session().get(f"{API_BASE_URL}/stats", params={"minutes": minutes}, timeout=3)
+        res.raise_for_status()
+        return res.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+# =========================================
+# 🖥️ 로컬 추론 (프로세스 내 앙상블)
+# =========================================
+@st.cache_resource(show_spinner="🧠 로컬 모델 로딩 중...")
+def get_local_model():
+    """
+    (models, meta, predict_proba_batch) — serve_model 과 같은 model_utils 앙상블 로직
+    - 앱 프로세스당 1회 로드, 실패하거나 remote 모드면 None
+    """
+    if INFERENCE_MODE != "local":
+        return None
+    try:
+        if APP_DIR not in sys.path:
+            sys.path.insert(0, APP_DIR)
+        from model_utils import load_local_models, predict_proba_batch
+        models, meta = load_local_models(LOCAL_MODEL_DIR)
+        return models, meta, predict_proba_batch
+    except Exception as e:
+        print(f"⚠️ 로컬 추론 모드 초기화 실패 ({e}) → 원격 API 사용")
+        return None
+
+
+def score_local(X: np.ndarray) -> dict:
+    """X[n, 7] (feature_1 ~ feature_7 순서) 프로세스 내 예측 → /predict/batch 와 같은 응답 형식"""
+    models, meta, predict_fn = get_local_model()
+    probs, preds = predict_fn(models, meta, X)
+    return {
+        "probabilities": probs.tolist(),
+        "predictions": preds.tolist(),
+        "threshold": meta.get("threshold", 0.5),
+    }
+
+# =========================================
+# 📦 배치 예측 유틸
+# =========================================
+def score_chunk(X: np.ndarray) -> dict:
+    """청크 1개 예측 (로컬 모드 우선, 원격은 실패 시 지수 백오프 + 지터 후 재시도)"""
+    if get_local_model() is not None:
+        try:
+            return score_local(X)
+        except Exception as e:
+            print(f"⚠️ 로컬 예측 실패 ({e}) → 원격 API 사용")
+
+    rows = X.tolist()
+    session = get_http_session()
+    headers = {"X-Deadline-Ms": str(int(BATCH_TIMEOUT_SEC * 1000))}
+    for attempt in range(1, BATCH_MAX_RETRIES + 1):
+        delay = backoff_delay(attempt, base=1.0)
+        try:
+            r = session.post(BATCH_API_URL, json={"instances": rows}, headers=headers,
+                             timeout=BATCH_TIMEOUT_SEC)
+            r.raise_for_status()
+            return r.json()
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            # 429/503 은 서버 과부하 거절 → Retry-After 만큼 기다렸다 재시도, 그 외 4xx 는 재시도해도 같은 결과
+            if status in (429, 503):
+                delay = max(delay, retry_after_sec(e.response))
+            elif status is not None and 400 <= status < 500:
+                raise
+            if attempt == BATCH_MAX_RETRIES:
+                raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == BATCH_MAX_RETRIES:
+                raise
+        time.sleep(delay)
+
+
+def score_batch(X: np.ndarray, on_chunk=None):
+    """
+    X[n, 7] 을 청크로 나눠 최대 BATCH_MAX_IN_FLIGHT 개까지 동시에 요청
+    - 결과는 입력 행 순서 그대로 (확률, 레이블, 청크 오류 메시지)
+    - on_chunk(done_chunks, n_chunks, done_rows) 는 메인 스레드에서 호출 (진행률 표시용)
+    """
+    n_rows = len(X)
+    probs = np.full(n_rows, np.nan)
+    preds = np.full(n_rows, -1, dtype=int)
+    errors = np.full(n_rows, None, dtype=object)
+    threshold = None
+
+    bounds = [(i, min(i + BATCH_CHUNK_SIZE, n_rows)) for i in range(0, n_rows, BATCH_CHUNK_SIZE)]
+    pending = iter(bounds)
+    done_chunks, done_rows = 0, 0
+
+    with ThreadPoolExecutor(max_workers=BATCH_MAX_IN_FLIGHT) as pool:
+        in_flight = {}
+
+        def submit_next():
+            b = next(pending, None)
+            if b is not None:
+                in_flight[pool.submit(score_chunk, X[b[0]:b[1]])] = b
+
+        for _ in range(BATCH_MAX_IN_FLIGHT):
+            submit_next()
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                start, end = in_flight.pop(fut)
+                try:
+                    result = fut.result()
+                    probs[start:end] = result["probabilities"]
+                    preds[start:end] = result["predictions"]
+                    threshold = result.get("threshold", threshold)
+                except Exception as e:
+                    errors[start:end] = str(e)
+                done_chunks += 1
+                done_rows += end - start
+                submit_next()
+                if on_chunk:
+                    on_chunk(done_chunks, len(bounds), done_rows)
+
+    return probs, preds, errors, threshold
+
+
+def compress_result(path: str) -> str:
+    """결과 CSV → .csv.gz (1MB 단위 파일 간 복사, 메모리 일정) 후 원본 삭제"""
+    gz_path = f"{path}.gz"
+    with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.remove(path)
+    return gz_path
+
+
+def stream_score_csv(uploaded, on_progress=None) -> dict:
+    """
+    업로드 CSV 를 CSV_READ_CHUNK_ROWS 행씩 읽어 검증 → 예측 → 임시 결과 CSV 에 이어쓰기
+    - 메모리에는 청크 1개 + 누적 집계값만 유지
+    - 숫자가 아닌 값이 있는 행은 예측하지 않고 error 컬럼에 사유 기록
+    - on_progress(done_rows, elapsed_sec, fraction) 는 CSV 청크마다 호출 (fraction = 읽은 바이트 비율)
+    - 반환: 결과 파일 경로, 미리보기, 누적 집계
+    """
+    uploaded.seek(0)
+    result_file = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", prefix="predictions-",
+                                              delete=False, encoding="utf-8", newline="")
+    agg = {"total": 0, "scored": 0, "failed": 0, "purchase": 0, "prob_sum": 0.0, "high_p": 0,
+           "threshold": None}
+    preview, n_preview = [], 0
+    size = getattr(uploaded, "size", None)
+    started = time.time()
+
+    try:
+        with result_file:
+            reader = pd.read_csv(uploaded, chunksize=CSV_READ_CHUNK_ROWS,
+                                 usecols=lambda c: c in REQ_COLS)
+            for i, chunk in enumerate(reader):
+                miss = set(REQ_COLS) - set(chunk.columns)
+                if miss:
+                    raise ValueError(f"누락된 컬럼: {miss}")
+
+                values = chunk[REQ_COLS].apply(pd.to_numeric, errors="coerce")
+                invalid = (values.isna() & chunk[REQ_COLS].notna()).any(axis=1).to_numpy()
+                valid_idx = np.flatnonzero(~invalid)
+
+                n = len(chunk)
+                probs = np.full(n, np.nan)
+                preds = np.full(n, -1, dtype=int)
+                errors = np.full(n, None, dtype=object)
+                errors[invalid] = "숫자가 아닌 값 포함"
+                if len(valid_idx):
+                    p, l, e, th = score_batch(values.to_numpy(dtype=float)[valid_idx])
+                    probs[valid_idx], preds[valid_idx], errors[valid_idx] = p, l, e
+                    agg["threshold"] = th if th is not None else agg["threshold"]
+
+                out = pd.DataFrame({"probability": probs, "prediction": preds, "error": errors})
+                out.insert(2, "threshold", agg["threshold"])
+                out.to_csv(result_file, index=False, header=(i == 0))
+
+                ok = preds >= 0
+                agg["total"] += n
+                agg["scored"] += int(ok.sum())
+                agg["failed"] += int((~ok).sum())
+                agg["purchase"] += int((preds == 1).sum())
+                agg["prob_sum"] += float(probs[ok].sum())
+                agg["high_p"] += int((probs[ok] > 0.7).sum())
+                if n_preview < RESULT_PREVIEW_ROWS:
+                    preview.append(out.head(RESULT_PREVIEW_ROWS - n_preview))
+                    n_preview += len(preview[-1])
+
+                if on_progress:
+                    fraction = min(uploaded.tell() / size, 1.0) if size else None
+                    on_progress(agg["total"], time.time() - started, fraction)
+    except Exception:
+        os.remove(result_file.name)
+        raise
+
+    return {
+        "path": result_file.name,
+        "preview": pd.concat(preview, ignore_index=True) if preview else pd.DataFrame(),
+        "agg": agg,
+        "elapsed": time.time() - started,
+    }
+
 
 st.set_page_config(page_title="🛍️ 실시간 구매 가능성 예측", layout="wide")
 st.title("🛍️ 실시간 구매 가능성 예측")
@@ -32,49 +320,67 @@ if "stats" not in st.session_state:
         "last_updated": None
     }
 
-# KPI 카드 4개
+# KPI 카드 4개 — 서버 집계 우선 (로컬 추론 모드/서버 응답 없음 → 이 브라우저 세션 통계)
+server_stats = fetch_server_stats() if get_local_model() is None else None
 col1, col2, col3, col4 = st.columns(4)
 
-with col1:
-    total_pred = st.session_state["stats"]["total_predictions"]
-    delta_pred = "+12" if total_pred > 0 else None
-    st.metric(
-        label="📢 오늘 예측 건수",
-        value=f"{total_pred:,}건",
-        delta=delta_pred
-    )
-
-with col2:
-    avg_prob = st.session_state["stats"]["avg_probability"]
-    delta_prob = f"+{avg_prob*2:.1f}%" if avg_prob > 0 else None
-    st.metric(
-        label="📈 평균 구매확률",
-        value=f"{avg_prob:.1%}",
-        delta=delta_prob
-    )
-
-with col3:
-    high_prob = st.session_state["stats"]["high_prob_customers"]
-    delta_high = f"+{int(high_prob*0.15)}" if high_prob > 0 else None
-    st.metric(
-        label="🎯 고확률 고객",
-        value=f"{high_prob:,}명",
-        delta=delta_high,
-        help="구매확률 70% 이상 고객"
-    )
-
-with col4:
-    conv_rate = st.session_state["stats"]["conversion_rate"]
-    delta_conv = f"+{conv_rate*5:.1f}%" if conv_rate > 0 else None
-    st.metric(
-        label="✅ 예상 전환율",
-        value=f"{conv_rate:.1%}",
-        delta=delta_conv
-    )
-
-# 마지막 업데이트 시간
-if st.session_state["stats"]["last_updated"]:
-    st.caption(f"⏰ 마지막 업데이트: {st.session_state['stats']['last_updated']}")
+if server_stats:
+    cur, prev, today = server_stats["current"], server_stats["previous"], server_stats["today"]
+    window = server_stats["window_minutes"]
+
+    def rate_delta(key):
+        if cur[key] is None or prev[key] is None:
+            return None
+        return f"{(cur[key] - prev[key]) * 100:+.1f}%p"
+
+    with col1:
+        st.metric(
+            label="📢 오늘 예측 건수",
+            value=f"{today['predictions']:,}건",
+            delta=f"+{cur['predictions']:,} (최근 {window}분)" if cur["predictions"] else None
+        )
+
+    with col2:
+        st.metric(
+            label="📈 평균 구매확률",
+            value=f"{cur['mean_probability']:.1%}" if cur["mean_probability"] is not None else "-",
+            delta=rate_delta("mean_probability"),
+            help=f"최근 {window}분 평균 (delta: 직전 {window}분 대비)"
+        )
+
+    with col3:
+        st.metric(
+            label="🎯 고확률 고객",
+            value=f"{today['high_prob_count']:,}명",
+            delta=f"+{cur['high_prob_count']:,} (최근 {window}분)" if cur["high_prob_count"] else None,
+            help=f"구매확률 {server_stats['high_prob_threshold']:.0%} 이상 고객 (오늘 누적)"
+        )
+
+    with col4:
+        st.metric(
+            label="✅ 예상 전환율",
+            value=f"{cur['positive_rate']:.1%}" if cur["positive_rate"] is not None else "-",
+            delta=rate_delta("positive_rate"),
+            help=f"최근 {window}분 구매 예측 비율 (delta: 직전 {window}분 대비)"
+        )
+
+    st.caption(f"⏰ 서버 집계 기준: {server_stats['generated_at']} "
+               f"(워커 {server_stats['workers']}개, {STATS_TTL_SEC}초마다 갱신)")
+else:
+    stats = st.session_state["stats"]
+    with col1:
+        st.metric(label="📢 오늘 예측 건수", value=f"{stats['total_predictions']:,}건")
+    with col2:
+        st.metric(label="📈 평균 구매확률", value=f"{stats['avg_probability']:.1%}")
+    with col3:
+        st.metric(label="🎯 고확률 고객", value=f"{stats['high_prob_customers']:,}명",
+                  help="구매확률 70% 이상 고객")
+    with col4:
+        st.metric(label="✅ 예상 전환율", value=f"{stats['conversion_rate']:.1%}")
+
+    # 마지막 업데이트 시간
+    if stats["last_updated"]:
+        st.caption(f"⏰ 마지막 업데이트: {stats['last_updated']} (이 브라우저 세션 기준)")
 
 st.markdown("---")
 
@@ -182,13 +488,16 @@ if selected_preset != "선택 안함":
 # 서버 상태 표시
 with st.sidebar.expander("🧠 시스템 상태"):
     st.write("모델 버전: **v5.0**")
-    try:
-        res = requests.get("https://purchase-prediction-system.onrender.com/health", timeout=3)
-        if res.status_code == 200:
-            st.success("✅ 서버 온라인")
-        else:
-            st.warning("⚠️ 서버 응답 지연")
-    except:
+    if get_local_model() is not None:
+        st.info("🖥️ 로컬 추론 모드 (models_cache)")
+    health = check_server_health()
+    if health == "online":
+        st.success("✅ 서버 온라인")
+    elif health == "warming_up":
+        st.info("🔥 서버 워밍업 중")
+    elif health == "degraded":
+        st.warning("⚠️ 서버 응답 지연")
+    else:
         st.error("❌ 서버 오프라인")
 
 # 최근 예측 로그
@@ -469,21 +778,49 @@ if st.button("🔍 예측 실행", use_container_width=True):
     }
 
     success, result = False, None
-    for attempt in range(1, 4):
+    if get_local_model() is not None:
         try:
-            with st.spinner(f"⏳ 서버와 통신 중... (시도 {attempt}/3)"):
-                res = requests.post(API_URL, json=payload, timeout=10)
-                res.raise_for_status()
-                result = res.json()
-                success = True
-                break
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-            if attempt < 3:
-                st.info("⚙️ 서버 초기화 중... 10초 후 재시도합니다.")
-                time.sleep(10)
+            local = score_local(np.array([[payload[k] for k in FEATURE_KEYS]]))
+            result = {
+                "probability": local["probabilities"][0],
+                "prediction": local["predictions"][0],
+                "threshold": local["threshold"],
+            }
+            success = True
         except Exception as e:
-            st.error(f"❌ 오류 발생: {e}")
-            break
+            st.warning(f"⚠️ 로컬 예측 실패 ({e}) → 원격 API로 재시도합니다.")
+
+    # 원격 API (remote 모드 또는 로컬 예측 실패 시)
+    if not success:
+        session = get_http_session()
+        for attempt in range(1, PREDICT_MAX_RETRIES + 1):
+            try:
+                with st.spinner(f"⏳ 서버와 통신 중... (시도 {attempt}/{PREDICT_MAX_RETRIES})"):
+                    res = session.post(API_URL, json=payload, headers={"X-Deadline-Ms": "10000"}, timeout=10)
+                    res.raise_for_status()
+                    result = res.json()
+                    success = True
+                    break
+            except requests.exceptions.HTTPError as e:
+                # 서버 과부하로 조기 거절 (429/503) → Retry-After 이후 재시도
+                if e.response is not None and e.response.status_code in (429, 503) \
+                        and attempt < PREDICT_MAX_RETRIES:
+                    delay = max(backoff_delay(attempt), retry_after_sec(e.response))
+                    st.info(f"🚦 서버 요청이 많습니다... {delay:.1f}초 후 재시도합니다.")
+                    time.sleep(delay)
+                else:
+                    st.error(f"❌ 오류 발생: {e}")
+                    break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt < PREDICT_MAX_RETRIES:
+                    delay = backoff_delay(attempt)
+                    st.info(f"⚙️ 서버 초기화 중... {delay:.1f}초 후 재시도합니다.")
+                    time.sleep(delay)
+                else:
+                    st.error("❌ 서버에 연결할 수 없습니다. 잠시 후 다시 시도하세요.")
+            except Exception as e:
+                st.error(f"❌ 오류 발생: {e}")
+                break
 
     if success and result:
         prob = result.get("probability", 0)
@@ -538,7 +875,8 @@ if st.button("🔍 예측 실행", use_container_width=True):
         st.plotly_chart(fig, use_container_width=True)
         st.success("✅ 예측 완료!")
 
-st.caption("💡 첫 실행 시 서버 초기화로 1분가량 지연될 수 있습니다.")
+if get_local_model() is None:
+    st.caption("💡 첫 실행 시 서버 초기화로 1분가량 지연될 수 있습니다.")
 
 # =========================================
 # 2️⃣ 배치 예측 (CSV)
@@ -548,7 +886,7 @@ st.markdown("### 2️⃣ 대량 고객 구매 가능성 예측 (CSV 업로드)")
 
 # CSV 업로드 안내 박스
 if theme == "dark":
-    st.markdown("""
+    st.markdown(f"""
         <div style='background-color: #1e3a5f; border-left: 3px solid #3b82f6; padding: 10px 14px; border-radius: 6px; margin-bottom: 16px;'>
             <p style='color: #e5e7eb; margin: 0; font-size: 14px; font-weight: 600;'>
                 📄 CSV 업로드 안내:
@@ -556,11 +894,12 @@ if theme == "dark":
             <ul style='color: #e5e7eb; margin: 8px 0 0 0; padding-left: 20px; font-size: 14px;'>
                 <li>각 행은 1명의 고객 세션입니다.</li>
                 <li>고객별 주요 활동 데이터를 포함해야 합니다.</li>
+                <li>결과 다운로드는 gzip 압축 기준 {RESULT_DOWNLOAD_MAX_MB}MB 까지 제공됩니다.</li>
             </ul>
         </div>
     """, unsafe_allow_html=True)
 else:
-    st.markdown("""
+    st.markdown(f"""
         <div style='background-color: #dbeafe; border-left: 3px solid #3b82f6; padding: 10px 14px; border-radius: 6px; margin-bottom: 16px;'>
             <p style='color: #1f2937; margin: 0; font-size: 14px; font-weight: 600;'>
                 📄 CSV 업로드 안내:
@@ -568,6 +907,7 @@ else:
             <ul style='color: #1f2937; margin: 8px 0 0 0; padding-left: 20px; font-size: 14px;'>
                 <li>각 행은 1명의 고객 세션입니다.</li>
                 <li>고객별 주요 활동 데이터를 포함해야 합니다.</li>
+                <li>결과 다운로드는 gzip 압축 기준 {RESULT_DOWNLOAD_MAX_MB}MB 까지 제공됩니다.</li>
             </ul>
         </div>
     """, unsafe_allow_html=True)
@@ -604,56 +944,58 @@ with st.expander("📘 컬럼 정의"):
 
 uploaded = st.file_uploader("📂 CSV 파일 업로드", type=["csv"])
 if uploaded:
-    df = pd.read_csv(uploaded)
-    st.dataframe(df.head(), use_container_width=True)
-    req_cols = ["session_id","event_count","n_view","n_cart","n_trans","n_trans_ratio","n_view_ratio"]
-    miss = set(req_cols) - set(df.columns)
+    # 미리보기/컬럼 검증은 앞부분만 읽음 (전체 파일을 DataFrame 으로 올리지 않음)
+    head = pd.read_csv(uploaded, nrows=5)
+    st.dataframe(head, use_container_width=True)
+    miss = set(REQ_COLS) - set(head.columns)
     if miss:
         st.error(f"❌ 누락된 컬럼: {miss}")
     else:
         if st.button("📈 배치 예측 실행", use_container_width=True):
-            results = []
             progress = st.progress(0)
-            for i, (_, row) in enumerate(df.iterrows()):
-                payload = {
-                    "feature_1": float(row["session_id"]),
-                    "feature_2": float(row["event_count"]),
-                    "feature_3": float(row["n_view"]),
-                    "feature_4": float(row["n_cart"]),
-                    "feature_5": float(row["n_trans"]),
-                    "feature_6": float(row["n_trans_ratio"]),
-                    "feature_7": float(row["n_view_ratio"])
-                }
-                try:
-                    r = requests.post(API_URL, json=payload, timeout=10)
-                    r.raise_for_status()
-                    result = r.json()
-                    results.append({
-                        "probability": result.get("probability"),
-                        "prediction": result.get("prediction"),
-                        "threshold": result.get("threshold"),
-                    })
-                except Exception as e:
-                    results.append({"error": str(e)})
-                progress.progress((i + 1) / len(df))
-            progress.empty()
-            out = pd.DataFrame(results)
-            st.success("✅ 배치 예측 완료")
-            st.dataframe(out)
-            if "prediction" in out.columns:
+            status_text = st.empty()
+
+            def on_progress(done_rows, elapsed, fraction):
+                if fraction is not None:
+                    progress.progress(fraction)
+                status_text.caption(f"⏳ {done_rows:,}행 예측 완료 ({elapsed:.1f}s)")
+
+            try:
+                res = stream_score_csv(uploaded, on_progress)
+            except ValueError as e:
+                st.error(f"❌ CSV 처리 실패: {e}")
+                st.stop()
+            finally:
+                progress.empty()
+                status_text.empty()
+
+            agg = res["agg"]
+            if agg["failed"]:
+                st.warning(f"⚠️ {agg['failed']:,}행 예측 실패 (결과 파일의 error 컬럼 참고)")
+            st.success(f"✅ 배치 예측 완료 ({agg['total']:,}행, {res['elapsed']:.1f}s)")
+            st.caption(f"미리보기: 앞 {len(res['preview']):,}행")
+            st.dataframe(res["preview"])
+            if agg["scored"] > 0:
                 col1, col2, col3 = st.columns(3)
-                total = len(out)
-                purchase = (out["prediction"] == 1).sum()
+                total = agg["scored"]
+                purchase = agg["purchase"]
                 rate = purchase / total * 100
-                avg_prob = out["probability"].mean()
-                high_p = (out["probability"] > 0.7).sum()
+                avg_prob = agg["prob_sum"] / total
+                high_p = agg["high_p"]
                 col1.metric("전체 건수", f"{total:,}명")
                 col2.metric("구매 예상", f"{purchase:,}명 ({rate:.1f}%)")
                 col3.metric("평균 구매 확률", f"{avg_prob:.1%}")
                 if high_p > 0:
                     st.success(f"🎯 고확률 고객(70% 이상): **{high_p}명**")
-            csv_data = out.to_csv(index=False).encode("utf-8")
-            st.download_button("📥 결과 다운로드", csv_data, "predictions.csv", "text/csv")
+            gz_path = compress_result(res["path"])
+            size_mb = os.path.getsize(gz_path) / 1024 ** 2
+            if size_mb <= RESULT_DOWNLOAD_MAX_MB:
+                with open(gz_path, "rb") as f:
+                    st.download_button("📥 결과 다운로드 (gzip)", f, "predictions.csv.gz", "application/gzip")
+            else:
+                st.warning(f"⚠️ 결과 파일이 압축 후 {size_mb:.0f}MB 로 다운로드 한도({RESULT_DOWNLOAD_MAX_MB}MB)를 넘습니다. "
+                           f"대용량 파일은 API 배치 작업({API_BASE_URL}/jobs)으로 실행해 결과를 S3 에 저장하세요.")
+            os.remove(gz_path)
 
 # =========================================
 # 푸터
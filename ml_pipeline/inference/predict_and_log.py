@@ -1,7 +1,7 @@
 # ===============================================================
 # 🚀 예측 API (실무형 구조) + MinIO 로그 비동기 저장
 # ===============================================================
-import os, json, joblib, asyncio
+import os, io, json, joblib, asyncio, uuid
 import pandas as pd, numpy as np
 from datetime import datetime
 from fastapi import FastAPI, Request, HTTPException
@@ -17,7 +17,8 @@ SECRET_KEY = os.getenv("MINIO_SECRET", "minioadmin")
 
 MODEL_PATH = "s3://model-store/session-purchase/xgb_model.joblib"
 META_PATH = "s3://model-store/session-purchase/model_meta.json"
-LOG_PATH = "s3://model-logs/session-purchase/inference-logs.csv"
+# dt=YYYY-MM-DD/hour=HH 파티션 Parquet (드리프트/로그 분석에서 구간 단위로 조회)
+LOG_DATASET_PATH = "s3://model-logs/session-purchase/inference-logs"
 
 # --------------------------------------------------
 # 2️⃣ MinIO 및 모델 초기화
@@ -58,15 +59,21 @@ def compute_derived_features(df):
 # --------------------------------------------------
 # 5️⃣ 로그 저장 (비동기)
 # --------------------------------------------------
-async def append_log_async(new_row: pd.DataFrame):
-    try:
-        with fs.open(LOG_PATH, "rb") as f:
-            prev = pd.read_csv(f)
-        combined = pd.concat([prev, new_row], ignore_index=True)
-    except FileNotFoundError:
-        combined = new_row
-    combined.to_csv("inference-logs.csv", index=False)
-    await asyncio.to_thread(fs.put, "inference-logs.csv", LOG_PATH)
+def log_part_path(ts: datetime) -> str:
+    """요청 시각 기준 파티션 경로 (파트 파일명은 충돌 방지용 uuid 포함)"""
+    return (f"{LOG_DATASET_PATH}/dt={ts:%Y-%m-%d}/hour={ts:%H}/"
+            f"part-{ts:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+
+async def append_log_async(new_row: pd.DataFrame, ts: datetime):
+    # 기존 로그를 다시 읽지 않고 해당 시간 파티션에 파트 파일만 추가
+    buf = io.BytesIO()
+    new_row.to_parquet(buf, index=False)
+
+    def _put():
+        with fs.open(log_part_path(ts), "wb") as f:
+            f.write(buf.getvalue())
+
+    await asyncio.to_thread(_put)
 
 # --------------------------------------------------
 # 6️⃣ 예측 엔드포인트
@@ -89,10 +96,11 @@ async def predict(input: SessionInput):
         log_entry["probability"] = proba
         log_entry["prediction"] = pred
         log_entry["model_version"] = model_version
-        log_entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        now = datetime.now()
+        log_entry["timestamp"] = pd.Timestamp(now)
 
         # 비동기로 로그 저장
-        asyncio.create_task(append_log_async(log_entry))
+        asyncio.create_task(append_log_async(log_entry, now))
 
         return {"probability": float(proba),
                 "prediction": pred,
@@ -0,0 +1,174 @@
+# ===============================================================
+# 🎯 score_topk.py — 전체 고객 스트리밍 채점 → 구매 확률 상위 K명 추출
+# ---------------------------------------------------------------
+# - 피처 Parquet 를 행 그룹 단위로 읽어 앙상블 채점, 상위 K개만 힙에 유지 (메모리 O(K))
+# - --workers N: 행 그룹을 N개 파티션으로 나눠 프로세스별 힙 → 마지막에 병합
+#
+#   python ml_pipeline/inference/score_topk.py \
+#       --input s3://feature-data/session_features.parquet --k 50000 \
+#       --id-column user_id --output s3://model-logs/session-purchase/topk/latest.parquet
+# ===============================================================
+import os
+import sys
+import time
+import heapq
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from model_utils import MODEL_CACHE_DIR, load_local_models, predict_proba_batch  # noqa: E402
+from batch_jobs import get_filesystem  # noqa: E402
+from bulk_scoring import feature_columns  # noqa: E402
+
+FEATURE_KEYS = [f"feature_{i}" for i in range(1, 8)]
+READ_BATCH_ROWS = 65536
+
+
+# --------------------------------------------------
+# 🧺 상위 K 힙
+# --------------------------------------------------
+class TopK:
+    """
+    (확률, 순번, id) 최소 힙 — 힙 최솟값보다 큰 확률만 들어감
+    - 배치마다 먼저 벡터 연산으로 배치 내 상위 K / 힙 최솟값 초과 행만 골라 Python 힙 연산은 소수 행만
+    - 순번: 같은 확률이면 먼저 읽은 행 우선 (결과 재현성)
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.heap = []
+
+    def push_batch(self, ids, probs: np.ndarray, seq_start: int):
+        idx = np.arange(len(probs))
+        if len(probs) > self.k:
+            # argpartition 은 K번째 값과 동점인 행을 임의로 고름 → 경계값 동점은 앞선 행부터 채움
+            kth = probs[np.argpartition(probs, -self.k)[-self.k]]
+            above = np.flatnonzero(probs > kth)
+            idx = np.concatenate([above, np.flatnonzero(probs == kth)[: self.k - len(above)]])
+        if len(self.heap) >= self.k:
+            idx = idx[probs[idx] > self.heap[0][0]]
+        for i in idx[np.argsort(-probs[idx], kind="stable")]:
+            item = (float(probs[i]), -(seq_start + int(i)), ids[i])
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, item)
+            elif item > self.heap[0]:
+                heapq.heapreplace(self.heap, item)
+
+    def merge(self, other_heap: list):
+        for item in other_heap:
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, item)
+            elif item > self.heap[0]:
+                heapq.heapreplace(self.heap, item)
+
+    def result(self, id_name: str) -> pd.DataFrame:
+        items = sorted(self.heap, reverse=True)
+        return pd.DataFrame({
+            "rank": np.arange(1, len(items) + 1),
+            id_name: [it[2] for it in items],
+            "probability": [it[0] for it in items],
+        })
+
+
+# --------------------------------------------------
+# ⚙️ 파티션 채점 (프로세스 1개 = 행 그룹 구간 1개)
+# --------------------------------------------------
+_MODELS, _META = None, None
+
+
+def _init_worker(model_dir: str):
+    global _MODELS, _META
+    _MODELS, _META = load_local_models(model_dir)
+
+
+def score_partition(input_path: str, row_groups: list, k: int, id_column: str, num_threads: int = 1):
+    """행 그룹 목록을 순서대로 채점 → (힙 리스트, 채점 행 수, 모델 시간 초)"""
+    fs, path = get_filesystem(input_path)
+    topk = TopK(k)
+    n_rows, model_sec = 0, 0.0
+    with fs.open_input_file(path) as f:
+        pf = pq.ParquetFile(f)
+        columns = feature_columns(pf.schema_arrow, _META, FEATURE_KEYS)
+        read_cols = columns + ([id_column] if id_column and id_column not in columns else [])
+        seq = sum(pf.metadata.row_group(i).num_rows for i in range(row_groups[0])) if row_groups else 0
+        for batch in pf.iter_batches(batch_size=READ_BATCH_ROWS, row_groups=row_groups, columns=read_cols):
+            X = np.column_stack([
+                batch.column(c).to_numpy(zero_copy_only=False).astype(float, copy=False) for c in columns
+            ])
+            t0 = time.perf_counter()
+            probs, _ = predict_proba_batch(_MODELS, _META, X, num_threads=num_threads)
+            model_sec += time.perf_counter() - t0
+            ids = batch.column(id_column).to_pylist() if id_column else np.arange(seq, seq + len(X)).tolist()
+            topk.push_batch(ids, probs, seq)
+            seq += len(X)
+            n_rows += len(X)
+    return topk.heap, n_rows, model_sec
+
+
+def split_row_groups(n_groups: int, n_parts: int) -> list:
+    """연속된 행 그룹 구간으로 분할 (파티션 안에서는 순번이 이어지도록)"""
+    return [list(part) for part in np.array_split(np.arange(n_groups), n_parts) if len(part)]
+
+
+def top_k(input_path: str, k: int, id_column: str = None, workers: int = 1,
+          model_dir: str = MODEL_CACHE_DIR) -> tuple:
+    """상위 K DataFrame, 통계 dict"""
+    fs, path = get_filesystem(input_path)
+    with fs.open_input_file(path) as f:
+        n_groups = pq.ParquetFile(f).metadata.num_row_groups
+
+    started = time.perf_counter()
+    topk = TopK(k)
+    n_rows, model_sec = 0, 0.0
+    if workers <= 1:
+        _init_worker(model_dir)
+        heap, n_rows, model_sec = score_partition(input_path, list(range(n_groups)), k, id_column, num_threads=-1)
+        topk.merge(heap)
+    else:
+        parts = split_row_groups(n_groups, workers)
+        with ProcessPoolExecutor(max_workers=len(parts), initializer=_init_worker, initargs=(model_dir,)) as ex:
+            futures = [ex.submit(score_partition, input_path, part, k, id_column) for part in parts]
+            for fut in futures:
+                heap, rows, sec = fut.result()
+                topk.merge(heap)
+                n_rows += rows
+                model_sec += sec
+
+    stats = {
+        "rows": n_rows,
+        "row_groups": n_groups,
+        "workers": workers,
+        "elapsed_sec": round(time.perf_counter() - started, 2),
+        "model_sec": round(model_sec, 2),
+    }
+    return topk.result(id_column or "row_index"), stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="구매 확률 상위 K명 추출 (스트리밍 채점, 메모리 O(K))")
+    parser.add_argument("--input", default="s3://feature-data/session_features.parquet", help="피처 Parquet 경로")
+    parser.add_argument("--k", type=int, default=50000, help="추출할 고객 수")
+    parser.add_argument("--id-column", default=None, help="고객 식별 컬럼 (미지정 시 행 번호)")
+    parser.add_argument("--workers", type=int, default=1, help="병렬 프로세스 수 (행 그룹 분할)")
+    parser.add_argument("--model-dir", default=MODEL_CACHE_DIR, help="모델 디렉터리")
+    parser.add_argument("--output", default=None, help="결과 저장 경로 (.parquet / .csv, s3:// 가능)")
+    args = parser.parse_args()
+
+    print(f"🎯 상위 {args.k:,}명 추출 시작: {args.input} (workers={args.workers})")
+    result, stats = top_k(args.input, args.k, args.id_column, args.workers, args.model_dir)
+    print(f"✅ {stats['rows']:,}행 채점 → 상위 {len(result):,}명 "
+          f"({stats['elapsed_sec']}s, 모델 {stats['model_sec']}s)")
+    print(result.head(10).to_string(index=False))
+
+    if args.output:
+        out_fs, out_path = get_filesystem(args.output)
+        if args.output.endswith(".csv"):
+            with out_fs.open_output_stream(out_path) as f:
+                f.write(result.to_csv(index=False).encode("utf-8"))
+        else:
+            pq.write_table(pa.Table.from_pandas(result, preserve_index=False), out_path, filesystem=out_fs)
+        print(f"💾 저장 완료: {args.output}")
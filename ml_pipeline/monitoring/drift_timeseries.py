@@ -0,0 +1,162 @@
+# ======================================
+# 윈도우별 PSI 시계열 계산 (시간/일 단위, 증분 실행)
+# ======================================
+import argparse
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from monitor_utils import (
+    get_fs, list_log_partitions, read_log_window, load_reference_profile,
+    psi_from_profile, classify_psi, PSI_TIMESERIES_PATH, PROFILE_DIR
+)
+
+GRANULARITY_DELTA = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+}
+
+
+def window_start_of(ts: datetime, granularity: str) -> datetime:
+    """ts 가 속한 윈도우의 시작 시각"""
+    if granularity == "hourly":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def window_key(start: datetime) -> str:
+    return start.strftime("%Y%m%dT%H")
+
+
+def series_dir(granularity: str) -> str:
+    return f"{PSI_TIMESERIES_PATH}/granularity={granularity}"
+
+
+def existing_windows(fs, granularity: str) -> set:
+    """이미 계산되어 저장된 윈도우 키 목록"""
+    keys = set()
+    for p in fs.glob(f"{series_dir(granularity).split('://', 1)[-1]}/psi_*.parquet"):
+        keys.add(p.rsplit("/psi_", 1)[-1].replace(".parquet", ""))
+    return keys
+
+
+def pending_windows(fs, granularity: str, now: datetime) -> list:
+    """
+    로그 파티션은 있지만 아직 계산되지 않은 '완료된' 윈도우 목록
+    - 진행 중인 윈도우(끝 시각 > now)는 다음 실행으로 미룸
+    """
+    delta = GRANULARITY_DELTA[granularity]
+    done = existing_windows(fs, granularity)
+
+    starts = set()
+    for dt, hour in list_log_partitions(fs):
+        ts = datetime.strptime(dt, "%Y-%m-%d").replace(hour=hour)
+        starts.add(window_start_of(ts, granularity))
+
+    return sorted(s for s in starts if s + delta <= now and window_key(s) not in done)
+
+
+def compute_window_psi(cur_df: pd.DataFrame, ref_features: dict,
+                       start: datetime, end: datetime, granularity: str) -> pd.DataFrame:
+    """한 윈도우의 피처별 PSI (기준 분포 요약의 구간/비율 사용)"""
+    rows = []
+    for col in cur_df.columns:
+        if col not in ref_features:
+            continue
+        psi = psi_from_profile(ref_features[col], cur_df[col].values) if len(cur_df) else np.nan
+        rows.append({
+            "window_start": start,
+            "window_end": end,
+            "granularity": granularity,
+            "feature": col,
+            "psi": psi,
+            "n_rows": len(cur_df),
+        })
+    out = pd.DataFrame(rows, columns=["window_start", "window_end", "granularity",
+                                      "feature", "psi", "n_rows"])
+    out["stability"] = classify_psi(out["psi"]).astype(str)
+    return out
+
+
+def append_window(fs, df: pd.DataFrame, granularity: str, start: datetime):
+    """윈도우 결과를 시계열에 추가 (윈도우당 파일 1개, 기존 파일은 건드리지 않음)"""
+    path = f"{series_dir(granularity)}/psi_{window_key(start)}.parquet"
+    fs.makedirs(series_dir(granularity), exist_ok=True)
+    buf = io.BytesIO()
+    df.to_parquet(buf, index=False)
+    with fs.open(path, "wb") as f:
+        f.write(buf.getvalue())
+    return path
+
+
+def read_timeseries(fs, granularity: str = "hourly") -> pd.DataFrame:
+    """저장된 PSI 시계열 전체 조회 (윈도우 파일 수준이라 수 KB 단위)"""
+    files = sorted(fs.glob(f"{series_dir(granularity).split('://', 1)[-1]}/psi_*.parquet"))
+    if not files:
+        return pd.DataFrame(columns=["window_start", "window_end", "granularity",
+                                     "feature", "psi", "n_rows", "stability"])
+    frames = []
+    for p in files:
+        with fs.open(p, "rb") as f:
+            frames.append(pd.read_parquet(f))
+    return pd.concat(frames, ignore_index=True).sort_values(["window_start", "feature"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="윈도우별 PSI 시계열 계산")
+    parser.add_argument("--granularity", choices=list(GRANULARITY_DELTA), default="hourly")
+    parser.add_argument("--max-windows", type=int, default=None,
+                        help="한 번에 계산할 최대 윈도우 수 (백필 시 분할 실행용)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"📈 PSI 시계열 계산 ({args.granularity})")
+    print("=" * 70)
+
+    fs = get_fs()
+
+    # --- 1️⃣ 기준 분포 요약 (구간 경계 포함) ---
+    print("\n[1/3] 기준 분포 요약 로딩...")
+    try:
+        profile = load_reference_profile(fs)
+    except FileNotFoundError:
+        print(f"   ❌ 기준 분포 요약을 찾을 수 없습니다: {PROFILE_DIR}/latest.json")
+        print(f"   💡 먼저 'python ml-pipeline/monitoring/save_reference.py'를 실행하세요")
+        exit(1)
+
+    ref_features = profile["features"]
+    feature_cols = list(ref_features)
+    print(f"   ✅ 기준 분포: 피처 {len(feature_cols)}개 (version={profile['version']})")
+
+    # --- 2️⃣ 계산 대상 윈도우 ---
+    print("\n[2/3] 신규 윈도우 탐색...")
+    windows = pending_windows(fs, args.granularity, datetime.now())
+    if args.max_windows:
+        windows = windows[:args.max_windows]
+    print(f"   ✅ 계산 대상: {len(windows)}개 윈도우")
+
+    # --- 3️⃣ 윈도우별 PSI 계산 + 저장 ---
+    print("\n[3/3] 윈도우별 PSI 계산 중...")
+    delta = GRANULARITY_DELTA[args.granularity]
+    for start in windows:
+        end = start + delta
+        cur_df = read_log_window(fs, start, end, columns=feature_cols)
+        result = compute_window_psi(cur_df, ref_features, start, end, args.granularity)
+        path = append_window(fs, result, args.granularity, start)
+
+        if result["psi"].notna().any():
+            worst = result.loc[result["psi"].idxmax()]
+            print(f"   ✅ {start:%Y-%m-%d %H:00} ({len(cur_df):,}행) "
+                  f"최대 PSI {worst['feature']}={worst['psi']:.4f} → {path}")
+        else:
+            print(f"   ⚠️ {start:%Y-%m-%d %H:00} ({len(cur_df):,}행) 공통 피처 없음 → {path}")
+
+    print("\n" + "=" * 70)
+    print("✅ PSI 시계열 계산 완료!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
 import os
+import argparse
+import numpy as np
 import pandas as pd
 import s3fs
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
-import matplotlib.font_manager as fm
+from datetime import datetime, timedelta
 
-plt.rcParams['font.family'] = 'NanumGothic'  
-plt.rcParams['axes.unicode_minus'] = False
+from monitor_utils import (
+    aggregate_log_buckets, hist_quantile, read_latest_logs, backup_log_partitions
+)
+from report_utils import FigureSpec, figure_dir, render_figures, setup_matplotlib, REPORT_PREVIEW
+from report_plots import plot_prob_distribution, plot_label_pie, plot_prob_trend
+
+setup_matplotlib()
 
 # --------------------------------------------------
 # 1️⃣ MinIO 연결 설정
@@ -20,11 +24,31 @@ MINIO_ENDPOINTS = [
 
 ACCESS_KEY = "minioadmin"
 SECRET_KEY = "minioadmin"
-LOG_PATH = "s3://model-logs/session-purchase/inference-logs.csv"
+LOG_PATH = "s3://model-logs/session-purchase/inference-logs"  # dt/hour 파티션 Parquet
 OUTPUT_DIR = "ml-pipeline/monitoring/plots"
 
+BACKUP_DIR = os.path.join(OUTPUT_DIR, "inference_logs_backup")
+
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# --------------------------------------------------
+# 0️⃣ 분석 구간 (실행 시간은 전체 로그 양이 아니라 구간 길이에 비례)
+# --------------------------------------------------
+parser = argparse.ArgumentParser(description="예측 로그 분석 (시간 버킷 집계)")
+parser.add_argument("--hours", type=int, default=24, help="최근 N시간 분석 (--start 미지정 시)")
+parser.add_argument("--start", type=str, default=None, help="시작 시각 (예: 2025-10-22T00:00)")
+parser.add_argument("--end", type=str, default=None, help="종료 시각 (기본: 현재)")
+parser.add_argument("--freq", choices=["minute", "hour"], default=None,
+                    help="집계 단위 (기본: 24시간 이하면 minute, 초과면 hour)")
+parser.add_argument("--preview", action="store_true", default=REPORT_PREVIEW,
+                    help="저해상도(72dpi) 미리보기 렌더링 (OUTPUT_DIR/preview 에 저장)")
+args = parser.parse_args()
+
+end = datetime.fromisoformat(args.end) if args.end else datetime.now()
+start = datetime.fromisoformat(args.start) if args.start else end - timedelta(hours=args.hours)
+freq = args.freq or ("minute" if end - start <= timedelta(hours=24) else "hour")
+print(f"🕒 분석 구간: {start:%Y-%m-%d %H:%M} ~ {end:%Y-%m-%d %H:%M} ({freq} 단위)")
+
 fs = None
 for ep in MINIO_ENDPOINTS:
     try:
@@ -44,109 +68,96 @@ if fs is None:
     raise RuntimeError("❌ 모든 MinIO endpoint 연결 실패. MinIO 서버가 실행 중인지 확인하세요.")
 
 # --------------------------------------------------
-# 2️⃣ 로그 파일 로드
+# 2️⃣ 로그 집계 (필요 컬럼만, 구간 파티션만 읽어 시간 버킷으로 집계)
 # --------------------------------------------------
-print("📦 Loading inference logs...")
+print("📦 Aggregating inference logs...")
 try:
-    with fs.open(LOG_PATH, "rb") as f:
-        logs = pd.read_csv(f)
-    print(f"✅ Loaded logs → {logs.shape[0]} rows, {logs.shape[1]} columns")
+    buckets, prob_hist, label_counts = aggregate_log_buckets(fs, start, end, freq=freq, path=LOG_PATH)
+    total = int(buckets["count"].sum())
+    print(f"✅ Aggregated logs → {total:,} rows into {len(buckets)} {freq} buckets")
 except FileNotFoundError:
     raise FileNotFoundError(f"❌ 로그 파일이 존재하지 않습니다: {LOG_PATH}")
 except Exception as e:
     raise RuntimeError(f"❌ 로그 불러오기 실패: {e}")
 
+active = buckets[buckets["count"] > 0]
+
 # --------------------------------------------------
 # 3️⃣ 기본 정보
 # --------------------------------------------------
-print("\n[🧾 로그 데이터 미리보기]")
-print(logs.head(3))
-print("\n[📋 데이터 타입 및 결측치]")
-print(logs.info())
-print(logs.isnull().sum())
+print("\n[🧾 버킷 집계 미리보기]")
+print(active.head(3).to_string(index=False))
 
 # --------------------------------------------------
 # 4️⃣ 기본 통계
 # --------------------------------------------------
 print("\n[📊 기본 통계 요약]")
-print(logs.describe(include="all"))
-
-# --------------------------------------------------
-# 5️⃣ 예측 확률 분포 시각화 (저장)
-# --------------------------------------------------
-if "probability" in logs.columns:
-    plt.figure(figsize=(7, 5))
-    sns.histplot(logs["probability"], bins=30, kde=True, color="#6baed6")
-    plt.title(" 예측 확률 분포", fontsize=13)
-    plt.xlabel("예측 확률", fontsize=11)
-    plt.ylabel("개수", fontsize=11)
-    plt.grid(True, linestyle="--", alpha=0.6)
-    plt.tight_layout()
-    save_path = os.path.join(OUTPUT_DIR, "예측확률_분포.png")
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    print(f"✅ 그래프 저장 완료 → {save_path}")
-    plt.close()
+if total > 0:
+    summary = {
+        "건수": total,
+        "평균 확률": float((active["mean_prob"] * active["count"]).sum() / active["count"].sum()),
+        "p50 확률": float(hist_quantile(prob_hist, 0.5)),
+        "p95 확률": float(hist_quantile(prob_hist, 0.95)),
+        "구매 예측 비율": label_counts.get(1, 0) / max(sum(label_counts.values()), 1),
+        "활성 버킷 수": len(active),
+    }
+    for k, v in summary.items():
+        print(f"   {k}: {v:.4f}" if isinstance(v, float) else f"   {k}: {v:,}")
 else:
-    print("⚠️ 'probability' 컬럼이 로그에 존재하지 않습니다.")
+    print("⚠️ 분석 구간에 로그가 없습니다.")
 
 # --------------------------------------------------
-# 6️⃣ 예측 Label 비율 시각화 (저장)
+# 5️⃣ 예측 확률 분포 (200구간 집계 히스토그램을 30구간 보기로 합산)
 # --------------------------------------------------
-if "prediction" in logs.columns:
-    label_ratio = logs["prediction"].value_counts(normalize=True) * 100
+specs = []
+if prob_hist.sum() > 0:
+    prob_edges = np.linspace(0, 1, len(prob_hist) + 1)
+    coarse_edges = np.linspace(0, 1, 31)
+    coarse = np.histogram(prob_edges[:-1], bins=coarse_edges, weights=prob_hist)[0]
+    specs.append(FigureSpec("예측확률_분포.png", plot_prob_distribution,
+                            {"edges": coarse_edges, "counts": coarse}))
+else:
+    print("⚠️ 'probability' 값이 구간 로그에 존재하지 않습니다.")
+
+# --------------------------------------------------
+# 6️⃣ 예측 Label 비율
+# --------------------------------------------------
+if label_counts:
+    label_ratio = pd.Series(label_counts).sort_index()
+    label_ratio = label_ratio / label_ratio.sum() * 100
     label_names = {0: "비구매", 1: "구매"}
-    label_ratio.index = label_ratio.index.map(lambda x: label_names.get(x, str(x)))
-
-    plt.figure(figsize=(5, 5))
-    plt.pie(
-        label_ratio,
-        labels=[f"{i} ({v:.1f}%)" for i, v in label_ratio.items()],
-        autopct="%1.1f%%",
-        startangle=90,
-        colors=["#fd8d3c", "#6baed6"]
-    )
-    plt.title(" 구매/비구매 비율", fontsize=13)
-    plt.tight_layout()
-    save_path = os.path.join(OUTPUT_DIR, "구매비율_파이차트.png")
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    print(f"✅ 그래프 저장 완료 → {save_path}")
-    plt.close()
+    specs.append(FigureSpec("구매비율_파이차트.png", plot_label_pie, {
+        "labels": [label_names.get(x, str(x)) for x in label_ratio.index],
+        "values": label_ratio.values,
+    }))
 else:
-    print("⚠️ 'prediction' 컬럼이 로그에 존재하지 않습니다.")
-
-# --------------------------------------------------
-# 7️⃣ 시간 흐름에 따른 확률 변화 (저장)
-# --------------------------------------------------
-if "timestamp" in logs.columns and "probability" in logs.columns:
-    logs["timestamp"] = pd.to_datetime(logs["timestamp"], errors="coerce")
-    logs = logs.dropna(subset=["timestamp"])
-    logs = logs.sort_values("timestamp")
-
-    plt.figure(figsize=(10, 4))
-    sns.lineplot(x="timestamp", y="probability", data=logs, marker="o", color="#3182bd")
-    plt.title(" 시간별 예측 확률 추이", fontsize=13)
-    plt.xlabel("시간", fontsize=11)
-    plt.ylabel("예측 확률", fontsize=11)
-    plt.grid(True, linestyle="--", alpha=0.6)
-    plt.tight_layout()
-    save_path = os.path.join(OUTPUT_DIR, "시간별_예측확률추이.png")
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    print(f"✅ 그래프 저장 완료 → {save_path}")
-    plt.close()
+    print("⚠️ 'prediction' 값이 구간 로그에 존재하지 않습니다.")
+
+# --------------------------------------------------
+# 7️⃣ 시간 흐름에 따른 확률 변화 — 버킷별 평균/p50/p95
+# --------------------------------------------------
+if len(active) > 0:
+    specs.append(FigureSpec("시간별_예측확률추이.png", plot_prob_trend,
+                            active[["bucket", "mean_prob", "p50_prob", "p95_prob"]].reset_index(drop=True)))
 else:
-    print("⚠️ 시간 기반 시각화를 위한 컬럼(timestamp, probability)이 누락되어 있습니다.")
+    print("⚠️ 시간 기반 시각화를 위한 로그가 구간에 없습니다.")
+
+# 입력 집계값이 바뀐 그래프만 병렬 렌더링 (나머지는 기존 파일 재사용)
+status = render_figures(specs, OUTPUT_DIR, preview=args.preview)
+for filename, state in status.items():
+    mark = "♻️ 캐시 재사용" if state == "cached" else "✅ 그래프 저장 완료"
+    print(f"{mark} → {os.path.join(figure_dir(OUTPUT_DIR, args.preview), filename)}")
 
 # --------------------------------------------------
-# 8️⃣ 최신 로그 10건
+# 8️⃣ 최신 로그 10건 (최근 파티션만 조회)
 # --------------------------------------------------
 print("\n[🕒 최근 10건 로그]")
-print(logs.sort_values("timestamp", ascending=False).head(10))
+print(read_latest_logs(fs, n=10, end=end, path=LOG_PATH))
 
 # --------------------------------------------------
-# 9️⃣ CSV 백업 저장 (선택)
+# 9️⃣ 증분 백업 (구간 내 신규 파트 파일만 복사)
 # --------------------------------------------------
-backup_path = os.path.join(OUTPUT_DIR, f"inference_logs_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-logs.to_csv(backup_path, index=False)
-print(f"📁 로그 백업 완료 → {backup_path}")
+copied = backup_log_partitions(fs, BACKUP_DIR, start, end, path=LOG_PATH)
+print(f"📁 로그 증분 백업 완료 → {BACKUP_DIR} (신규 {len(copied)}개 파일)")
 
 print("\n✅ 로그 분석 및 그래프 저장 완료!")
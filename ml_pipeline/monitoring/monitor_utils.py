@@ -0,0 +1,377 @@
+# ======================================
+# 모니터링 공용 유틸 (MinIO 연결 / 파티션 로그 조회 / PSI)
+# ======================================
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import s3fs
+from datetime import datetime, timedelta
+
+# --------------------------------------------------
+# 📍 경로 설정
+# --------------------------------------------------
+MINIO_ENDPOINT = "http://localhost:9900"
+ACCESS_KEY = "minioadmin"
+SECRET_KEY = "minioadmin"
+
+# 예측 로그는 dt=YYYY-MM-DD/hour=HH 로 파티셔닝된 Parquet 데이터셋
+LOG_DATASET_PATH = "s3://model-logs/session-purchase/inference-logs"
+PSI_TIMESERIES_PATH = "s3://model-logs/session-purchase/psi_timeseries"
+
+# 기준 분포 요약(profile): {version}.json + latest.json (수 KB)
+PROFILE_DIR = "s3://model-logs/session-purchase/reference_profile"
+MODEL_META_PATH = "s3://model-store/session-purchase/model_meta.json"
+
+LOG_PARTITIONING = ds.partitioning(
+    pa.schema([("dt", pa.string()), ("hour", pa.int32())]), flavor="hive"
+)
+
+# 예측 결과 컬럼 (피처가 아닌 컬럼)
+EXCLUDE_COLS = ['probability', 'prediction', 'threshold', 'model_version',
+                'used_features', 'timestamp', 'has_transaction', 'dt', 'hour']
+
+# 예측 확률 기준 분포 구간: 서빙 drift_monitor.SCORE_EDGES 와 같은 고정 10구간
+SCORE_EDGES = np.linspace(0.0, 1.0, 11)
+
+
+def get_fs(endpoint: str = MINIO_ENDPOINT) -> s3fs.S3FileSystem:
+    """MinIO S3 파일시스템 생성"""
+    return s3fs.S3FileSystem(
+        key=ACCESS_KEY,
+        secret=SECRET_KEY,
+        client_kwargs={"endpoint_url": endpoint}
+    )
+
+
+def _strip_scheme(path: str) -> str:
+    return path.split("://", 1)[-1]
+
+
+# --------------------------------------------------
+# 📦 파티션 로그 조회 (predicate pushdown)
+# --------------------------------------------------
+def partition_filter(start: datetime = None, end: datetime = None):
+    """
+    [start, end) 구간에 걸치는 dt/hour 파티션만 남기는 필터 식
+    - 파티션 키만 사용하므로 범위 밖 파일은 열지 않음
+    """
+    expr = None
+    if start is not None:
+        day = start.strftime("%Y-%m-%d")
+        cond = (ds.field("dt") > day) | ((ds.field("dt") == day) & (ds.field("hour") >= start.hour))
+        expr = cond
+    if end is not None:
+        last = end - timedelta(microseconds=1)
+        day = last.strftime("%Y-%m-%d")
+        cond = (ds.field("dt") < day) | ((ds.field("dt") == day) & (ds.field("hour") <= last.hour))
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def open_log_dataset(fs, path: str = LOG_DATASET_PATH) -> ds.Dataset:
+    """dt/hour 파티션 예측 로그 데이터셋 열기"""
+    return ds.dataset(_strip_scheme(path), filesystem=fs, format="parquet",
+                      partitioning=LOG_PARTITIONING)
+
+
+def read_log_window(fs, start: datetime = None, end: datetime = None,
+                    columns: list = None, path: str = LOG_DATASET_PATH) -> pd.DataFrame:
+    """
+    [start, end) 구간의 예측 로그만 읽기
+    - 파티션 필터로 범위 밖 파티션은 스킵, timestamp 로 구간 경계를 정확히 자름
+    - columns 지정 시 해당 컬럼만 읽음
+    """
+    dataset = open_log_dataset(fs, path)
+
+    row_filter = partition_filter(start, end)
+    if start is not None:
+        row_filter = row_filter & (ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us")))
+    if end is not None:
+        row_filter = row_filter & (ds.field("timestamp") < pa.scalar(end, pa.timestamp("us")))
+
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    return table.to_pandas()
+
+
+def list_log_partitions(fs, path: str = LOG_DATASET_PATH) -> list:
+    """존재하는 (dt, hour) 파티션 목록 (정렬됨)"""
+    parts = set()
+    for p in fs.glob(f"{_strip_scheme(path)}/dt=*/hour=*"):
+        dt_part, hour_part = p.rstrip("/").split("/")[-2:]
+        parts.add((dt_part.split("=", 1)[1], int(hour_part.split("=", 1)[1])))
+    return sorted(parts)
+
+
+# --------------------------------------------------
+# ⏱️ 시간 버킷 집계 (배치 단위 스트리밍, 원본 행은 메모리에 쌓지 않음)
+# --------------------------------------------------
+BUCKET_FREQ = {"minute": 60, "hour": 3600}
+
+
+def hist_quantile(hist: np.ndarray, q: float):
+    """[0, 1] 등간격 히스토그램(마지막 축)의 q 분위수 (구간 상단값 기준)"""
+    edges = np.linspace(0, 1, hist.shape[-1] + 1)
+    counts = hist.sum(axis=-1)
+    idx = (hist.cumsum(axis=-1) >= np.ceil(q * counts)[..., None]).argmax(axis=-1)
+    return np.where(counts > 0, edges[idx + 1], np.nan)
+
+
+def aggregate_log_buckets(fs, start: datetime, end: datetime, freq: str = "minute",
+                          prob_bins: int = 200, path: str = LOG_DATASET_PATH):
+    """
+    [start, end) 구간 로그를 시간 버킷별로 집계
+    - timestamp / probability / prediction 3개 컬럼만 읽음
+    - 버킷별 확률 히스토그램(prob_bins 구간)으로 p50/p95 근사 (오차 ≤ 1/prob_bins)
+    - 반환: (버킷별 DataFrame, 전체 확률 히스토그램, 라벨별 건수 dict)
+    """
+    bucket_sec = BUCKET_FREQ[freq]
+    # 로그 timestamp 는 naive → 구간 경계도 naive 그대로 초 단위 정수로 변환
+    start_sec = int(np.datetime64(start, "s").astype(np.int64)) // bucket_sec * bucket_sec
+    end_sec = int(np.datetime64(end, "s").astype(np.int64))
+    n_buckets = max(1, -(-(end_sec - start_sec) // bucket_sec))
+
+    hist = np.zeros((n_buckets, prob_bins), dtype=np.int64)
+    prob_sum = np.zeros(n_buckets)
+    positives = np.zeros(n_buckets, dtype=np.int64)
+    label_counts = {}
+
+    dataset = open_log_dataset(fs, path)
+    row_filter = partition_filter(start, end) \
+        & (ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us"))) \
+        & (ds.field("timestamp") < pa.scalar(end, pa.timestamp("us")))
+    columns = [c for c in ["timestamp", "probability", "prediction"] if c in dataset.schema.names]
+
+    for batch in dataset.to_batches(columns=columns, filter=row_filter):
+        if batch.num_rows == 0:
+            continue
+        df = batch.to_pandas()
+        ts_sec = df["timestamp"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+        bucket = np.clip((ts_sec - start_sec) // bucket_sec, 0, n_buckets - 1)
+
+        if "probability" in df.columns:
+            prob = df["probability"].to_numpy(dtype=float)
+            valid = ~np.isnan(prob)
+            b, p = bucket[valid], prob[valid]
+            pbin = np.clip((p * prob_bins).astype(np.int64), 0, prob_bins - 1)
+            np.add.at(hist, (b, pbin), 1)
+            np.add.at(prob_sum, b, p)
+
+        if "prediction" in df.columns:
+            pred = df["prediction"].to_numpy()
+            np.add.at(positives, bucket, (pred == 1).astype(np.int64))
+            for label, cnt in zip(*np.unique(pred, return_counts=True)):
+                label_counts[int(label)] = label_counts.get(int(label), 0) + int(cnt)
+
+    counts = hist.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        buckets = pd.DataFrame({
+            "bucket": pd.to_datetime(start_sec + np.arange(n_buckets) * bucket_sec, unit="s"),
+            "count": counts,
+            "mean_prob": prob_sum / counts,
+            "p50_prob": hist_quantile(hist, 0.5),
+            "p95_prob": hist_quantile(hist, 0.95),
+            "positive_rate": positives / counts,
+        })
+    return buckets, hist.sum(axis=0), label_counts
+
+
+def read_latest_logs(fs, n: int = 10, end: datetime = None, path: str = LOG_DATASET_PATH) -> pd.DataFrame:
+    """가장 최근 파티션부터 거꾸로 읽어 최신 n건만 반환"""
+    frames, total = [], 0
+    for dt, hour in reversed(list_log_partitions(fs, path)):
+        part_start = datetime.strptime(dt, "%Y-%m-%d").replace(hour=hour)
+        if end is not None and part_start >= end:
+            continue
+        part = read_log_window(fs, part_start, part_start + timedelta(hours=1), path=path)
+        frames.append(part)
+        total += len(part)
+        if total >= n:
+            break
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values("timestamp", ascending=False).head(n)
+
+
+def backup_log_partitions(fs, backup_dir: str, start: datetime, end: datetime,
+                          path: str = LOG_DATASET_PATH) -> list:
+    """
+    구간 내 파티션의 파트 파일 중 백업에 없는 파일만 복사 (증분 백업)
+    - 파트 파일은 쓰기 후 변경되지 않으므로 경로+크기로 신규 여부 판단
+    """
+    root = _strip_scheme(path)
+    copied = []
+    for dt, hour in list_log_partitions(fs, path):
+        part_start = datetime.strptime(dt, "%Y-%m-%d").replace(hour=hour)
+        if part_start + timedelta(hours=1) <= start or part_start >= end:
+            continue
+        for info in fs.ls(f"{root}/dt={dt}/hour={hour:02d}", detail=True):
+            rel = info["name"].split(f"{root}/", 1)[-1]
+            local_path = os.path.join(backup_dir, rel)
+            if os.path.exists(local_path) and os.path.getsize(local_path) == info.get("size"):
+                continue
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            fs.get(info["name"], local_path)
+            copied.append(local_path)
+    return copied
+
+
+# --------------------------------------------------
+# 📊 PSI 계산
+# --------------------------------------------------
+def psi_breakpoints(expected, buckets=10):
+    """expected 분포의 분위수 기준 구간 경계 (중복 제거)"""
+    expected = np.asarray(expected, dtype=float)
+    expected = expected[~np.isnan(expected)]
+    if len(expected) == 0:
+        return np.array([])
+    return np.unique(np.percentile(expected, np.linspace(0, 100, buckets + 1)))
+
+
+def psi_from_percents(expected_percents, actual_percents):
+    """구간별 비율로부터 PSI 계산 (0으로 나누기 방지)"""
+    expected_percents = np.where(expected_percents == 0, 1e-6, expected_percents)
+    actual_percents = np.where(actual_percents == 0, 1e-6, actual_percents)
+    return np.sum((actual_percents - expected_percents) *
+                  np.log(actual_percents / expected_percents))
+
+
+def calculate_psi(expected, actual, buckets=10, breakpoints=None):
+    """
+    Population Stability Index (PSI) 계산
+    - PSI < 0.1: 안정적 (Stable)
+    - 0.1 ≤ PSI < 0.25: 중간 드리프트 (Moderate Drift)
+    - PSI ≥ 0.25: 심각한 드리프트 (Significant Drift)
+    - breakpoints 를 미리 계산해 넘기면 윈도우마다 기준 분위수를 다시 구하지 않음
+    """
+    # 결측치 제거
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    expected = expected[~np.isnan(expected)]
+    actual = actual[~np.isnan(actual)]
+
+    if len(expected) == 0 or len(actual) == 0:
+        return np.nan
+
+    if breakpoints is None:
+        breakpoints = psi_breakpoints(expected, buckets)
+
+    if len(breakpoints) < 2:
+        return np.nan
+
+    expected_percents = np.histogram(expected, bins=breakpoints)[0] / len(expected)
+    actual_percents = np.histogram(actual, bins=breakpoints)[0] / len(actual)
+    return psi_from_percents(expected_percents, actual_percents)
+
+
+def classify_psi(psi_series: pd.Series) -> pd.Series:
+    """PSI 값 → 안정성 등급"""
+    return pd.cut(
+        psi_series,
+        bins=[-np.inf, 0.1, 0.25, np.inf],
+        labels=["✅ Stable", "⚠️ Moderate Drift", "🚨 Significant Drift"]
+    )
+
+
+# --------------------------------------------------
+# 🧾 기준 분포 요약 (reference profile)
+# --------------------------------------------------
+def build_feature_profile(values, buckets=10, n_quantiles=101, hist_bins=50) -> dict:
+    """
+    단일 피처 요약
+    - quantiles: 0~100% 분위수 스케치
+    - psi_edges / psi_percents: calculate_psi 와 동일한 분위수 구간 + 구간별 비율
+    - hist_edges / hist_counts: 시각화용 등간격 히스토그램
+    """
+    values = np.asarray(values, dtype=float)
+    total = len(values)
+    valid = values[~np.isnan(values)]
+
+    profile = {
+        "count": int(total),
+        "null_rate": float(1 - len(valid) / total) if total else 0.0,
+    }
+    if len(valid) == 0:
+        return profile
+
+    psi_edges = psi_breakpoints(valid, buckets)
+    psi_counts = np.histogram(valid, bins=psi_edges)[0] if len(psi_edges) >= 2 else np.array([])
+    hist_counts, hist_edges = np.histogram(valid, bins=hist_bins)
+
+    profile.update({
+        "mean": float(valid.mean()),
+        "std": float(valid.std(ddof=1)) if len(valid) > 1 else 0.0,
+        "min": float(valid.min()),
+        "max": float(valid.max()),
+        "quantiles": np.percentile(valid, np.linspace(0, 100, n_quantiles)).tolist(),
+        "psi_edges": psi_edges.tolist(),
+        "psi_percents": (psi_counts / len(valid)).tolist(),
+        "hist_edges": hist_edges.tolist(),
+        "hist_counts": hist_counts.tolist(),
+    })
+    return profile
+
+
+def build_score_profile(probabilities) -> dict:
+    """예측 확률 요약 — psi_edges 는 분위수 대신 고정 SCORE_EDGES (실시간 모니터의 score PSI 기준)"""
+    profile = build_feature_profile(probabilities)
+    valid = np.asarray(probabilities, dtype=float)
+    valid = valid[~np.isnan(valid)]
+    if len(valid):
+        profile["psi_edges"] = SCORE_EDGES.tolist()
+        profile["psi_percents"] = (np.histogram(valid, bins=SCORE_EDGES)[0] / len(valid)).tolist()
+    return profile
+
+
+def build_reference_profile(df: pd.DataFrame, version: str, created_at: str = None, scores=None) -> dict:
+    """
+    DataFrame 의 수치형 컬럼 전체에 대한 기준 분포 요약
+    - scores: 같은 행에 대한 앙상블 예측 확률 → features["probability"] (score PSI 기준)
+    """
+    numeric_cols = [c for c in df.select_dtypes(include="number").columns if c not in EXCLUDE_COLS]
+    features = {c: build_feature_profile(df[c].values) for c in numeric_cols}
+    if scores is not None:
+        features["probability"] = build_score_profile(scores)
+    return {
+        "version": version,
+        "created_at": created_at or datetime.now().isoformat(),
+        "n_rows": int(len(df)),
+        "features": features,
+    }
+
+
+def save_reference_profile(fs, profile: dict, profile_dir: str = PROFILE_DIR) -> str:
+    """{version}.json 저장 + latest.json 갱신"""
+    body = json.dumps(profile, ensure_ascii=False).encode("utf-8")
+    path = f"{profile_dir}/{profile['version']}.json"
+    for p in (path, f"{profile_dir}/latest.json"):
+        with fs.open(p, "wb") as f:
+            f.write(body)
+    return path
+
+
+def load_reference_profile(fs, version: str = None, profile_dir: str = PROFILE_DIR) -> dict:
+    """버전 지정 시 해당 버전, 아니면 latest.json 로드"""
+    path = f"{profile_dir}/{version or 'latest'}.json"
+    with fs.open(path, "rb") as f:
+        return json.load(f)
+
+
+def psi_from_profile(feature_profile: dict, actual) -> float:
+    """기준 요약의 psi_edges / psi_percents 로 PSI 계산 (calculate_psi 와 동일한 구간)"""
+    edges = np.asarray(feature_profile.get("psi_edges", []), dtype=float)
+    if len(edges) < 2:
+        return np.nan
+
+    actual = np.asarray(actual, dtype=float)
+    actual = actual[~np.isnan(actual)]
+    if len(actual) == 0:
+        return np.nan
+
+    expected_percents = np.asarray(feature_profile["psi_percents"], dtype=float)
+    actual_percents = np.histogram(actual, bins=edges)[0] / len(actual)
+    return psi_from_percents(expected_percents, actual_percents)
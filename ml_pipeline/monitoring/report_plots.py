@@ -0,0 +1,140 @@
+# ======================================
+# 리포트 그래프 함수 (집계값 → Figure)
+# - report_utils.render_figures 가 워커 프로세스에서 호출하므로 모듈 최상위 함수로 둠
+# ======================================
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+def psi_color(psi: float) -> str:
+    return '#27ae60' if psi < 0.1 else '#f39c12' if psi < 0.25 else '#e74c3c'
+
+
+# --------------------------------------------------
+# 📊 log_analysis.py
+# --------------------------------------------------
+def plot_prob_distribution(data):
+    """data: {"edges", "counts"} (30구간 합산 히스토그램)"""
+    fig, ax = plt.subplots(figsize=(7, 5))
+    ax.stairs(data["counts"], data["edges"], fill=True, color="#6baed6", alpha=0.8)
+    ax.set_title(" 예측 확률 분포", fontsize=13)
+    ax.set_xlabel("예측 확률", fontsize=11)
+    ax.set_ylabel("개수", fontsize=11)
+    ax.grid(True, linestyle="--", alpha=0.6)
+    fig.tight_layout()
+    return fig
+
+
+def plot_label_pie(data):
+    """data: {"labels": [...], "values": [...]} (비율 %)"""
+    fig, ax = plt.subplots(figsize=(5, 5))
+    ax.pie(
+        data["values"],
+        labels=[f"{i} ({v:.1f}%)" for i, v in zip(data["labels"], data["values"])],
+        autopct="%1.1f%%",
+        startangle=90,
+        colors=["#fd8d3c", "#6baed6"]
+    )
+    ax.set_title(" 구매/비구매 비율", fontsize=13)
+    fig.tight_layout()
+    return fig
+
+
+def plot_prob_trend(active):
+    """active: 버킷 집계 DataFrame (bucket, mean_prob, p50_prob, p95_prob)"""
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.fill_between(active["bucket"], active["p50_prob"], active["p95_prob"],
+                    color="#9ecae1", alpha=0.4, label="p50 ~ p95")
+    ax.plot(active["bucket"], active["mean_prob"], color="#3182bd", linewidth=1.5, label="평균")
+    ax.set_title(" 시간별 예측 확률 추이", fontsize=13)
+    ax.set_xlabel("시간", fontsize=11)
+    ax.set_ylabel("예측 확률", fontsize=11)
+    ax.legend(loc="upper right")
+    ax.grid(True, linestyle="--", alpha=0.6)
+    fig.tight_layout()
+    return fig
+
+
+# --------------------------------------------------
+# 📊 visualize_drift.py
+# --------------------------------------------------
+def plot_feature_distributions(features):
+    """
+    features: {피처: {"name", "ref_edges", "ref_counts", "ref_mean", "ref_std",
+                      "cur_edges", "cur_counts", "cur_mean", "cur_std"}}
+    - 운영 데이터도 원본이 아닌 30구간 히스토그램으로 전달
+    """
+    cols = list(features)
+    fig, axes = plt.subplots(len(cols), 1, figsize=(12, 4 * len(cols)))
+    axes = np.atleast_1d(axes)
+
+    for ax, col in zip(axes, cols):
+        f = features[col]
+        for edges, counts, label, color in [
+            (f["ref_edges"], f["ref_counts"], '학습 데이터', 'blue'),
+            (f["cur_edges"], f["cur_counts"], '운영 데이터', 'red'),
+        ]:
+            edges = np.asarray(edges, dtype=float)
+            counts = np.asarray(counts, dtype=float)
+            if len(edges) < 2:
+                continue
+            density = counts / max(counts.sum(), 1) / np.where(np.diff(edges) > 0, np.diff(edges), 1)
+            ax.stairs(density, edges, fill=True, alpha=0.5, label=label, color=color)
+
+        ax.set_xlabel(f["name"], fontsize=10)
+        ax.set_ylabel('밀도', fontsize=10)
+        ax.set_title(f'분포 비교: {f["name"]}', fontsize=12, fontweight='bold')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+        stats_text = f'학습: 평균={f["ref_mean"]:.2f}, 표준편차={f["ref_std"]:.2f}\n'
+        stats_text += f'운영: 평균={f["cur_mean"]:.2f}, 표준편차={f["cur_std"]:.2f}'
+        ax.text(0.98, 0.95, stats_text, transform=ax.transAxes,
+                verticalalignment='top', horizontalalignment='right',
+                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
+                fontsize=9)
+
+    fig.tight_layout()
+    return fig
+
+
+def plot_psi_report(psi_df):
+    """psi_df: feature_kr, psi 컬럼"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.barh(psi_df['feature_kr'], psi_df['psi'], color=[psi_color(x) for x in psi_df['psi']])
+
+    ax.axvline(x=0.1, color='green', linestyle='--', linewidth=2,
+               label='안정 (< 0.1)', alpha=0.7)
+    ax.axvline(x=0.25, color='orange', linestyle='--', linewidth=2,
+               label='보통 (< 0.25)', alpha=0.7)
+
+    ax.set_xlabel('PSI 값', fontsize=12, fontweight='bold')
+    ax.set_ylabel('피처', fontsize=12, fontweight='bold')
+    ax.set_title('피처별 모집단 안정성 지수 (PSI)',
+                 fontsize=14, fontweight='bold')
+    ax.legend(loc='upper right')
+    ax.grid(True, axis='x', alpha=0.3)
+
+    for i, psi in enumerate(psi_df['psi']):
+        ax.text(psi + 0.3, i, f'{psi:.2f}',
+                va='center', fontsize=9, fontweight='bold')
+
+    fig.tight_layout()
+    return fig
+
+
+def plot_psi_timeseries(ts_pivot):
+    """ts_pivot: index=window_start, columns=피처 한글명, values=psi"""
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for col in ts_pivot.columns:
+        ax.plot(ts_pivot.index, ts_pivot[col], linewidth=1.5, label=col)
+
+    ax.axhline(y=0.1, color='green', linestyle='--', linewidth=2, alpha=0.7)
+    ax.axhline(y=0.25, color='orange', linestyle='--', linewidth=2, alpha=0.7)
+    ax.set_xlabel('시간', fontsize=12, fontweight='bold')
+    ax.set_ylabel('PSI 값', fontsize=12, fontweight='bold')
+    ax.set_title('시간대별 피처 PSI 추이', fontsize=14, fontweight='bold')
+    ax.legend(loc='upper left', bbox_to_anchor=(1.01, 1), fontsize=9)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
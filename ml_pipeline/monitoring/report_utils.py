@@ -0,0 +1,160 @@
+# ======================================
+# 리포트 그래프 렌더러 (병렬 렌더링 + 입력 해시 기반 캐시)
+# ======================================
+import os
+import json
+import hashlib
+import pickle
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+FINAL_DPI = 300
+PREVIEW_DPI = 72
+REPORT_PREVIEW = os.getenv("REPORT_PREVIEW", "0") == "1"
+
+CACHE_FILENAME = ".render_cache.json"
+# 미리보기는 최종 리포트와 같은 파일명을 쓰므로 하위 디렉터리에 따로 저장 (최종 300dpi 파일을 덮어쓰지 않음)
+PREVIEW_SUBDIR = "preview"
+
+
+class FigureSpec(NamedTuple):
+    """
+    렌더링할 그래프 1개
+    - plot_fn: report_plots 의 모듈 함수 (data → matplotlib Figure), 프로세스 간 전달 가능해야 함
+    - data: 그래프 입력 집계값 (원본 로그가 아닌 요약값) → 캐시 키
+    """
+    filename: str
+    plot_fn: Callable
+    data: Any
+
+
+def setup_matplotlib():
+    """한글 폰트 + 비대화형 백엔드 설정 (메인/워커 프로세스 공통)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.family'] = 'NanumGothic'
+    plt.rcParams['axes.unicode_minus'] = False
+
+
+# --------------------------------------------------
+# 🔑 입력 집계값 해시
+# --------------------------------------------------
+def _update_hash(h, obj):
+    if isinstance(obj, pd.DataFrame):
+        h.update(repr(list(obj.columns)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(str(obj.name).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(f"{obj.dtype}{obj.shape}".encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        for k in sorted(obj, key=str):
+            h.update(str(k).encode())
+            _update_hash(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}{len(obj)}".encode())
+        for v in obj:
+            _update_hash(h, v)
+    else:
+        h.update(pickle.dumps(obj))
+
+
+def figure_key(spec: FigureSpec, dpi: int) -> str:
+    """그래프 함수 + 입력 집계값 + dpi 에 대한 해시"""
+    h = hashlib.sha256()
+    h.update(f"{spec.plot_fn.__module__}.{spec.plot_fn.__qualname__}:{dpi}".encode())
+    _update_hash(h, spec.data)
+    return h.hexdigest()
+
+
+# --------------------------------------------------
+# 🖼️ 렌더링
+# --------------------------------------------------
+def _render_one(plot_fn, data, save_path, dpi):
+    import matplotlib.pyplot as plt
+    fig = plot_fn(data)
+    fig.savefig(save_path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return save_path
+
+
+def _load_cache(output_dir: str) -> dict:
+    path = os.path.join(output_dir, CACHE_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(output_dir: str, cache: dict):
+    path = os.path.join(output_dir, CACHE_FILENAME)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def figure_dir(output_dir: str, preview: bool = REPORT_PREVIEW) -> str:
+    """그래프가 저장되는 디렉터리 (미리보기는 output_dir/preview)"""
+    return os.path.join(output_dir, PREVIEW_SUBDIR) if preview else output_dir
+
+
+def render_figures(specs: list, output_dir: str, preview: bool = REPORT_PREVIEW,
+                   max_workers: int = None) -> dict:
+    """
+    그래프 목록 렌더링
+    - 입력 해시가 직전 렌더링과 같고 파일이 있으면 건너뜀
+    - 나머지는 프로세스 풀에서 병렬 렌더링 (fork 불가 환경은 순차)
+    - preview=True 면 저해상도(72dpi)로 빠르게 확인, figure_dir(output_dir, True) 에 따로 저장 (캐시도 별도)
+    - 반환: {filename: "rendered" | "cached"}
+    """
+    output_dir = figure_dir(output_dir, preview)
+    os.makedirs(output_dir, exist_ok=True)
+    dpi = PREVIEW_DPI if preview else FINAL_DPI
+    cache = _load_cache(output_dir)
+
+    status, todo = {}, []
+    for spec in specs:
+        key = figure_key(spec, dpi)
+        save_path = os.path.join(output_dir, spec.filename)
+        if cache.get(spec.filename) == key and os.path.exists(save_path):
+            status[spec.filename] = "cached"
+        else:
+            todo.append((spec, key, save_path))
+
+    try:
+        _render_todo(todo, cache, status, dpi, max_workers)
+    finally:
+        if todo:
+            _save_cache(output_dir, cache)
+    return status
+
+
+def _render_todo(todo, cache, status, dpi, max_workers):
+    if len(todo) > 1 and "fork" in mp.get_all_start_methods():
+        # 스크립트 본문이 __main__ 가드 없이 실행되므로 재import 가 없는 fork 만 사용
+        workers = min(len(todo), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork"),
+                                 initializer=setup_matplotlib) as pool:
+            futures = [(spec, key, pool.submit(_render_one, spec.plot_fn, spec.data, path, dpi))
+                       for spec, key, path in todo]
+            for spec, key, fut in futures:
+                fut.result()
+                cache[spec.filename] = key
+                status[spec.filename] = "rendered"
+    else:
+        setup_matplotlib()
+        for spec, key, path in todo:
+            _render_one(spec.plot_fn, spec.data, path, dpi)
+            cache[spec.filename] = key
+            status[spec.filename] = "rendered"
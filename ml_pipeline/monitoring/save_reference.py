@@ -6,6 +6,13 @@ import pandas as pd
 import numpy as np
 import s3fs
 import os
+import sys
+import json
+from datetime import datetime
+
+from monitor_utils import (
+    build_reference_profile, save_reference_profile, MODEL_META_PATH
+)
 
 print("=" * 70)
 print("📦 기준 데이터 생성 및 저장")
@@ -62,10 +69,31 @@ def compute_derived_features(df):
     
     return df
 
+
+def compute_reference_scores(df):
+    """
+    기준 데이터에 대한 서빙 앙상블 예측 확률 (/predict 와 같은 균등 평균)
+    → 실시간 모니터(/drift)의 score PSI 기준 분포. 모델 / 피처가 없으면 None
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+    try:
+        from model_utils import load_local_models, predict_proba_batch
+        models, meta = load_local_models()
+    except Exception as e:
+        print(f"   ⚠️ 모델 로드 실패 ({e}) → score 기준 분포 생략")
+        return None
+    missing = [f for f in meta["features"] if f not in df.columns]
+    if missing:
+        print(f"   ⚠️ 모델 피처 누락 {missing} → score 기준 분포 생략")
+        return None
+    prob, _ = predict_proba_batch(models, meta, df[meta["features"]].to_numpy(dtype=float), num_threads=-1)
+    print(f"   ✅ 기준 예측 확률 {len(prob):,}건 (모델 {meta.get('version')}, 평균 {prob.mean():.4f})")
+    return prob
+
 # --------------------------------------------------
 # 2️⃣ 학습 데이터 로드
 # --------------------------------------------------
-print("\n[1/4] 학습 피처 데이터 로딩...")
+print("\n[1/5] 학습 피처 데이터 로딩...")
 feature_path = "s3://feature-data/session_features.parquet"
 
 try:
@@ -82,7 +110,7 @@ except Exception as e:
 # --------------------------------------------------
 # 3️⃣ Target 컬럼 제거
 # --------------------------------------------------
-print("\n[2/4] Target 컬럼 제거...")
+print("\n[2/5] Target 컬럼 제거...")
 if "has_transaction" in X.columns:
     X = X.drop(columns=["has_transaction"])
     print("   ✅ 'has_transaction' 컬럼 제거")
@@ -92,7 +120,7 @@ print(f"   📊 현재 컬럼: {X.shape[1]}개")
 # --------------------------------------------------
 # 4️⃣ 파생 피처 계산
 # --------------------------------------------------
-print("\n[3/4] 파생 피처 계산...")
+print("\n[3/5] 파생 피처 계산...")
 X = compute_derived_features(X)
 
 print(f"\n   📊 파생 피처 추가 후: {X.shape[1]}개 컬럼")
@@ -115,7 +143,7 @@ for f in available_features:
 # --------------------------------------------------
 # 5️⃣ 저장
 # --------------------------------------------------
-print("\n[4/4] MinIO 업로드 중...")
+print("\n[4/5] MinIO 업로드 중...")
 REFERENCE_PATH = "s3://model-logs/session-purchase/reference_data.csv"
 
 try:
@@ -135,7 +163,32 @@ except Exception as e:
     exit(1)
 
 # --------------------------------------------------
-# 6️⃣ 검증
+# 6️⃣ 기준 분포 요약(profile) 저장
+# --------------------------------------------------
+# 모니터링 스크립트는 전체 CSV 대신 이 요약(수 KB)만 읽음
+print("\n[5/5] 기준 분포 요약 생성 중...")
+try:
+    with fs.open(MODEL_META_PATH, "r") as f:
+        model_version = json.load(f).get("version", "unknown")
+except Exception as e:
+    model_version = "unknown"
+    print(f"   ⚠️ 모델 메타 로드 실패 ({e}) → version='unknown'")
+
+try:
+    # 최종 10개 피처 + 원시 수치 피처 모두 요약 (서빙 모델별 피처 구성이 달라도 조회 가능)
+    # + 서빙 앙상블의 예측 확률 분포 (probability)
+    profile = build_reference_profile(X, version=model_version,
+                                      created_at=datetime.now().isoformat(),
+                                      scores=compute_reference_scores(X))
+    profile_path = save_reference_profile(fs, profile)
+    size_kb = len(json.dumps(profile, ensure_ascii=False).encode("utf-8")) / 1024
+    print(f"   ✅ 요약 저장 완료 → {profile_path} ({len(profile['features'])}개 피처, {size_kb:.1f} KB)")
+except Exception as e:
+    print(f"   ❌ 요약 저장 실패: {e}")
+    exit(1)
+
+# --------------------------------------------------
+# 7️⃣ 검증
 # --------------------------------------------------
 print("\n[검증] 저장된 데이터 확인...")
 try:
@@ -3,50 +3,47 @@
 # ===============================================================
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import s3fs
+import argparse
 import os
 
+from monitor_utils import get_fs, read_log_window, load_reference_profile
+from drift_timeseries import read_timeseries
+from report_utils import FigureSpec, figure_dir, render_figures, setup_matplotlib, REPORT_PREVIEW
+from report_plots import plot_feature_distributions, plot_psi_report, plot_psi_timeseries
+
 # 한글 폰트 설정
-plt.rcParams['font.family'] = 'NanumGothic'
-plt.rcParams['axes.unicode_minus'] = False
+setup_matplotlib()
+
+parser = argparse.ArgumentParser(description="데이터 드리프트 시각화")
+parser.add_argument("--preview", action="store_true", default=REPORT_PREVIEW,
+                    help="저해상도(72dpi) 미리보기 렌더링 (OUTPUT_DIR/preview 에 저장)")
+args = parser.parse_args()
 
 print("=" * 70)
 print("📊 데이터 드리프트 시각화")
 print("=" * 70)
 
 # MinIO 연결
-fs = s3fs.S3FileSystem(
-    key="minioadmin",
-    secret="minioadmin",
-    client_kwargs={"endpoint_url": "http://localhost:9900"}
-)
+fs = get_fs()
 
 # 출력 디렉토리 생성
 OUTPUT_DIR = "ml-pipeline/monitoring/drift_plots"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # --- 1️⃣ 데이터 로드 ---
-print("\n[1/3] 데이터 로딩...")
+print("\n[1/4] 데이터 로딩...")
 
-reference_path = "s3://model-logs/session-purchase/reference_data.csv"
-log_path = "s3://model-logs/session-purchase/inference-logs.csv"
+# 기준 데이터는 전체 CSV 대신 분포 요약(히스토그램/평균/표준편차)만 사용
+profile = load_reference_profile(fs)
+ref_features = profile["features"]
 
-with fs.open(reference_path, "rb") as f:
-    ref_df = pd.read_csv(f)
+cur_df = read_log_window(fs, columns=list(ref_features))
 
-with fs.open(log_path, "rb") as f:
-    cur_df = pd.read_csv(f)
-
-print(f"   ✅ 기준 데이터: {ref_df.shape[0]:,}행")
+print(f"   ✅ 기준 데이터: {profile['n_rows']:,}행 요약 (version={profile['version']})")
 print(f"   ✅ 현재 데이터: {cur_df.shape[0]}행")
 
 # 공통 피처 추출
-exclude_cols = ['probability', 'prediction', 'threshold', 'model_version', 
-                'used_features', 'timestamp', 'has_transaction']
-feature_cols = [col for col in ref_df.columns if col not in exclude_cols]
-common_cols = [col for col in cur_df.columns if col in feature_cols]
+common_cols = [col for col in cur_df.columns if col in ref_features]
 
 # 피처명 한글 매핑
 feature_name_map = {
@@ -64,55 +61,35 @@ feature_name_map = {
 
 print(f"   📋 분석 피처: {len(common_cols)}개")
 
-# --- 2️⃣ 분포 비교 시각화 ---
-print("\n[2/3] 분포 비교 시각화 생성 중...")
-
-# 피처당 하나의 플롯 생성
-fig, axes = plt.subplots(len(common_cols), 1, figsize=(12, 4 * len(common_cols)))
-if len(common_cols) == 1:
-    axes = [axes]
-
-for idx, col in enumerate(common_cols):
-    ax = axes[idx]
-    
-    # 기준 데이터 (샘플링하여 크기 맞추기)
-    ref_sample = ref_df[col].sample(min(10000, len(ref_df)), random_state=42)
-    
-    # 히스토그램
-    ax.hist(ref_sample, bins=50, alpha=0.5, label='학습 데이터', 
-            color='blue', density=True)
-    ax.hist(cur_df[col], bins=30, alpha=0.5, label='운영 데이터', 
-            color='red', density=True)
-    
-    # 한글 피처명 사용
-    korean_name = feature_name_map.get(col, col)
-    ax.set_xlabel(korean_name, fontsize=10)
-    ax.set_ylabel('밀도', fontsize=10)
-    ax.set_title(f'분포 비교: {korean_name}', fontsize=12, fontweight='bold')
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    
-    # 통계 정보 추가
-    ref_mean = ref_df[col].mean()
-    cur_mean = cur_df[col].mean()
-    ref_std = ref_df[col].std()
-    cur_std = cur_df[col].std()
-    
-    stats_text = f'학습: 평균={ref_mean:.2f}, 표준편차={ref_std:.2f}\n'
-    stats_text += f'운영: 평균={cur_mean:.2f}, 표준편차={cur_std:.2f}'
-    ax.text(0.98, 0.95, stats_text, transform=ax.transAxes,
-            verticalalignment='top', horizontalalignment='right',
-            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
-            fontsize=9)
-
-plt.tight_layout()
-save_path = os.path.join(OUTPUT_DIR, "feature_distribution_comparison.png")
-plt.savefig(save_path, dpi=300, bbox_inches='tight')
-print(f"   ✅ 분포 비교 그래프 저장: {save_path}")
-plt.close()
-
-# --- 3️⃣ PSI 리포트 시각화 ---
-print("\n[3/3] PSI 리포트 시각화 중...")
+# --- 2️⃣ 분포 비교 집계 (그래프 입력은 원본 행이 아닌 히스토그램 요약) ---
+print("\n[2/4] 분포 비교 집계 중...")
+
+specs = []
+dist_data = {}
+for col in common_cols:
+    ref = ref_features[col]
+    if "hist_edges" not in ref:
+        # 기준 데이터에서 전부 결측인 피처 → 요약(히스토그램/평균/표준편차) 없음
+        print(f"   ⚠️ {col}: 기준 분포 요약 없음 (전부 결측) → 분포 비교 제외")
+        continue
+    values = cur_df[col].dropna().values
+    cur_counts, cur_edges = np.histogram(values, bins=30) if len(values) else (np.array([]), np.array([]))
+    dist_data[col] = {
+        "name": feature_name_map.get(col, col),
+        "ref_edges": np.asarray(ref["hist_edges"], dtype=float),
+        "ref_counts": np.asarray(ref["hist_counts"], dtype=float),
+        "ref_mean": ref["mean"],
+        "ref_std": ref["std"],
+        "cur_edges": cur_edges,
+        "cur_counts": cur_counts,
+        "cur_mean": float(cur_df[col].mean()),
+        "cur_std": float(cur_df[col].std()),
+    }
+if dist_data:
+    specs.append(FigureSpec("feature_distribution_comparison.png", plot_feature_distributions, dist_data))
+
+# --- 3️⃣ PSI 리포트 ---
+print("\n[3/4] PSI 리포트 로딩 중...")
 
 psi_path = "s3://model-logs/session-purchase/psi_report.csv"
 with fs.open(psi_path, "rb") as f:
@@ -120,53 +97,42 @@ with fs.open(psi_path, "rb") as f:
 
 # 피처명을 한글로 변경
 psi_df['feature_kr'] = psi_df['feature'].map(feature_name_map).fillna(psi_df['feature'])
-
-fig, ax = plt.subplots(figsize=(10, 6))
-
-# PSI 값 바 차트
-colors = psi_df['psi'].apply(
-    lambda x: '#27ae60' if x < 0.1 else '#f39c12' if x < 0.25 else '#e74c3c'
-)
-
-bars = ax.barh(psi_df['feature_kr'], psi_df['psi'], color=colors)
-
-# 기준선 추가
-ax.axvline(x=0.1, color='green', linestyle='--', linewidth=2, 
-           label='안정 (< 0.1)', alpha=0.7)
-ax.axvline(x=0.25, color='orange', linestyle='--', linewidth=2, 
-           label='보통 (< 0.25)', alpha=0.7)
-
-ax.set_xlabel('PSI 값', fontsize=12, fontweight='bold')
-ax.set_ylabel('피처', fontsize=12, fontweight='bold')
-ax.set_title('피처별 모집단 안정성 지수 (PSI)', 
-             fontsize=14, fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, axis='x', alpha=0.3)
-
-# 값 레이블 추가
-for i, (feature, psi) in enumerate(zip(psi_df['feature_kr'], psi_df['psi'])):
-    ax.text(psi + 0.3, i, f'{psi:.2f}', 
-            va='center', fontsize=9, fontweight='bold')
-
-plt.tight_layout()
-save_path = os.path.join(OUTPUT_DIR, "psi_report_chart.png")
-plt.savefig(save_path, dpi=300, bbox_inches='tight')
-print(f"   ✅ PSI 차트 저장: {save_path}")
-plt.close()
-
-# --- 4️⃣ 통계 요약 테이블 ---
+specs.append(FigureSpec("psi_report_chart.png", plot_psi_report,
+                        psi_df[['feature_kr', 'psi']].reset_index(drop=True)))
+
+# --- 4️⃣ 시간대별 PSI 추이 (drift_timeseries.py 결과) ---
+ts_df = read_timeseries(fs, "hourly")
+if len(ts_df) > 0:
+    ts_pivot = ts_df.pivot_table(index="window_start", columns="feature", values="psi")
+    ts_pivot.columns = [feature_name_map.get(c, c) for c in ts_pivot.columns]
+    specs.append(FigureSpec("psi_timeseries_chart.png", plot_psi_timeseries, ts_pivot))
+    print(f"   ✅ PSI 시계열: {ts_pivot.shape[0]}개 윈도우")
+else:
+    print("   ⚠️ PSI 시계열이 없습니다. 먼저 drift_timeseries.py 를 실행하세요")
+
+# --- 렌더링 (입력이 바뀐 그래프만 병렬로 다시 그림) ---
+print(f"\n[4/4] 그래프 렌더링 중... ({'미리보기' if args.preview else '최종'} 해상도)")
+status = render_figures(specs, OUTPUT_DIR, preview=args.preview)
+for filename, state in status.items():
+    mark = "♻️ 캐시 재사용" if state == "cached" else "✅ 저장"
+    print(f"   {mark}: {os.path.join(figure_dir(OUTPUT_DIR, args.preview), filename)}")
+
+# --- 5️⃣ 통계 요약 테이블 ---
 print("\n📈 통계 요약:")
 print("=" * 70)
 
 summary_data = []
 for col in common_cols:
+    if "hist_edges" not in ref_features[col]:
+        # 분포 비교와 같은 기준: 전부 결측인 피처는 평균/표준편차가 없음
+        continue
     summary_data.append({
         '피처': col,
-        '학습 평균': f"{ref_df[col].mean():.2f}",
+        '학습 평균': f"{ref_features[col]['mean']:.2f}",
         '운영 평균': f"{cur_df[col].mean():.2f}",
-        '학습 표준편차': f"{ref_df[col].std():.2f}",
+        '학습 표준편차': f"{ref_features[col]['std']:.2f}",
         '운영 표준편차': f"{cur_df[col].std():.2f}",
-        '평균 차이': f"{abs(ref_df[col].mean() - cur_df[col].mean()):.2f}"
+        '평균 차이': f"{abs(ref_features[col]['mean'] - cur_df[col].mean()):.2f}"
     })
 
 summary_df = pd.DataFrame(summary_data)
@@ -176,5 +142,5 @@ print("\n" + "=" * 70)
 print("✅ 시각화 완료!")
 print("=" * 70)
 print(f"\n📂 저장 위치: {OUTPUT_DIR}/")
-print("   - feature_distribution_comparison.png")
-print("   - psi_report_chart.png")
\ No newline at end of file
+for filename in status:
+    print(f"   - {filename}")
\ No newline at end of file
@@ -0,0 +1,15 @@
+# ============================================================
+# 🧪 테스트 공용 설정 — app 모듈을 서빙과 같은 방식(sibling import)으로 불러오기
+# ============================================================
+import os
+import sys
+import socket
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
@@ -0,0 +1,51 @@
+# ============================================================
+# 🧪 AdmissionMiddleware — 느린 요청 1건 뒤에도 경로가 다시 수락되는지
+# ============================================================
+import asyncio
+import httpx
+
+from admission import AdmissionController, AdmissionMiddleware
+
+
+def make_client(delays: list, max_in_flight: int = 2):
+    """요청마다 delays 에서 하나씩 꺼내 그만큼 기다리는 스텁 앱"""
+    async def app(scope, receive, send):
+        await asyncio.sleep(delays.pop(0) if delays else 0.0)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    ctl = AdmissionController(max_in_flight=max_in_flight, max_queue=4)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=AdmissionMiddleware(app, ctl)),
+                               base_url="http://test")
+    return ctl, client
+
+
+def test_route_recovers_after_one_slow_request():
+    async def run():
+        ctl, client = make_client([0.3])
+        headers = {"x-deadline-ms": "100"}
+        async with client:
+            first = await client.post("/predict/batch", headers=headers)
+            assert first.status_code == 200
+            assert ctl.service_sec("/predict/batch") > 0.1
+            # 유휴 서버: EWMA 가 마감을 넘어도 수락되어 EWMA 가 다시 내려감
+            statuses = [(await client.post("/predict/batch", headers=headers)).status_code for _ in range(10)]
+        assert statuses == [200] * 10
+        assert ctl.service_sec("/predict/batch") < 0.1
+    asyncio.run(run())
+
+
+def test_deadline_shedding_when_slots_are_busy():
+    async def run():
+        ctl, client = make_client([0.3, 0.3, 0.3], max_in_flight=1)
+        headers = {"x-deadline-ms": "100"}
+        async with client:
+            assert (await client.post("/predict", headers=headers)).status_code == 200
+            # 슬롯 1개가 처리 중일 때 예상 대기 + 처리 시간이 마감을 넘으면 429
+            busy = asyncio.create_task(client.post("/predict", headers={"x-deadline-ms": "1000"}))
+            await asyncio.sleep(0.05)
+            shed = await client.post("/predict", headers=headers)
+            assert (await busy).status_code == 200
+        assert shed.status_code == 429
+        assert shed.json()["reason"] == "deadline_unreachable"
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+# ============================================================
+# 🧪 compiled / onnx 백엔드 ↔ 네이티브 부스터(predict_proba_batch) 일치
+# - app/models_cache 로 산출물을 임시 디렉터리에 새로 만들고 서빙 기본 경로와 비교
+# - 저장소에 검증 데이터가 없으므로 CLI 검증과 같은 분포의 합성 행 (결측 1% 포함, 시드는 CLI 와 다름)
+# ============================================================
+import os
+import numpy as np
+import pytest
+
+from conftest import APP_DIR
+from model_utils import load_local_models, predict_proba_batch
+
+MAX_ABS_DIFF = 1e-6
+N_ROWS = 20000
+
+
+@pytest.fixture(scope="module")
+def native():
+    models, meta = load_local_models(os.path.join(APP_DIR, "models_cache"))
+    rng = np.random.default_rng(7)
+    X = rng.gamma(shape=1.5, scale=5.0, size=(N_ROWS, len(meta["features"])))
+    X[:, -2:] = rng.random((N_ROWS, 2))
+    X[rng.random(X.shape) < 0.01] = np.nan
+    prob, label = predict_proba_batch(models, meta, X, num_threads=-1)
+    return models, meta, X, prob, label
+
+
+def assert_parity(prob, label, ref_prob, ref_label):
+    assert float(np.max(np.abs(prob - ref_prob))) <= MAX_ABS_DIFF
+    assert int((label != ref_label).sum()) == 0
+
+
+def test_compiled_matches_native(native, tmp_path):
+    from tree_compiler import CompiledEnsemble, compile_ensemble, COMPILED_FILENAME
+    models, meta, X, ref_prob, ref_label = native
+    path = str(tmp_path / COMPILED_FILENAME)
+    compile_ensemble(models, meta).save(path)
+    prob, label = CompiledEnsemble.load(path).predict(X)
+    assert_parity(prob, label, ref_prob, ref_label)
+
+
+def test_onnx_matches_native(native, tmp_path):
+    pytest.importorskip("onnxmltools")
+    pytest.importorskip("onnxruntime")
+    from onnx_backend import OnnxEnsemble, export_ensemble, ONNX_FILENAME
+    models, meta, X, ref_prob, ref_label = native
+    path = tmp_path / ONNX_FILENAME
+    path.write_bytes(export_ensemble(models, meta).SerializeToString())
+    prob, label = OnnxEnsemble(str(path)).predict(X, num_threads=-1)
+    assert_parity(prob, label, ref_prob, ref_label)
@@ -0,0 +1,172 @@
+# ============================================================
+# 🧪 BatchJobManager — 로컬 S3 대체 서버(moto) 대상 체크포인트 / 재개
+# ============================================================
+import os
+import sys
+import json
+import time
+import subprocess
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import free_port
+
+boto3 = pytest.importorskip("boto3")
+pytest.importorskip("moto")
+
+import batch_jobs  # noqa: E402
+from batch_jobs import BatchJobManager, SUCCEEDED, FAILED, QUEUED, RUNNING  # noqa: E402
+
+FEATURES = ["session_id", "event_count", "n_view", "n_cart", "n_trans", "n_trans_ratio", "n_view_ratio"]
+ROW_GROUPS, ROWS_PER_GROUP = 4, 250
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, "-m", "moto.server", "-p", str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    endpoint = f"http://127.0.0.1:{port}"
+    client = boto3.client("s3", endpoint_url=endpoint, region_name="us-east-1",
+                          aws_access_key_id="minioadmin", aws_secret_access_key="minioadmin")
+    try:
+        for _ in range(60):
+            try:
+                client.list_buckets()
+                break
+            except Exception:
+                time.sleep(0.5)
+        client.create_bucket(Bucket="feature-data")
+        client.create_bucket(Bucket="model-logs")
+
+        rng = np.random.default_rng(0)
+        n = ROW_GROUPS * ROWS_PER_GROUP
+        table = pa.table({"row_id": np.arange(n), **{c: rng.random(n) for c in FEATURES}})
+        sink = pa.BufferOutputStream()
+        pq.write_table(table, sink, row_group_size=ROWS_PER_GROUP)
+        client.put_object(Bucket="feature-data", Key="features.parquet", Body=sink.getvalue().to_pybytes())
+        yield endpoint, client
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+@pytest.fixture(autouse=True)
+def use_s3_endpoint(s3_endpoint, monkeypatch):
+    monkeypatch.setattr(batch_jobs, "S3_ENDPOINT", s3_endpoint[0])
+
+
+def fake_predict(fail_on_call: int = None):
+    calls = {"n": 0}
+
+    def predict(models, meta, X, num_threads=1):
+        calls["n"] += 1
+        if calls["n"] == fail_on_call:
+            raise RuntimeError("boom")
+        probs = X[:, 1]
+        return probs, (probs >= 0.5).astype(int)
+    return predict
+
+
+def wait_done(manager, job_id, timeout=30):
+    for _ in range(int(timeout / 0.1)):
+        job = manager.get(job_id)
+        if job["status"] not in (QUEUED, RUNNING):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"작업이 끝나지 않음: {manager.get(job_id)}")
+
+
+def output_rows(client, prefix):
+    keys = [o["Key"] for o in client.list_objects_v2(Bucket="model-logs", Prefix=prefix)["Contents"]]
+    parts = sorted(k for k in keys if k.endswith(".parquet"))
+    ids = []
+    for k in parts:
+        body = client.get_object(Bucket="model-logs", Key=k)["Body"].read()
+        ids += pq.read_table(pa.BufferReader(body)).column("row_id").to_pylist()
+    return keys, ids
+
+
+def test_failed_job_resumes_from_checkpoint(s3_endpoint, tmp_path):
+    _, client = s3_endpoint
+    manager = BatchJobManager({}, {"features": FEATURES}, FEATURES, state_dir=str(tmp_path),
+                              predict_fn=fake_predict(fail_on_call=3))
+    job = manager.submit("s3://feature-data/features.parquet", "s3://model-logs/scores/a")
+    job = wait_done(manager, job["job_id"])
+    assert job["status"] == FAILED and job["row_groups_done"] == 2
+
+    manager.predict_fn = fake_predict()
+    manager.resume(job["job_id"])
+    job = wait_done(manager, job["job_id"])
+    assert job["status"] == SUCCEEDED
+    assert job["row_groups_skipped"] == 2 and job["rows_done"] == ROW_GROUPS * ROWS_PER_GROUP
+
+    keys, ids = output_rows(client, "scores/a/")
+    assert "scores/a/_SUCCESS" in keys
+    assert ids == list(range(ROW_GROUPS * ROWS_PER_GROUP))
+
+
+def test_orphaned_running_job_is_marked_failed_and_resumable(s3_endpoint, tmp_path):
+    _, client = s3_endpoint
+    # 행 그룹 1개를 처리한 뒤 프로세스가 죽은 상황: 체크포인트 + running 상태 JSON
+    manager = BatchJobManager({}, {"features": FEATURES}, FEATURES, state_dir=str(tmp_path),
+                              predict_fn=fake_predict(fail_on_call=2))
+    job = wait_done(manager, manager.submit("s3://feature-data/features.parquet",
+                                            "s3://model-logs/scores/b")["job_id"])
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    state_path = tmp_path / f"{job['job_id']}.json"
+    state = json.loads(state_path.read_text())
+    state.update(status=RUNNING, error=None, finished_at=None, pid=dead.pid)
+    state_path.write_text(json.dumps(state))
+
+    # 재시작된 워커: 시작 시 중단된 작업을 failed 로 표시
+    restarted = BatchJobManager({}, {"features": FEATURES}, FEATURES, state_dir=str(tmp_path),
+                                predict_fn=fake_predict())
+    job = json.loads(state_path.read_text())
+    assert job["status"] == FAILED and job["orphaned"] and str(dead.pid) in job["error"]
+
+    restarted.resume(job["job_id"])
+    job = wait_done(restarted, job["job_id"])
+    assert job["status"] == SUCCEEDED and job["row_groups_skipped"] == 1
+    _, ids = output_rows(client, "scores/b/")
+    assert ids == list(range(ROW_GROUPS * ROWS_PER_GROUP))
+
+
+def test_stale_running_job_on_other_host(tmp_path, monkeypatch):
+    manager = BatchJobManager({}, {"features": FEATURES}, FEATURES, state_dir=str(tmp_path))
+    job = {"job_id": "stale", "status": RUNNING, "pid": os.getpid(), "host": "other-pod",
+           "submitted_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00"}
+    (tmp_path / "stale.json").write_text(json.dumps(job))
+    assert manager.get("stale")["status"] == FAILED
+
+    job.update(job_id="fresh", updated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    (tmp_path / "fresh.json").write_text(json.dumps(job))
+    assert manager.get("fresh")["status"] == RUNNING
+
+
+@pytest.mark.parametrize("local", [True, False])
+def test_torn_checkpoint_is_treated_as_missing(s3_endpoint, tmp_path, local):
+    _, client = s3_endpoint
+    torn = b'{"input_path": "s3://feature-data/features.parquet", "done": [0, 1'
+    if local:
+        out_dir = str(tmp_path / "out")
+        os.makedirs(out_dir)
+        with open(os.path.join(out_dir, batch_jobs.CHECKPOINT_FILE), "wb") as f:
+            f.write(torn)
+    else:
+        out_dir = "s3://model-logs/scores/torn"
+        client.put_object(Bucket="model-logs", Key=f"scores/torn/{batch_jobs.CHECKPOINT_FILE}", Body=torn)
+
+    manager = BatchJobManager({}, {"features": FEATURES}, FEATURES, state_dir=str(tmp_path / "state"),
+                              predict_fn=fake_predict())
+    job = wait_done(manager, manager.submit("s3://feature-data/features.parquet", out_dir)["job_id"])
+    assert job["status"] == SUCCEEDED and job["row_groups_skipped"] == 0
+
+    fs, path = batch_jobs.get_filesystem(out_dir)
+    checkpoint = batch_jobs._read_json(fs, f"{path}/{batch_jobs.CHECKPOINT_FILE}")
+    assert sorted(checkpoint["done"]) == list(range(ROW_GROUPS))
+    names = [info.base_name for info in fs.get_file_info(batch_jobs.pafs.FileSelector(path))]
+    assert not any(".tmp-" in n for n in names)
@@ -0,0 +1,84 @@
+# ============================================================
+# 🧪 /predict/bulk — 실제 uvicorn 서버 대상 (TestClient 는 요청 본문을 한 번에 넘겨 본문 유실을 재현하지 못함)
+# ============================================================
+import io
+import os
+import sys
+import time
+import subprocess
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import httpx
+import pytest
+
+from conftest import APP_DIR, free_port
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NDJSON = "application/x-ndjson"
+FEATURES = ["session_id", "event_count", "n_view", "n_cart", "n_trans", "n_trans_ratio", "n_view_ratio"]
+
+
+@pytest.fixture(scope="module")
+def server():
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "serve_model:app", "--port", str(port)],
+                            cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            env={**os.environ, "ENVIRONMENT": "local"})
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(120):
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if proc.poll() is not None:
+                pytest.fail("uvicorn 서버가 시작되지 않았습니다")
+            time.sleep(0.5)
+        yield url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def arrow_body(n_rows: int, batch_rows: int = 500) -> bytes:
+    rng = np.random.default_rng(0)
+    table = pa.table({"row_id": np.arange(n_rows) * 10, **{c: rng.random(n_rows) * 10 for c in FEATURES}})
+    buf = io.BytesIO()
+    with ipc.new_stream(buf, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+    return buf.getvalue()
+
+
+def chunked(data: bytes, size: int = 64 * 1024):
+    # 실제 업로드처럼 여러 http.request 메시지로 나눠 보냄
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.mark.parametrize("n_rows", [50, 3000, 100_000])
+def test_arrow_upload_streams_all_rows(server, n_rows):
+    r = httpx.post(f"{server}/predict/bulk", content=chunked(arrow_body(n_rows)),
+                   headers={"content-type": ARROW_STREAM}, timeout=120)
+    assert r.status_code == 200
+    out = ipc.open_stream(r.content).read_all()
+    assert out.num_rows == n_rows
+    assert out.column("row_id").to_pylist() == list(range(0, n_rows * 10, 10))
+    probs = out.column("probability").to_numpy()
+    assert np.all((probs >= 0) & (probs <= 1))
+
+
+def test_arrow_upload_ndjson_response(server):
+    r = httpx.post(f"{server}/predict/bulk", content=chunked(arrow_body(3000)),
+                   headers={"content-type": ARROW_STREAM, "accept": NDJSON}, timeout=120)
+    assert r.status_code == 200
+    lines = r.text.strip().splitlines()
+    assert len(lines) == 3000 and '"error"' not in lines[-1]
+
+
+def test_invalid_arrow_body_is_rejected(server):
+    r = httpx.post(f"{server}/predict/bulk", content=b"not an arrow stream",
+                   headers={"content-type": ARROW_STREAM}, timeout=30)
+    assert r.status_code == 422
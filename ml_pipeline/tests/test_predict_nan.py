@@ -0,0 +1,42 @@
+# ============================================================
+# 🧪 /predict, /predict/batch — JSON 본문의 NaN (빈 피처 값) 허용
+# ============================================================
+import json
+import math
+import pytest
+from fastapi.testclient import TestClient
+
+import serve_model
+
+FEATURE_KEYS = [f"feature_{i}" for i in range(1, 8)]
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(serve_model.app) as c:
+        yield c
+
+
+def post_json(client, path: str, payload: dict):
+    # requests / json.dumps 와 같이 NaN 토큰을 그대로 씀
+    return client.post(path, content=json.dumps(payload), headers={"Content-Type": "application/json"})
+
+
+def test_predict_accepts_nan_feature(client):
+    row = {k: 1.0 for k in FEATURE_KEYS}
+    row["feature_3"] = float("nan")
+    res = post_json(client, "/predict", row)
+    assert res.status_code == 200, res.text
+    assert math.isfinite(res.json()["probability"])
+
+
+def test_predict_batch_accepts_nan_feature(client):
+    instances = [[1.0] * 7, [1.0, 2.0, float("nan"), 0.0, 0.0, 0.0, 0.5]]
+    res = post_json(client, "/predict/batch", {"instances": instances})
+    assert res.status_code == 200, res.text
+    assert len(res.json()["probabilities"]) == 2
+
+
+def test_predict_rejects_malformed_json(client):
+    res = client.post("/predict", content=b"{not json", headers={"Content-Type": "application/json"})
+    assert res.status_code == 422
@@ -0,0 +1,40 @@
+# ============================================================
+# 🧪 score_topk.TopK — 동점 확률에서도 전체 정렬과 같은 상위 K
+# ============================================================
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "inference"))
+from score_topk import TopK  # noqa: E402
+
+
+def brute_force(probs: np.ndarray, k: int) -> list:
+    """확률 내림차순, 동점이면 앞선 행 우선"""
+    return np.lexsort((np.arange(len(probs)), -probs))[:k].tolist()
+
+
+@pytest.mark.parametrize("k", [1, 100, 5000])
+@pytest.mark.parametrize("batch", [1000, 65536])
+def test_topk_matches_sort_with_ties(k, batch):
+    # GBDT 점수처럼 고유값이 적은 확률 (20k행 / 726개 값)
+    rng = np.random.default_rng(1)
+    probs = rng.choice(rng.random(726), size=20000)
+    ids = np.arange(len(probs)).tolist()
+
+    serial = TopK(k)
+    for start in range(0, len(probs), batch):
+        serial.push_batch(ids[start:start + batch], probs[start:start + batch], start)
+    expected = brute_force(probs, k)
+    assert serial.result("row_index")["row_index"].tolist() == expected
+
+    # 파티션별 힙 병합 (--workers 4 와 같은 경로)
+    merged = TopK(k)
+    for part in np.array_split(np.arange(len(probs)), 4):
+        topk = TopK(k)
+        for start in range(part[0], part[-1] + 1, batch):
+            stop = min(start + batch, part[-1] + 1)
+            topk.push_batch(ids[start:stop], probs[start:stop], start)
+        merged.merge(topk.heap)
+    assert merged.result("row_index")["row_index"].tolist() == expected
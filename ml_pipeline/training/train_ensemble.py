@@ -0,0 +1,333 @@
+# ===============================================================
+# 🏋️ train_ensemble.py — 피처 Parquet → LightGBM / XGBoost / CatBoost 앙상블 학습 → models_cache 산출물
+# ---------------------------------------------------------------
+# - 교차검증: (모델 × 폴드) 작업을 프로세스 풀에서 병렬 실행, 작업마다 스레드 예산 = 코어 수 / 동시 작업 수
+# - 최종 학습: 세 모델을 각각 별도 프로세스에서 동시에 (스레드 예산 = 코어 수 / 3)
+# - OOF 예측으로 가중치(0.1 격자) / threshold(F-beta 최대) 선택 → model_meta.json (eval, 단계별 소요 시간 포함)
+# - 시드 고정 (폴드 분할 / 모델 시드) → 같은 입력이면 같은 산출물
+#
+#   python ml_pipeline/training/train_ensemble.py \
+#       --input s3://feature-data/session_features.parquet --label-column label \
+#       --out ml_pipeline/app/models_cache [--folds 5] [--workers 4] [--params params.json] [--bundle]
+# ===============================================================
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from model_utils import MODEL_CACHE_DIR  # noqa: E402
+from batch_jobs import get_filesystem  # noqa: E402
+from model_bundle import MEMBER_FILES  # noqa: E402
+
+MODEL_NAMES = ("lgb", "xgb", "cat")
+# 현재 배포된 models_cache 모델과 같은 설정
+DEFAULT_PARAMS = {
+    "lgb": {"n_estimators": 500, "learning_rate": 0.05, "random_state": 42},
+    "xgb": {"n_estimators": 500, "learning_rate": 0.05, "eval_metric": "auc", "random_state": 42},
+    "cat": {"iterations": 500, "learning_rate": 0.05, "random_seed": 42},
+}
+FBETA = 1.0
+WEIGHT_STEP = 0.1
+# joblib 모델에서 파생되는 산출물 (tree_compiler.py / onnx_backend.py / student.py)
+DERIVED_ROLES = ("compiled", "onnx", "student")
+
+
+# --------------------------------------------------
+# 🧱 모델 생성 / 학습 (워커 프로세스에서 실행)
+# --------------------------------------------------
+def make_model(name: str, params: dict, threads: int):
+    if name == "lgb":
+        import lightgbm as lgb
+        return lgb.LGBMClassifier(**{"verbose": -1, "deterministic": True, "force_row_wise": True,
+                                     **params, "n_jobs": threads})
+    if name == "xgb":
+        import xgboost as xgb
+        return xgb.XGBClassifier(**{"tree_method": "hist", **params, "n_jobs": threads})
+    from catboost import CatBoostClassifier
+    # catboost_info/ 학습 로그를 남기지 않음
+    return CatBoostClassifier(**{"verbose": False, "allow_writing_files": False, **params, "thread_count": threads})
+
+
+_X, _Y, _FEATURES = None, None, None
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, features: list):
+    global _X, _Y, _FEATURES
+    _X, _Y, _FEATURES = X, y, features
+
+
+def _frame(idx=None) -> pd.DataFrame:
+    """sklearn 래퍼가 피처명을 기억하도록 DataFrame 으로 학습 (서빙의 DataFrame 경로와 같은 이름)"""
+    X = _X if idx is None else _X[idx]
+    return pd.DataFrame(X, columns=_FEATURES)
+
+
+def cv_task(name: str, params: dict, fold: int, train_idx: np.ndarray, val_idx: np.ndarray, threads: int) -> tuple:
+    """폴드 1개 학습 → (모델, 폴드, 검증 인덱스, 검증 확률, 소요 초)"""
+    t0 = time.perf_counter()
+    model = make_model(name, params, threads)
+    model.fit(_frame(train_idx), _Y[train_idx])
+    proba = model.predict_proba(_frame(val_idx))[:, 1]
+    return name, fold, val_idx, proba, time.perf_counter() - t0
+
+
+def fit_task(name: str, params: dict, threads: int) -> tuple:
+    """전체 데이터 학습 → (모델, 학습된 모델 객체, 소요 초)"""
+    t0 = time.perf_counter()
+    model = make_model(name, params, threads)
+    model.fit(_frame(), _Y)
+    return name, model, time.perf_counter() - t0
+
+
+# --------------------------------------------------
+# 📏 가중치 / threshold 선택
+# --------------------------------------------------
+def best_threshold(y: np.ndarray, prob: np.ndarray, beta: float = FBETA) -> tuple:
+    """F-beta 최대 threshold → (threshold, f_beta)"""
+    from sklearn.metrics import precision_recall_curve
+    precision, recall, thresholds = precision_recall_curve(y, prob)
+    precision, recall = precision[:-1], recall[:-1]
+    denom = beta ** 2 * precision + recall
+    f = np.where(denom > 0, (1 + beta ** 2) * precision * recall / np.where(denom > 0, denom, 1), 0)
+    i = int(np.argmax(f))
+    return float(thresholds[i]), float(f[i])
+
+
+def search_weights(y: np.ndarray, oof: dict, step: float = WEIGHT_STEP) -> dict:
+    """OOF AUC 최대 가중치 (step 격자, 합 1) — 동률이면 균등에 가까운 쪽"""
+    from sklearn.metrics import roc_auc_score
+    names = list(oof)
+    grid = np.round(np.arange(0, 1 + step / 2, step), 6)
+    best, best_key = None, None
+    for w in itertools.product(grid, repeat=len(names)):
+        if abs(sum(w) - 1) > 1e-9:
+            continue
+        prob = sum(wi * oof[n] for wi, n in zip(w, names))
+        key = (round(roc_auc_score(y, prob), 6), -float(np.std(w)))
+        if best_key is None or key > best_key:
+            best, best_key = dict(zip(names, map(float, w))), key
+    return best
+
+
+def evaluate(y: np.ndarray, prob: np.ndarray, threshold: float) -> dict:
+    from sklearn.metrics import roc_auc_score, f1_score
+    return {
+        "auc": float(roc_auc_score(y, prob)),
+        "f1_at_0.5": float(f1_score(y, prob >= 0.5)),
+        "f1_at_threshold": float(f1_score(y, prob >= threshold)),
+    }
+
+
+# --------------------------------------------------
+# 🏋️ 전체 파이프라인
+# --------------------------------------------------
+def run_cv(X: np.ndarray, y: np.ndarray, features: list, configs: dict, folds: int = 5,
+           workers: int = None, seed: int = 42) -> tuple:
+    """
+    configs: {키: (모델명, params)} → 모든 (설정 × 폴드) 작업을 한 프로세스 풀에서 실행
+    → (OOF 확률 {키: 배열}, 작업 소요 초 합계 {키: 초}, 동시 작업 수, 작업당 스레드)
+    - 폴드 분할은 seed 로 고정 → 같은 seed 의 OOF 끼리는 가중치 탐색에 섞어 써도 됨
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    cpu = os.cpu_count() or 1
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+    tasks = [(key, f, tr, va) for key in configs for f, (tr, va) in enumerate(splits)]
+    cv_workers = max(1, min(workers or cpu, len(tasks)))
+    threads = max(1, cpu // cv_workers)
+    oof = {key: np.zeros(len(y)) for key in configs}
+    task_sec = {key: 0.0 for key in configs}
+    with ProcessPoolExecutor(max_workers=cv_workers, initializer=_init_worker, initargs=(X, y, features)) as ex:
+        futures = {ex.submit(cv_task, *configs[key], f, tr, va, threads): key for key, f, tr, va in tasks}
+        for fut, key in futures.items():
+            _, _, val_idx, proba, sec = fut.result()
+            oof[key][val_idx] = proba
+            task_sec[key] += sec
+    return oof, task_sec, cv_workers, threads
+
+
+def train(X: np.ndarray, y: np.ndarray, features: list, params: dict = None, folds: int = 5,
+          workers: int = None, seed: int = 42, models: tuple = MODEL_NAMES, oof: dict = None) -> dict:
+    """
+    → {"models": {"lgb_model": 객체, ...}, "meta": model_meta dict}
+    - params: {"lgb": {...}, ...} 기본값 위에 덮어씀
+    - oof: 같은 params / folds / seed 로 이미 구한 OOF 확률 {"lgb": 배열, ...} (있으면 교차검증 생략)
+    """
+    timings = {}
+    cpu = os.cpu_count() or 1
+    params = {n: {**DEFAULT_PARAMS[n], **((params or {}).get(n) or {})} for n in models}
+
+    # 1) 교차검증 (모델 × 폴드 작업) — 튜닝에서 이미 구한 OOF 가 있으면 생략
+    t0 = time.perf_counter()
+    if oof is None:
+        oof, task_sec, cv_workers, threads = run_cv(X, y, features, {n: (n, params[n]) for n in models},
+                                                    folds, workers, seed)
+        timings["cv_sec"] = round(time.perf_counter() - t0, 2)
+        print(f"✅ 교차검증 완료: {folds}폴드 × {len(models)}모델, 동시 {cv_workers}작업 × {threads}스레드 "
+              f"({timings['cv_sec']}s, 작업 합계 {round(sum(task_sec.values()), 1)}s)")
+    else:
+        oof = {n: oof[n] for n in models}
+        task_sec, cv_workers, threads = {}, None, None
+
+    # 2) 최종 학습 (모델별 프로세스)
+    t0 = time.perf_counter()
+    fit_workers = max(1, min(workers or cpu, len(models)))
+    fit_threads = max(1, cpu // fit_workers)
+    fitted, fit_sec = {}, {}
+    with ProcessPoolExecutor(max_workers=fit_workers, initializer=_init_worker, initargs=(X, y, features)) as ex:
+        futures = [ex.submit(fit_task, n, params[n], fit_threads) for n in models]
+        for fut in futures:
+            name, model, sec = fut.result()
+            fitted[name] = model
+            fit_sec[name] = round(sec, 2)
+    timings["fit_sec"] = round(time.perf_counter() - t0, 2)
+    print(f"✅ 최종 학습 완료: 동시 {fit_workers}모델 × {fit_threads}스레드 ({timings['fit_sec']}s, {fit_sec})")
+
+    # 3) 가중치 / threshold (서빙 /predict 는 균등 평균 → threshold 는 균등 평균 OOF 기준)
+    t0 = time.perf_counter()
+    weights = search_weights(y, oof)
+    equal = sum(oof.values()) / len(oof)
+    weighted = sum(weights[n] * oof[n] for n in models)
+    threshold, f_best = best_threshold(y, equal)
+    threshold_w, f_best_w = best_threshold(y, weighted)
+    timings["blend_sec"] = round(time.perf_counter() - t0, 2)
+
+    from sklearn.metrics import roc_auc_score
+    eval_ = {
+        "timestamp": datetime.now().isoformat(),
+        "cv_folds": folds,
+        "per_model_oof_auc": {n: float(roc_auc_score(y, oof[n])) for n in models},
+        "ensemble": {
+            **evaluate(y, equal, threshold),
+            "best_f1": f_best,
+            "best_threshold": threshold,
+            "used_models": list(models),
+            "weights": weights,
+        },
+        "ensemble_weighted": {
+            **evaluate(y, weighted, threshold_w),
+            "best_f1": f_best_w,
+            "best_threshold": threshold_w,
+        },
+    }
+    now = datetime.now(timezone.utc)
+    meta = {
+        "version": now.strftime("v%Y%m%dT%H%M%SZ"),
+        "created_at": datetime.now().isoformat(),
+        "model_type": "ensemble",
+        "models": [f"{n}_model.joblib" for n in models],
+        "eval": eval_,
+        "threshold": threshold,
+        "weights": weights,
+        "features": list(features),
+        "training": {
+            "rows": int(len(y)),
+            "positive_rate": float(np.mean(y)),
+            "seed": seed,
+            "cpu": cpu,
+            "cv_workers": cv_workers,
+            "cv_threads_per_task": threads,
+            "fit_workers": fit_workers,
+            "fit_threads_per_model": fit_threads,
+            "params": params,
+            "cv_task_sec": {n: round(s, 2) for n, s in task_sec.items()},
+            "fit_model_sec": fit_sec,
+            "timings": timings,
+        },
+    }
+    return {"models": {f"{n}_model": m for n, m in fitted.items()}, "meta": meta}
+
+
+def write_artifacts(result: dict, out_dir: str) -> str:
+    """
+    joblib 3개 + model_meta.json 을 임시 디렉터리에 쓴 뒤 파일 단위로 교체 (meta 를 마지막에)
+    - 이전 모델에서 만든 변환 산출물(compiled / onnx / student)은 먼저 삭제 → 재생성 전까지 해당 백엔드는 로드 실패
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for role in DERIVED_ROLES:
+        stale = os.path.join(out_dir, MEMBER_FILES[role])
+        if os.path.exists(stale):
+            os.remove(stale)
+            print(f"🧹 이전 모델의 {MEMBER_FILES[role]} 삭제 (새 모델로 다시 생성 필요)")
+    tmp = os.path.join(out_dir, f".train-{os.getpid()}")
+    os.makedirs(tmp, exist_ok=True)
+    for name, model in result["models"].items():
+        joblib.dump(model, os.path.join(tmp, f"{name}.joblib"))
+    with open(os.path.join(tmp, "model_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(result["meta"], f, ensure_ascii=False, indent=2)
+    for fname in [f"{n}.joblib" for n in result["models"]] + ["model_meta.json"]:
+        os.replace(os.path.join(tmp, fname), os.path.join(out_dir, fname))
+    shutil.rmtree(tmp, ignore_errors=True)
+    return out_dir
+
+
+def load_training_data(input_path: str, features: list, label_column: str, max_rows: int = None) -> tuple:
+    fs, path = get_filesystem(input_path)
+    with fs.open_input_file(path) as f:
+        df = pd.read_parquet(f, columns=list(features) + [label_column])
+    if max_rows:
+        df = df.head(max_rows)
+    df = df.dropna(subset=[label_column])
+    return df[list(features)].to_numpy(dtype=float), df[label_column].to_numpy().astype(int)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="앙상블 학습 (교차검증 / 최종 학습 병렬) → models_cache 산출물")
+    parser.add_argument("--input", default="s3://feature-data/session_features.parquet", help="피처 Parquet 경로")
+    parser.add_argument("--label-column", default="label")
+    parser.add_argument("--features", default=None,
+                        help="쉼표 구분 피처 목록 (기본: 현재 models_cache/model_meta.json 의 features)")
+    parser.add_argument("--out", default=MODEL_CACHE_DIR, help="산출물 디렉터리")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="동시 작업 수 (기본: 코어 수)")
+    parser.add_argument("--params", default=None, help='모델별 파라미터 JSON ({"lgb": {...}, "xgb": {...}, "cat": {...}})')
+    parser.add_argument("--max-rows", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bundle", action="store_true", help="산출물로 버전 번들(app/bundles/<version>)도 생성")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.features:
+        features = [c.strip() for c in args.features.split(",")]
+    else:
+        with open(os.path.join(MODEL_CACHE_DIR, "model_meta.json"), "r", encoding="utf-8") as f:
+            features = json.load(f)["features"]
+    params = None
+    if args.params:
+        with open(args.params, "r", encoding="utf-8") as f:
+            params = json.load(f)
+
+    t0 = time.perf_counter()
+    X, y = load_training_data(args.input, features, args.label_column, args.max_rows)
+    load_sec = round(time.perf_counter() - t0, 2)
+    print(f"📥 학습 데이터 {len(y):,}행 × {len(features)}피처 (양성 비율 {y.mean():.3f}, {load_sec}s)")
+
+    result = train(X, y, features, params, folds=args.folds, workers=args.workers, seed=args.seed)
+    timings = result["meta"]["training"]["timings"]
+
+    t0 = time.perf_counter()
+    write_artifacts(result, args.out)
+    timings.update(load_sec=load_sec, write_sec=round(time.perf_counter() - t0, 2),
+                   total_sec=round(time.perf_counter() - started, 2))
+    with open(os.path.join(args.out, "model_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(result["meta"], f, ensure_ascii=False, indent=2)
+    if args.bundle:
+        from model_bundle import build_bundle
+        bundle_dir = build_bundle(args.out, os.path.join(os.path.dirname(MODEL_CACHE_DIR), "bundles"),
+                                  roles=["lgb_model", "xgb_model", "cat_model"])
+        print(f"📦 번들 생성 → {bundle_dir}")
+
+    ens = result["meta"]["eval"]["ensemble"]
+    print(f"✅ 학습 완료 → {args.out} ({result['meta']['version']})")
+    print(f"   OOF AUC {ens['auc']:.4f}, threshold {ens['best_threshold']:.4f} (F1 {ens['best_f1']:.4f}), "
+          f"가중치 {ens['weights']}")
+    print(f"   단계별 소요 시간: {timings}")
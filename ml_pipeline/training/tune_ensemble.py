@@ -0,0 +1,282 @@
+# ===============================================================
+# 🎛️ tune_ensemble.py — 부스터별 하이퍼파라미터 + 앙상블 가중치 탐색 → 최적 설정으로 학습 → 모델 번들
+# ---------------------------------------------------------------
+# - 모델별 무작위 설정 N개 (현재 배포 설정 포함) 를 successive halving 으로 가지치기:
+#   트리 수 max_trees / eta^(rungs-1) 에서 시작해 단계마다 교차검증 AUC 상위 1/eta 만 트리 수 ×eta 로 재평가
+# - 단계마다 모든 (설정 × 폴드) 작업을 한 프로세스 풀에서 실행 (train_ensemble.run_cv)
+# - 시행 결과는 설정 해시(모델 / 파라미터 / 트리 수 / 폴드 / 시드 / 데이터 지문) 로 캐시에 저장 → 재실행 시 완료된 시행은 건너뜀
+# - 모델별 최적 설정의 OOF 로 가중치 / threshold 선택 → 전체 데이터 학습 → models_cache 형식 산출물 + 번들
+#
+#   python ml_pipeline/training/tune_ensemble.py --input s3://feature-data/session_features.parquet \
+#       [--trials 12] [--rungs 3] [--eta 3] [--max-trees 500] [--folds 5] [--workers 4]
+# ===============================================================
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from train_ensemble import (  # noqa: E402
+    MODEL_NAMES, DEFAULT_PARAMS, MODEL_CACHE_DIR, run_cv, train, write_artifacts, load_training_data,
+)
+
+TRAINING_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(TRAINING_DIR, "hpo_cache")
+DEFAULT_BUNDLE_ROOT = os.path.join(os.path.dirname(MODEL_CACHE_DIR), "bundles")
+
+# 트리 수 파라미터 (successive halving 의 자원)
+BUDGET_KEYS = {"lgb": "n_estimators", "xgb": "n_estimators", "cat": "iterations"}
+SEARCH_SPACE = {
+    "lgb": {
+        "learning_rate": [0.02, 0.05, 0.1],
+        "num_leaves": [7, 15, 31, 63],
+        "min_child_samples": [10, 20, 50, 100],
+        "colsample_bytree": [0.7, 1.0],
+        "reg_lambda": [0.0, 1.0, 5.0],
+    },
+    "xgb": {
+        "learning_rate": [0.02, 0.05, 0.1],
+        "max_depth": [2, 3, 4, 6],
+        "min_child_weight": [1, 5, 10],
+        "subsample": [0.8, 1.0],
+        "colsample_bytree": [0.7, 1.0],
+        "reg_lambda": [1.0, 5.0],
+    },
+    "cat": {
+        "learning_rate": [0.02, 0.05, 0.1],
+        "depth": [4, 6, 8],
+        "l2_leaf_reg": [1.0, 3.0, 10.0],
+    },
+}
+
+
+# --------------------------------------------------
+# 🔑 설정 해시 / 시행 캐시
+# --------------------------------------------------
+def data_fingerprint(X: np.ndarray, y: np.ndarray, features: list) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps(list(features)).encode())
+    h.update(np.ascontiguousarray(X).tobytes())
+    h.update(np.ascontiguousarray(y).tobytes())
+    return h.hexdigest()[:16]
+
+
+def config_hash(name: str, params: dict, folds: int, seed: int, data_fp: str) -> str:
+    payload = json.dumps({"model": name, "params": params, "folds": folds, "seed": seed, "data": data_fp},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class TrialCache:
+    """
+    cache_dir/trials.jsonl (시행당 1줄) + cache_dir/oof/<해시>.npy (OOF 확률)
+    - OOF 파일을 먼저 쓰고 결과 줄을 나중에 추가 → 중간에 끊겨도 기록된 시행은 항상 OOF 가 있음
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.oof_dir = os.path.join(cache_dir, "oof")
+        self.path = os.path.join(cache_dir, "trials.jsonl")
+        os.makedirs(self.oof_dir, exist_ok=True)
+        self.records = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 마지막 줄이 잘린 경우
+                    if os.path.exists(self._oof_path(rec["hash"])):
+                        self.records[rec["hash"]] = rec
+
+    def _oof_path(self, key: str) -> str:
+        return os.path.join(self.oof_dir, f"{key}.npy")
+
+    def get(self, key: str):
+        return self.records.get(key)
+
+    def oof(self, key: str) -> np.ndarray:
+        return np.load(self._oof_path(key))
+
+    def put(self, record: dict, oof: np.ndarray):
+        tmp = self._oof_path(record["hash"]) + f".{os.getpid()}.tmp.npy"
+        np.save(tmp, oof)
+        os.replace(tmp, self._oof_path(record["hash"]))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.records[record["hash"]] = record
+
+
+# --------------------------------------------------
+# 🎲 탐색 공간 / successive halving
+# --------------------------------------------------
+def sample_configs(name: str, n: int, rng: np.random.Generator) -> list:
+    """현재 배포 설정(트리 수 제외) + 무작위 설정 → 중복 없이 최대 n개"""
+    space = SEARCH_SPACE[name]
+    base = {k: v for k, v in DEFAULT_PARAMS[name].items() if k != BUDGET_KEYS[name]}
+    configs, seen = [base], {json.dumps(base, sort_keys=True)}
+    total = math.prod(len(v) for v in space.values())
+    while len(configs) < min(n, total + 1):
+        cfg = {**base, **{k: v[rng.integers(len(v))] for k, v in space.items()}}
+        cfg = {k: (v.item() if hasattr(v, "item") else v) for k, v in cfg.items()}
+        key = json.dumps(cfg, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(cfg)
+    return configs
+
+
+def rung_budgets(max_trees: int, rungs: int, eta: int) -> list:
+    return [max(1, int(round(max_trees / eta ** (rungs - 1 - r)))) for r in range(rungs)]
+
+
+def successive_halving(X: np.ndarray, y: np.ndarray, features: list, candidates: dict, cache: TrialCache,
+                       budgets: list, eta: int = 3, folds: int = 5, workers: int = None, seed: int = 42) -> list:
+    """
+    candidates: {모델명: [params, ...]} (트리 수 제외)
+    → 전체 시행 기록 목록 (rung, model, config_id, params, hash, auc, cached, ...)
+    """
+    from sklearn.metrics import roc_auc_score
+
+    data_fp = data_fingerprint(X, y, features)
+    alive = {n: list(range(len(cfgs))) for n, cfgs in candidates.items()}
+    trials = []
+    for rung, budget in enumerate(budgets):
+        t0 = time.perf_counter()
+        jobs, results = {}, []
+        for name, ids in alive.items():
+            for cid in ids:
+                params = {**candidates[name][cid], BUDGET_KEYS[name]: budget}
+                key = config_hash(name, params, folds, seed, data_fp)
+                rec = cache.get(key)
+                if rec is None:
+                    jobs[key] = (name, params)
+                results.append((name, cid, params, key, rec is not None))
+
+        if jobs:
+            oof, task_sec, _, _ = run_cv(X, y, features, jobs, folds, workers, seed)
+            for key, (name, params) in jobs.items():
+                cache.put({"hash": key, "model": name, "params": params, "folds": folds, "seed": seed,
+                           "data": data_fp, "auc": float(roc_auc_score(y, oof[key])),
+                           "sec": round(task_sec[key], 2)}, oof[key])
+
+        for name, cid, params, key, cached in results:
+            rec = cache.get(key)
+            trials.append({"rung": rung, "trees": budget, "model": name, "config_id": cid, "hash": key,
+                           "auc": rec["auc"], "sec": rec["sec"], "cached": cached, "params": params})
+
+        # 모델별 상위 1/eta 만 다음 단계로
+        for name, ids in alive.items():
+            auc = {t["config_id"]: t["auc"] for t in trials if t["rung"] == rung and t["model"] == name}
+            scored = sorted(ids, key=lambda c: -auc[c])
+            alive[name] = scored[:max(1, math.ceil(len(ids) / eta))] if rung < len(budgets) - 1 else scored[:1]
+        hits = sum(1 for r in results if r[4])
+        print(f"🎛️ 단계 {rung + 1}/{len(budgets)} (트리 {budget}): 시행 {len(results)}개 "
+              f"(캐시 {hits}, 신규 {len(jobs)}), {round(time.perf_counter() - t0, 2)}s → "
+              + ", ".join(f"{n} 최고 AUC {max(t['auc'] for t in trials if t['rung'] == rung and t['model'] == n):.4f}"
+                          for n in alive))
+    return trials
+
+
+def best_trials(trials: list) -> dict:
+    """모델별 마지막 단계 최고 AUC 시행"""
+    last = max(t["rung"] for t in trials)
+    best = {}
+    for t in trials:
+        if t["rung"] == last and (t["model"] not in best or t["auc"] > best[t["model"]]["auc"]):
+            best[t["model"]] = t
+    return best
+
+
+# --------------------------------------------------
+# 📦 최적 설정 → 산출물 + 번들
+# --------------------------------------------------
+def export_best(X: np.ndarray, y: np.ndarray, features: list, trials: list, cache: TrialCache, out_dir: str,
+                bundle_root: str = DEFAULT_BUNDLE_ROOT, folds: int = 5, workers: int = None, seed: int = 42,
+                search: dict = None) -> tuple:
+    """
+    캐시된 최적 OOF 로 가중치 / threshold 선택 (교차검증 재실행 없음) → 전체 데이터 학습
+    → out_dir 에 models_cache 형식 산출물 → bundle_root/<version> 번들 → (meta, 번들 경로)
+    """
+    from model_bundle import build_bundle  # train_ensemble 이 app 디렉터리를 sys.path 에 추가
+
+    best = best_trials(trials)
+    models = tuple(n for n in MODEL_NAMES if n in best)
+    params = {n: best[n]["params"] for n in models}
+    oof = {n: cache.oof(best[n]["hash"]) for n in models}
+    result = train(X, y, features, params, folds=folds, workers=workers, seed=seed, models=models, oof=oof)
+    result["meta"]["tuning"] = {
+        **(search or {}),
+        "trials": len(trials),
+        "new_trials": sum(1 for t in trials if not t["cached"]),
+        "best": {n: {"hash": best[n]["hash"], "auc": best[n]["auc"], "params": best[n]["params"]} for n in models},
+        "default_auc": {n: max((t["auc"] for t in trials if t["model"] == n and t["config_id"] == 0), default=None)
+                        for n in models},
+    }
+    write_artifacts(result, out_dir)
+    bundle_dir = build_bundle(out_dir, bundle_root, roles=[f"{n}_model" for n in models])
+    return result["meta"], bundle_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="하이퍼파라미터 / 가중치 탐색 (successive halving + 시행 캐시) → 모델 번들")
+    parser.add_argument("--input", default="s3://feature-data/session_features.parquet", help="피처 Parquet 경로")
+    parser.add_argument("--label-column", default="label")
+    parser.add_argument("--features", default=None,
+                        help="쉼표 구분 피처 목록 (기본: 현재 models_cache/model_meta.json 의 features)")
+    parser.add_argument("--models", default=",".join(MODEL_NAMES))
+    parser.add_argument("--trials", type=int, default=12, help="모델별 설정 수 (현재 배포 설정 포함)")
+    parser.add_argument("--rungs", type=int, default=3)
+    parser.add_argument("--eta", type=int, default=3, help="단계마다 상위 1/eta 생존, 트리 수 ×eta")
+    parser.add_argument("--max-trees", type=int, default=500)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="동시 작업 수 (기본: 코어 수)")
+    parser.add_argument("--max-rows", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="시행 결과 캐시 디렉터리")
+    parser.add_argument("--out", default=None, help="최적 설정 산출물 디렉터리 (기본: <cache-dir>/best)")
+    parser.add_argument("--bundle-root", default=DEFAULT_BUNDLE_ROOT)
+    parser.add_argument("--no-export", action="store_true", help="탐색만 (학습 / 번들 생략)")
+    parser.add_argument("--report", default=None, help="시행 목록 CSV 저장 경로")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.features:
+        features = [c.strip() for c in args.features.split(",")]
+    else:
+        with open(os.path.join(MODEL_CACHE_DIR, "model_meta.json"), "r", encoding="utf-8") as f:
+            features = json.load(f)["features"]
+    X, y = load_training_data(args.input, features, args.label_column, args.max_rows)
+    print(f"📥 학습 데이터 {len(y):,}행 × {len(features)}피처 (양성 비율 {y.mean():.3f})")
+
+    rng = np.random.default_rng(args.seed)
+    names = [n.strip() for n in args.models.split(",")]
+    candidates = {n: sample_configs(n, args.trials, rng) for n in names}
+    budgets = rung_budgets(args.max_trees, args.rungs, args.eta)
+    cache = TrialCache(args.cache_dir)
+    print(f"🎛️ 설정 {sum(len(c) for c in candidates.values())}개, 트리 수 단계 {budgets}, "
+          f"캐시 {len(cache.records)}건 ({args.cache_dir})")
+
+    trials = successive_halving(X, y, features, candidates, cache, budgets, args.eta,
+                                args.folds, args.workers, args.seed)
+    best = best_trials(trials)
+    for n, t in best.items():
+        print(f"🏆 {n}: AUC {t['auc']:.4f} {t['params']}")
+    if args.report:
+        import pandas as pd
+        pd.DataFrame([{**{k: v for k, v in t.items() if k != "params"}, "params": json.dumps(t["params"])}
+                      for t in trials]).to_csv(args.report, index=False)
+
+    if not args.no_export:
+        search = {"trials_per_model": args.trials, "rungs": budgets, "eta": args.eta, "seed": args.seed}
+        meta, bundle_dir = export_best(X, y, features, trials, cache, args.out or os.path.join(args.cache_dir, "best"),
+                                       args.bundle_root, args.folds, args.workers, args.seed, search)
+        ens = meta["eval"]["ensemble"]
+        print(f"✅ 최적 앙상블 {meta['version']}: OOF AUC {ens['auc']:.4f}, threshold {meta['threshold']:.4f}, "
+              f"가중치 {meta['weights']}")
+        print(f"📦 번들 생성 → {bundle_dir}")
+    print(f"⏱️ 전체 {round(time.perf_counter() - started, 2)}s")